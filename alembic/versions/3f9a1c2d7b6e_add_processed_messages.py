@@ -0,0 +1,35 @@
+"""Add processed_messages table for webhook idempotency
+
+Revision ID: 3f9a1c2d7b6e
+Revises: e7b36440521c
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c2d7b6e'
+down_revision: Union[str, None] = 'e7b36440521c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Track Twilio MessageSids so retried webhooks are not processed twice
+    op.create_table('processed_messages',
+    sa.Column('message_sid', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('message_sid')
+    )
+    op.create_index('ix_processed_messages_created_at', 'processed_messages', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_processed_messages_created_at', table_name='processed_messages')
+    op.drop_table('processed_messages')
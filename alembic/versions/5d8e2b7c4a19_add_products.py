@@ -0,0 +1,38 @@
+"""Add products table
+
+Revision ID: 5d8e2b7c4a19
+Revises: 3f9a1c2d7b6e
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2b7c4a19'
+down_revision: Union[str, None] = '3f9a1c2d7b6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # products used to be created by Base.metadata.create_all at startup, so existing
+    # databases may already have it
+    if sa.inspect(op.get_bind()).has_table('products'):
+        return
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.Column('image', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('products')
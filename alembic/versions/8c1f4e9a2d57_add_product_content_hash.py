@@ -0,0 +1,27 @@
+"""Add content_hash to products for inventory sync
+
+Revision ID: 8c1f4e9a2d57
+Revises: 5d8e2b7c4a19
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4e9a2d57'
+down_revision: Union[str, None] = '5d8e2b7c4a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows have no hash and are rewritten by the first sync
+    op.add_column('products', sa.Column('content_hash', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'content_hash')
@@ -0,0 +1,51 @@
+"""Seed the products table with the starter catalog
+
+Revision ID: d2c8f61a9e47
+Revises: b4e7d2a9c613
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2c8f61a9e47'
+down_revision: Union[str, None] = 'b4e7d2a9c613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The cakes get_cake_inventory listed before it read the products table; "limited" is
+# CATALOG_LOW_STOCK (3) or fewer left
+STARTER_PRODUCTS = [
+    {"name": "Chocolate Therapy", "price": 45.0, "quantity": 10,
+     "description": "Triple chocolate cake with ganache filling"},
+    {"name": "Red Velvet Dream", "price": 40.0, "quantity": 10,
+     "description": "Classic red velvet with cream cheese frosting"},
+    {"name": "Vanilla Bean Bliss", "price": 35.0, "quantity": 3,
+     "description": "Madagascar vanilla bean cake with buttercream"},
+]
+
+products = sa.table(
+    'products',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('price', sa.Float),
+    sa.column('description', sa.Text),
+    sa.column('quantity', sa.Integer),
+)
+
+
+def upgrade() -> None:
+    # Only a fresh database: a catalog that was synced or edited is left alone
+    if op.get_bind().execute(sa.select(sa.func.count()).select_from(products)).scalar():
+        return
+    op.bulk_insert(products, STARTER_PRODUCTS)
+
+
+def downgrade() -> None:
+    # Starter rows nobody has changed since
+    for product in STARTER_PRODUCTS:
+        op.execute(products.delete().where(*(products.c[column] == value for column, value in product.items())))
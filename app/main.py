@@ -1,30 +1,49 @@
-from fastapi import FastAPI, HTTPException, Request, Form, Depends
+from fastapi import FastAPI, HTTPException, Request, Form, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, JSONResponse
-from openai import OpenAI
-from app.utils.tools.agents import bakery_agent, Agent
-from app.utils.function_schemas import function_to_schema
+from fastapi.responses import Response, JSONResponse, FileResponse
+from openai import AsyncOpenAI
+from app.utils.tools.agents import AGENTS, bakery_agent, Agent
 from app.services.chat_service import ChatService
 from app.services.response_service import ResponseService
 from app.services.db_service import DatabaseService
+from app.services.answer_cache_service import answer_cache
+from app.services.usage_service import UsageTracker
+from app.services.rate_limiter import LLMAdmissionController
+from app.services.resilience import ResilientLLMClient
+from app.services.hedging import Hedger
+from app.services.llm_backend import create_backend
+from app.services.flight_recorder import FlightRecorder
+from app.services.profiling import Profiler
+from app.services.warmup import WarmUp
+from app.services.catalog_cache import CatalogChangeListener
+from app.services.reservation_service import release_expired_reservations
+from app.services.twilio_service import TwilioMessageSender
+from app.services.reply_worker import ReplyWorkerPool
+from app.services.coalescing_service import MessageCoalescer, clamp_turn_deadline
+from app.services.idempotency_service import InMemoryIdempotencyStore, DatabaseIdempotencyStore, record_duplicate
 from app.utils.logging_config import setup_logging
 from app.models import Conversation, ConversationManager
-from app.database import get_db, init_db
-from dotenv import load_dotenv
-from app.config.settings import INPUT_FORMAT
+from app.database import get_db, prepare_schema, SessionLocal, engine
+from app.config.settings import (
+    INPUT_FORMAT, ANSWER_CACHE_ENABLED, REPLY_MODE, REPLY_WORKERS, REPLY_QUEUE_SIZE, TURN_FALLBACK_MESSAGE,
+    TURN_DEADLINE_SECONDS, COALESCE_ENABLED, COALESCE_MAX_WAIT_SECONDS, IDEMPOTENCY_BACKEND, IDEMPOTENCY_WAIT_SECONDS,
+    HEDGING_ENABLED, LLM_BACKEND,
+    METRICS_MULTIPROC_DIR, METRICS_FLUSH_SECONDS, FLIGHT_RECORDER_ENABLED, RESERVATION_SWEEP_SECONDS, get_settings
+)
+from app.utils.metrics import REGISTRY, MultiProcessStore, gauge, histogram, render_prometheus
 from sqlalchemy.orm import Session
-import os
 import json
+import asyncio
 import argparse
-from typing import Any, List, Dict
+import hmac
+import logging
+import time
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime
 
 # Configure logging
 logger = setup_logging()
 
-# Load environment variables at the start of the application
-load_dotenv()
-
 def parse_args():
     parser = argparse.ArgumentParser(description='Bakery Chatbot API')
     parser.add_argument('--port', type=int, default=8000, help='Port to run the server on')
@@ -33,39 +52,325 @@ def parse_args():
 app = FastAPI(title="Bakery Chatbot API")
 
 # Initialize services
+usage_tracker = UsageTracker()
+flight_recorder = FlightRecorder() if FLIGHT_RECORDER_ENABLED else None
+profiler = Profiler()
+# Retries are handled by ResilientLLMClient, so the SDK's own retry loop is disabled
+openai_client = AsyncOpenAI(api_key=get_settings().openai_api_key, max_retries=0) if LLM_BACKEND == "openai" else None
+llm_backend = create_backend(LLM_BACKEND, openai_client)
+# In sync mode the coalescing wait and the turn share one webhook response time
+turn_deadline_seconds = clamp_turn_deadline(TURN_DEADLINE_SECONDS) \
+    if COALESCE_ENABLED and REPLY_MODE == "sync" else TURN_DEADLINE_SECONDS
 chat_service = ChatService(
-    openai_client=OpenAI(api_key=os.getenv("OPENAI_API_KEY")),
-    initial_agent=bakery_agent
+    openai_client=openai_client,
+    turn_deadline_seconds=turn_deadline_seconds,
+    backend=llm_backend,
+    initial_agent=bakery_agent,
+    answer_cache=answer_cache if ANSWER_CACHE_ENABLED else None,
+    usage_tracker=usage_tracker,
+    admission=LLMAdmissionController(),
+    resilience=ResilientLLMClient(),
+    hedger=Hedger() if HEDGING_ENABLED else None,
+    flight_recorder=flight_recorder,
+    profiler=profiler
 )
 
 response_service = ResponseService()
 conversation_manager = ConversationManager()
+warmup = WarmUp(engine, llm_backend, [get_agent() for get_agent in AGENTS.values()])
+_warmup_task: Optional[asyncio.Task] = None
+# Invalidates the product catalog cache when another worker edits products (PostgreSQL only)
+catalog_listener = CatalogChangeListener(engine)
+
+_stage_seconds = histogram("chat_stage_seconds", "Time spent in each stage of a /chat request", ("stage",))
+_active_conversations = gauge("active_conversations", "Conversations held in memory")
+_db_pool = gauge("db_pool_connections", "Database connection pool usage", ("state",))
+
+def collect_runtime_gauges() -> None:
+    """Read the gauges that are only worth computing when metrics are scraped."""
+    _active_conversations.set(len(conversation_manager.conversations))
+    pool = engine.pool
+    for state, reader in (("checked_out", "checkedout"), ("idle", "checkedin"), ("size", "size")):
+        if hasattr(pool, reader):
+            _db_pool.set(getattr(pool, reader)(), state=state)
+
+REGISTRY.add_collector(collect_runtime_gauges)
+metrics_store = MultiProcessStore(METRICS_MULTIPROC_DIR) if METRICS_MULTIPROC_DIR else None
+_metrics_flush_task: Optional[asyncio.Task] = None
+
+async def flush_metrics_periodically() -> None:
+    """Multi-worker mode: keep this worker's metrics file fresh for scrapes served by other workers."""
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(metrics_store.write)
+        except OSError as e:
+            logger.warning("Could not write metrics file: %s", e)
+
+_reservation_sweep_task: Optional[asyncio.Task] = None
+
+def _release_expired_reservations() -> int:
+    with SessionLocal() as db:
+        return release_expired_reservations(db)
+
+async def release_expired_reservations_periodically() -> None:
+    """Give back the stock of unpaid orders whose hold expired (every worker sweeps; each hold is released once)."""
+    while True:
+        await asyncio.sleep(RESERVATION_SWEEP_SECONDS)
+        try:
+            await asyncio.to_thread(_release_expired_reservations)
+        except Exception:
+            logger.exception("Releasing expired stock reservations failed")
+
+async def handle_turn(db_service: DatabaseService, phone_number: str, message: str,
+                      profile_mode: Optional[str] = None) -> str:
+    """Run one conversation turn for a customer and store it in the chat history."""
+    # Get or create customer
+    started = time.perf_counter()
+    customer = db_service.get_customer_by_phone(phone_number)
+    if not customer:
+        customer = db_service.create_customer(phone_number)
+
+    # Get or create conversation for this phone number
+    conversation = conversation_manager.get_conversation(phone_number)
+    conversation.customer_profile = db_service.get_customer_profile(customer)
+    # Give the pooled connection back while the LLM works; tools open their own sessions and
+    # holding it for the whole turn exhausts the pool under load
+    db_service.db.close()
+    _stage_seconds.observe(time.perf_counter() - started, stage="customer_lookup")
+
+    # Process the message with conversation context
+    started = time.perf_counter()
+    response_text = await chat_service.process_message(message, conversation, profile_mode)
+    _stage_seconds.observe(time.perf_counter() - started, stage="turn")
+
+    # Store chat history
+    started = time.perf_counter()
+    db_service.add_chat_history(
+        customer_id=customer.id,
+        user_message=message,
+        bot_response=response_text,
+        context=conversation.context
+    )
+    db_service.db.close()
+    _stage_seconds.observe(time.perf_counter() - started, stage="history_write")
+
+    # Cleanup old conversations
+    conversation_manager.cleanup_old_conversations()
+    return response_text
+
+async def process_reply_job(job: Dict[str, Any]) -> None:
+    """Async reply mode: run the turn on a background worker and send the reply through Twilio."""
+    db = SessionLocal()
+    try:
+        try:
+            response_text = await handle_turn(DatabaseService(db), job["phone_number"], job["message"],
+                                              job.get("profile_mode"))
+        except Exception as e:
+            logger.error("Error processing background turn for %s: %s", job["phone_number"], e, exc_info=True)
+            response_text = TURN_FALLBACK_MESSAGE
+        await asyncio.to_thread(twilio_sender.send_message, job["reply_to"], job["reply_from"], response_text)
+    finally:
+        db.close()
+
+twilio_sender = TwilioMessageSender() if REPLY_MODE == "async" else None
+reply_pool = ReplyWorkerPool(process_reply_job, REPLY_WORKERS, REPLY_QUEUE_SIZE) if REPLY_MODE == "async" else None
+message_coalescer = MessageCoalescer() if COALESCE_ENABLED else None
+
+if IDEMPOTENCY_BACKEND == "database":
+    idempotency_store = DatabaseIdempotencyStore(SessionLocal)
+elif IDEMPOTENCY_BACKEND == "memory":
+    idempotency_store = InMemoryIdempotencyStore()
+else:
+    idempotency_store = None
+_coalescing_tasks = set()
+
+async def coalesce_and_submit(job: Dict[str, Any]) -> None:
+    """Async mode with coalescing: wait out the sender's burst, then queue one merged job."""
+    merged = await message_coalescer.submit(job["phone_number"], job["message"])
+    if merged is None:
+        return
+    job["message"] = merged
+    if not reply_pool.submit(job):
+        logger.warning("Reply queue is full, dropping merged turn for %s", job["phone_number"])
+        await asyncio.to_thread(twilio_sender.send_message, job["reply_to"], job["reply_from"], TURN_FALLBACK_MESSAGE)
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    global _metrics_flush_task, _warmup_task, _reservation_sweep_task
+    if turn_deadline_seconds < TURN_DEADLINE_SECONDS:
+        logger.warning("Turn deadline lowered from %.1fs to %.1fs so COALESCE_MAX_WAIT_SECONDS (%.1fs) fits in "
+                       "Twilio's webhook timeout; use REPLY_MODE=async to keep it",
+                       TURN_DEADLINE_SECONDS, turn_deadline_seconds, COALESCE_MAX_WAIT_SECONDS)
+    # Fails startup when migrations are missing (DB_SCHEMA_CHECK=verify)
+    await asyncio.to_thread(prepare_schema)
+    if reply_pool:
+        await reply_pool.start()
+    if metrics_store:
+        _metrics_flush_task = asyncio.create_task(flush_metrics_periodically())
+    catalog_listener.start()
+    if RESERVATION_SWEEP_SECONDS > 0:
+        _reservation_sweep_task = asyncio.create_task(release_expired_reservations_periodically())
+    # Runs after startup so /ready can answer (not ready) while the worker warms up
+    _warmup_task = asyncio.create_task(warmup.run())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup.stop()
+    if _warmup_task and not _warmup_task.done():
+        _warmup_task.cancel()
+    await asyncio.to_thread(catalog_listener.stop)
+    if _reservation_sweep_task:
+        _reservation_sweep_task.cancel()
+    if reply_pool:
+        await reply_pool.stop()
+    if _metrics_flush_task:
+        _metrics_flush_task.cancel()
+        metrics_store.write()
+    if twilio_sender:
+        twilio_sender.close()
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Bakery Chatbot API"}
 
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness for load balancers: 200 once warm-up has finished, 503 before and during shutdown."""
+    return JSONResponse(content=warmup.status(), status_code=200 if warmup.ready else 503)
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus") -> Response:
+    """Prometheus text exposition of all metrics (summed across workers); ?format=json for JSON."""
+    snapshot = await asyncio.to_thread(metrics_store.collect) if metrics_store else REGISTRY.snapshot()
+    if format == "json":
+        return JSONResponse(content=snapshot)
+    return Response(content=render_prometheus(snapshot), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def is_admin(password: Optional[str]) -> bool:
+    admin_password = get_settings().admin_password
+    return bool(admin_password and password and hmac.compare_digest(password.encode(), admin_password.encode()))
+
+def require_admin(x_admin_password: Optional[str] = Header(None)) -> None:
+    """Admin endpoints: require the X-Admin-Password header to match ADMIN_PASSWORD."""
+    if not get_settings().admin_password:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_PASSWORD is not set)")
+    if not is_admin(x_admin_password):
+        raise HTTPException(status_code=401, detail="Invalid admin password")
+
+@app.get("/admin/usage", dependencies=[Depends(require_admin)])
+async def usage(phone_number: Optional[str] = None) -> JSONResponse:
+    if phone_number:
+        conversation_usage = usage_tracker.get_conversation_usage(phone_number)
+        if conversation_usage is None:
+            raise HTTPException(status_code=404, detail="No usage recorded for this conversation")
+        return JSONResponse(content=conversation_usage)
+    return JSONResponse(content=usage_tracker.summary())
+
+@app.get("/admin/turns/{phone_number}", dependencies=[Depends(require_admin)])
+async def admin_turns(phone_number: str, limit: int = 20) -> JSONResponse:
+    """Flight recorder: slow turns (all workers) plus in-progress and recent turns (this worker) of a customer."""
+    if not flight_recorder:
+        raise HTTPException(status_code=404, detail="Flight recorder is disabled")
+    phone_number = phone_number.replace("whatsapp:", "")
+    turns = flight_recorder.turns(phone_number)
+    turns["slow"] = await asyncio.to_thread(flight_recorder.slow_turns, phone_number, limit)
+    turns["recent"] = turns["recent"][:limit]
+    return JSONResponse(content=turns)
+
+@app.get("/admin/profiling", dependencies=[Depends(require_admin)])
+async def profiling_state() -> JSONResponse:
+    return JSONResponse(content=profiler.state())
+
+@app.post("/admin/profiling", dependencies=[Depends(require_admin)])
+async def arm_profiling(turns: int = 1, mode: Optional[str] = None) -> JSONResponse:
+    """Profile the next `turns` turns handled by this worker (turns=0 disarms)."""
+    try:
+        return JSONResponse(content=profiler.arm(turns, mode))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles() -> JSONResponse:
+    summary_fields = ("id", "started_at", "duration_ms", "mode", "trigger", "phone_number", "agent", "error")
+    profiles = await asyncio.to_thread(profiler.list_profiles)
+    return JSONResponse(content=[{field: profile.get(field) for field in summary_fields} for profile in profiles])
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str) -> JSONResponse:
+    profile = profiler.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return JSONResponse(content=profile)
+
+@app.get("/admin/profiles/{profile_id}/download", dependencies=[Depends(require_admin)])
+async def download_profile(profile_id: str) -> FileResponse:
+    """The raw profile: cProfile stats (.prof, open with pstats or snakeviz) or folded stacks (.folded)."""
+    profile = profiler.get_profile(profile_id)
+    path = profiler.profile_path(profile["file"]) if profile and profile.get("file") else None
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=profile["file"], media_type="application/octet-stream")
+
+async def process_chat_message(db_service: DatabaseService, form_data: Any, phone_number: str, message: str,
+                               profile_mode: Optional[str] = None) -> Tuple[Response, Optional[str]]:
+    """
+    Run (or queue) the turn for a validated, first-time webhook delivery.
+
+    Returns the HTTP response and the reply text sent with it (None when nothing was sent).
+    """
+    # Async mode: acknowledge the webhook now and reply through the Twilio REST API
+    if reply_pool:
+        job = {
+            "phone_number": phone_number,
+            "message": message,
+            "reply_to": form_data.get("From"),
+            "reply_from": form_data.get("To"),
+            "profile_mode": profile_mode
+        }
+        if message_coalescer:
+            # Keep a reference so the task isn't garbage collected while it waits
+            task = asyncio.create_task(coalesce_and_submit(job))
+            _coalescing_tasks.add(task)
+            task.add_done_callback(_coalescing_tasks.discard)
+            return response_service.create_empty_twiml_response(), None
+        if reply_pool.submit(job):
+            return response_service.create_empty_twiml_response(), None
+        logger.warning("Reply queue is full, processing turn inline")
+
+    # Merge bursts of messages into one turn; only the last request of a burst replies
+    if message_coalescer:
+        message = await message_coalescer.submit(phone_number, message)
+        if message is None:
+            return response_service.create_empty_twiml_response(), None
+
+    response_text = await handle_turn(db_service, phone_number, message, profile_mode)
+    
+    # Return response based on input format
+    started = time.perf_counter()
+    response = response_service.create_response(response_text)
+    _stage_seconds.observe(time.perf_counter() - started, stage="render")
+    return response, response_text
+
 @app.post("/chat")
 async def chat(
     request: Request,
     db: Session = Depends(get_db)
 ) -> Response:
     try:
-        logger.info("\n=== Request received ===")
-        
         # Initialize database service
         db_service = DatabaseService(db)
         
-        # Log raw request details
-        logger.info(f"Headers: {dict(request.headers)}")
+        # Raw request details (contain customer data) are only logged at DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Headers: %s", dict(request.headers))
         
         # Parse form data from Twilio
+        started = time.perf_counter()
         form_data = await request.form()
-        logger.info(f"Form data: {dict(form_data)}")
+        _stage_seconds.observe(time.perf_counter() - started, stage="form_parse")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Form data: %s", dict(form_data))
         
         # Extract phone number from the From field (format: whatsapp:+1234567890)
         phone_number = form_data.get("From", "").replace("whatsapp:", "")
@@ -81,36 +386,40 @@ async def chat(
             logger.error(error_msg)
             return response_service.create_error_response(error_msg)
 
-        logger.info(f"Phone number: {phone_number}")
-        logger.info(f"Message: {message}")
-        
-        # Get or create customer
-        customer = db_service.get_customer_by_phone(phone_number)
-        if not customer:
-            customer = db_service.create_customer(phone_number)
-        
-        # Get or create conversation for this phone number
-        conversation = conversation_manager.get_conversation(phone_number)
-        
-        # Process the message with conversation context
-        response_text = await chat_service.process_message(message, conversation)
-        
-        # Store chat history
-        db_service.add_chat_history(
-            customer_id=customer.id,
-            user_message=message,
-            bot_response=response_text,
-            context=conversation.context
-        )
-        
-        # Cleanup old conversations
-        conversation_manager.cleanup_old_conversations()
-        
-        # Return response based on input format
-        return response_service.create_response(response_text)
+        logger.info("Message from %s (%d chars)", phone_number, len(message))
+
+        # Operators can profile a turn they send themselves: X-Profile: cprofile|sampling (admin only)
+        profile_mode = request.headers.get("X-Profile")
+        if profile_mode and not is_admin(request.headers.get("X-Admin-Password")):
+            profile_mode = None
+
+        # Twilio retries slow webhooks with the same MessageSid; never run a turn twice
+        message_sid = form_data.get("MessageSid") if idempotency_store else None
+        if message_sid and not await idempotency_store.claim(message_sid):
+            logger.info("Duplicate delivery of %s", message_sid)
+            if reply_pool:
+                # The reply is (or will be) sent through the REST API by the first delivery
+                record_duplicate("acknowledged")
+                return response_service.create_empty_twiml_response()
+            done, cached_response = await idempotency_store.wait(message_sid, IDEMPOTENCY_WAIT_SECONDS)
+            record_duplicate("cached" if done else "timeout")
+            if done and cached_response:
+                return response_service.create_response(cached_response)
+            return response_service.create_empty_twiml_response()
+
+        try:
+            response, reply_text = await process_chat_message(db_service, form_data, phone_number, message,
+                                                              profile_mode)
+        except Exception:
+            if message_sid:
+                await idempotency_store.release(message_sid)
+            raise
+        if message_sid:
+            await idempotency_store.complete(message_sid, reply_text)
+        return response
             
     except Exception as e:
-        logger.error(f"Unexpected error in /chat endpoint: {str(e)}", exc_info=True)
+        logger.error("Unexpected error in /chat endpoint: %s", e, exc_info=True)
         return response_service.create_error_response(f"Internal server error: {str(e)}")
 
 if __name__ == "__main__":
@@ -7,6 +7,8 @@ class Conversation:
         self.context: Dict[str, any] = {}
         self.last_updated: datetime = datetime.now()
         self.phone_number: str = phone_number
+        self.customer_profile: Dict[str, any] = {}  # Refreshed from the database on every turn
+        self.agent: Optional[any] = None  # Agent the conversation was transferred to; None for the initial agent
     
     def add_message(self, role: str, content: str) -> None:
         self.messages.append({"role": role, "content": content})
@@ -18,6 +20,7 @@ class Conversation:
     def clear(self) -> None:
         self.messages = []
         self.context = {}
+        self.agent = None
 
 class ConversationManager:
     def __init__(self, max_age_hours: int = 24):
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Enum, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -23,6 +23,9 @@ class Product(Base):
     description = Column(Text)
     quantity = Column(Integer, default=0)
     image = Column(String, nullable=True)  # URL or path to the image
+    # Hash of the sheet row last synced into this product (see app/services/inventory_sync.py);
+    # cleared by manual edits so the next sync rewrites the row
+    content_hash = Column(String(32), nullable=True)
     
     def to_dict(self):
         return {
@@ -124,4 +127,27 @@ class ChatHistory(Base):
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    context = Column(JSON)  # Store conversation context 
\ No newline at end of file
+    context = Column(JSON)  # Store conversation context 
+
+class ProcessedMessage(Base):
+    __tablename__ = "processed_messages"
+
+    message_sid = Column(String, primary_key=True)  # Twilio MessageSid of the inbound webhook
+    status = Column(String, nullable=False)  # 'processing' or 'done'
+    response = Column(Text)  # Reply sent for this message, if any
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey('products.id', ondelete="CASCADE"), nullable=False)
+    order_id = Column(Integer, ForeignKey('orders.id'), index=True)
+    quantity = Column(Integer, nullable=False)
+    # 'held' (taken from products.quantity until expires_at), 'committed' (paid),
+    # 'released' or 'expired' (given back); see app/services/reservation_service.py
+    status = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index('ix_stock_reservations_status_expires_at', 'status', 'expires_at'),)
@@ -0,0 +1,233 @@
+from typing import Dict, List, Optional, Callable
+from collections import OrderedDict
+from difflib import SequenceMatcher
+import os
+import re
+import threading
+import time
+import logging
+from app.utils.tools.customer import get_faq
+from app.utils.metrics import counter, gauge
+from app.config.settings import ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+FAQ_PATH = 'app/faq.txt'
+
+# Words that carry no meaning for matching ("hi, what are your hours please?")
+FILLER_WORDS = {"hi", "hello", "hey", "please", "pls", "plz", "thanks", "thx", "ok", "okay", "um", "so"}
+
+# Function words ignored when comparing what two questions are about; every other word
+# ("cancel", "cookie", "not") has to match for a cached answer to be served
+STOP_WORDS = {
+    "a", "an", "the", "i", "me", "my", "we", "our", "you", "your", "it", "its", "this", "that", "there",
+    "is", "are", "am", "was", "be", "do", "does", "did", "can", "could", "will", "would", "may", "should",
+    "have", "has", "to", "of", "on", "in", "at", "for", "with", "and", "or", "any", "some",
+    "what", "when", "where", "which", "who", "how",
+}
+
+_lookups = counter("answer_cache_lookups_total", "Messages checked against the answer cache")
+_hits = counter("answer_cache_hits_total", "Messages answered from the answer cache", ("source",))
+_hit_ratio = gauge("answer_cache_hit_ratio", "Fraction of looked-up messages answered from the cache",
+                   multiprocess_mode="all")
+_latency_saved = counter("answer_cache_latency_saved_seconds_total",
+                         "Estimated seconds saved by skipping the LLM turn")
+
+def normalize_question(text: str) -> str:
+    """
+    Normalize a message for matching: lowercase, strip punctuation and filler words.
+
+    Args:
+        text (str): Raw customer message
+
+    Returns:
+        str: Normalized message, e.g. "Hi! What are your opening hours??" -> "what are your opening hours"
+    """
+    words = re.sub(r"[^a-z0-9\s]", " ", text.lower()).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+def content_words(normalized: str) -> frozenset:
+    """
+    The words that say what a normalized question is about, plurals folded.
+
+    Args:
+        normalized (str): Output of normalize_question
+
+    Returns:
+        frozenset: e.g. "can i place custom cake orders" -> {"place", "custom", "cake", "order"}
+    """
+    words = (word for word in normalized.split() if word not in STOP_WORDS)
+    return frozenset(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+                     for word in words)
+
+class CachedAnswer:
+    def __init__(self, answer: str, source: str, score: float, question: str):
+        self.answer = answer
+        self.source = source  # 'faq' or 'approved'
+        self.score = score
+        self.question = question
+
+class AnswerCache:
+    """
+    Matches incoming messages against the FAQ and recently approved answers so
+    near-verbatim questions can be answered without an LLM round trip.
+
+    A candidate only matches when it has the same content words as the message (see
+    content_words) and a character similarity of at least `threshold`, so "Can I cancel
+    custom cake orders?" is not answered as "Can I place custom cake orders?". Approved
+    answers are kept in process memory: each worker has its own, and they are lost on restart.
+    """
+
+    def __init__(self,
+                 threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 faq_loader: Callable[[], List[Dict[str, str]]] = get_faq,
+                 faq_path: Optional[str] = FAQ_PATH):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.faq_loader = faq_loader
+        self.faq_path = faq_path
+        self._faq: Dict[str, Dict[str, str]] = {}
+        self._faq_mtime: Optional[float] = None
+        self._approved: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._avg_llm_turn_seconds: Optional[float] = None
+        self._lookup_count = 0
+        self._hit_count = 0
+
+    def _refresh_faq(self) -> None:
+        """Reload the FAQ entries when the FAQ file changed (or on first use)."""
+        try:
+            mtime = os.path.getmtime(self.faq_path) if self.faq_path else 0.0
+        except OSError:
+            mtime = 0.0
+        if self._faq_mtime is not None and mtime == self._faq_mtime:
+            return
+        self._faq = {
+            normalize_question(item["question"]): item
+            for item in self.faq_loader()
+        }
+        self._faq_mtime = mtime
+
+    def _expire_approved(self, now: float) -> None:
+        expired = [key for key, entry in self._approved.items() if now - entry["approved_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._approved[key]
+
+    def _best_match(self, normalized: str, candidates: List[str]) -> Optional[tuple]:
+        """Return (key, score) of the most similar candidate key about the same things, if any."""
+        best = None
+        words = content_words(normalized)
+        for key in candidates:
+            if content_words(key) != words:
+                continue
+            matcher = SequenceMatcher(None, normalized, key)
+            # quick_ratio is an upper bound on ratio and much cheaper to compute
+            if matcher.quick_ratio() < self.threshold:
+                continue
+            score = matcher.ratio()
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def lookup(self, message: str) -> Optional[CachedAnswer]:
+        """
+        Find a cached answer for the message.
+
+        Args:
+            message (str): Raw customer message
+
+        Returns:
+            Optional[CachedAnswer]: The matched answer, or None if nothing is similar enough
+        """
+        normalized = normalize_question(message)
+        result = None
+        with self._lock:
+            self._lookup_count += 1
+            if normalized:
+                now = time.time()
+                self._expire_approved(now)
+                self._refresh_faq()
+
+                if normalized in self._approved:
+                    entry = self._approved[normalized]
+                    self._approved.move_to_end(normalized)
+                    result = CachedAnswer(entry["answer"], "approved", 1.0, entry["question"])
+                elif normalized in self._faq:
+                    item = self._faq[normalized]
+                    result = CachedAnswer(item["answer"], "faq", 1.0, item["question"])
+                else:
+                    approved = self._best_match(normalized, list(self._approved))
+                    faq = self._best_match(normalized, list(self._faq))
+                    # FAQ answers are the final authority on store policy, so prefer them on ties
+                    if faq and (not approved or faq[1] >= approved[1]):
+                        item = self._faq[faq[0]]
+                        result = CachedAnswer(item["answer"], "faq", faq[1], item["question"])
+                    elif approved:
+                        entry = self._approved[approved[0]]
+                        result = CachedAnswer(entry["answer"], "approved", approved[1], entry["question"])
+
+            if result:
+                self._hit_count += 1
+            hit_ratio = self._hit_count / self._lookup_count
+
+        _lookups.inc()
+        _hit_ratio.set(hit_ratio)
+        if result:
+            _hits.inc(source=result.source)
+            logger.info("Answer cache hit (%s, score=%.2f): %s", result.source, result.score, result.question)
+        return result
+
+    def approve(self, question: str, answer: str) -> bool:
+        """
+        Store an approved answer so future matching questions are served from the cache.
+
+        Args:
+            question (str): The customer question the answer applies to
+            answer (str): The approved answer text
+
+        Returns:
+            bool: True if the answer was stored, False if the question is empty after normalization
+        """
+        normalized = normalize_question(question)
+        if not normalized or not answer.strip():
+            return False
+        with self._lock:
+            self._approved[normalized] = {
+                "question": question,
+                "answer": answer.strip(),
+                "approved_at": time.time()
+            }
+            self._approved.move_to_end(normalized)
+            while len(self._approved) > self.max_entries:
+                self._approved.popitem(last=False)
+        return True
+
+    def record_llm_turn(self, seconds: float) -> None:
+        """Track a moving average of full LLM turn latency, used to estimate time saved by hits."""
+        with self._lock:
+            if self._avg_llm_turn_seconds is None:
+                self._avg_llm_turn_seconds = seconds
+            else:
+                self._avg_llm_turn_seconds = 0.9 * self._avg_llm_turn_seconds + 0.1 * seconds
+
+    def record_hit_latency(self, seconds: float) -> None:
+        """Record how long a cache hit took, crediting the difference to the latency-saved metric."""
+        if self._avg_llm_turn_seconds is not None:
+            _latency_saved.inc(max(self._avg_llm_turn_seconds - seconds, 0.0))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "lookups": self._lookup_count,
+                "hits": self._hit_count,
+                "hit_ratio": self._hit_count / self._lookup_count if self._lookup_count else 0.0,
+                "approved_entries": len(self._approved),
+                "faq_entries": len(self._faq),
+                "avg_llm_turn_seconds": self._avg_llm_turn_seconds or 0.0,
+            }
+
+# Shared instance used by the chat pipeline and the admin approval tool
+answer_cache = AnswerCache()
@@ -0,0 +1,225 @@
+from typing import Any, Callable, Iterable, Optional, Tuple
+import os
+import select as select_module
+import threading
+import time
+import logging
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.models.database import Product
+from app.utils.metrics import counter
+from app.config.settings import (
+    CATALOG_CACHE_TTL_SECONDS, CATALOG_MAX_PRODUCTS, CATALOG_LOW_STOCK, CATALOG_DESCRIPTION_CHARS,
+    CATALOG_NOTIFY_CHANNEL
+)
+
+logger = logging.getLogger(__name__)
+
+_lookups = counter("catalog_cache_lookups_total", "Product catalog reads by cache outcome", ("outcome",))
+_invalidations = counter("catalog_cache_invalidations_total", "Product catalog cache invalidations", ("source",))
+
+def availability(quantity: Optional[int], low_stock: int = CATALOG_LOW_STOCK) -> str:
+    """Stock level as told to customers."""
+    if not quantity or quantity <= 0:
+        return "sold out"
+    if quantity <= low_stock:
+        return f"limited ({quantity} left)"
+    return "in stock"
+
+def render_catalog(products: Iterable[Tuple[str, float, Optional[str], Optional[int]]], total: int,
+                   description_chars: int = CATALOG_DESCRIPTION_CHARS) -> str:
+    """
+    The catalog as tool output for the LLM: one line per product, in-stock products first.
+
+    Args:
+        products (Iterable[Tuple]): (name, price, description, quantity) of the products to list
+        total (int): Number of products in the catalog, to mention the ones left out
+        description_chars (int): Descriptions are cut to this many characters
+    """
+    lines = []
+    for name, price, description, quantity in products:
+        description = " ".join((description or "").split())
+        if len(description) > description_chars:
+            description = description[:description_chars - 3].rstrip() + "..."
+        line = f"{name} | ${price:.2f} | {availability(quantity)}"
+        lines.append(f"{line} | {description}" if description else line)
+    if not lines:
+        return "No cakes are available right now."
+    header = "Cakes (name | price | availability | description):"
+    if total > len(lines):
+        lines.append(f"...and {total - len(lines)} more products not listed")
+    return "\n".join([header] + lines)
+
+def load_catalog(db: Session, max_products: int = CATALOG_MAX_PRODUCTS) -> str:
+    """Read the products table and render it with render_catalog."""
+    rows = db.execute(
+        select(Product.name, Product.price, Product.description, Product.quantity)
+        .order_by((Product.quantity > 0).desc(), Product.id)
+        .limit(max_products)
+    ).all()
+    total = db.execute(select(func.count(Product.id))).scalar_one()
+    return render_catalog(rows, total)
+
+class CatalogCache:
+    """
+    Read-through cache of the rendered product catalog.
+
+    The first read after an invalidation (or after `ttl_seconds`, a backstop for changes
+    made outside the app) loads the catalog; concurrent readers wait for that one load. A
+    load that overlaps an invalidation is returned but not cached. If the database cannot
+    be read, the last catalog served is returned instead of an error.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], ttl_seconds: float = CATALOG_CACHE_TTL_SECONDS,
+                 max_products: int = CATALOG_MAX_PRODUCTS):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_products = max_products
+        self._text: Optional[str] = None
+        self._last_text: Optional[str] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def _cached(self) -> Optional[str]:
+        with self._lock:
+            if self._text is not None and time.monotonic() < self._expires_at:
+                return self._text
+        return None
+
+    def get(self) -> str:
+        text = self._cached()
+        if text is not None:
+            _lookups.inc(outcome="hit")
+            return text
+
+        with self._load_lock:
+            # Loaded by another thread while this one waited
+            text = self._cached()
+            if text is not None:
+                _lookups.inc(outcome="hit")
+                return text
+            with self._lock:
+                generation = self._generation
+            try:
+                with self.session_factory() as db:
+                    text = load_catalog(db, self.max_products)
+            except Exception:
+                if self._last_text is None:
+                    raise
+                logger.exception("Loading the product catalog failed; serving the previous catalog")
+                _lookups.inc(outcome="stale")
+                return self._last_text
+            with self._lock:
+                if generation == self._generation:
+                    self._text, self._expires_at = text, time.monotonic() + self.ttl_seconds
+                self._last_text = text
+            _lookups.inc(outcome="miss")
+            return text
+
+    def invalidate(self, source: str = "local") -> None:
+        with self._lock:
+            self._generation += 1
+            self._text = None
+        _invalidations.inc(source=source)
+
+def _session_factory() -> Session:
+    # app.database creates the engine; imported on first load so this module imports without it
+    from app.database import SessionLocal
+    return SessionLocal()
+
+catalog_cache = CatalogCache(_session_factory)
+
+def catalog_changed(db: Session) -> None:
+    """
+    Invalidate the catalog after a committed change to the products table.
+
+    On PostgreSQL the other workers are told through NOTIFY on CATALOG_NOTIFY_CHANNEL
+    (see CatalogChangeListener); failing to notify them is logged, not raised, as the
+    change itself is already committed.
+    """
+    catalog_cache.invalidate()
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    try:
+        db.execute(select(func.pg_notify(CATALOG_NOTIFY_CHANNEL, str(os.getpid()))))
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Notifying other workers of the catalog change failed")
+
+class CatalogChangeListener:
+    """
+    Invalidates the catalog cache when another worker changes the products table.
+
+    A background thread holds a dedicated PostgreSQL connection that LISTENs on the
+    channel. Notifications sent by this process are ignored (catalog_changed already
+    invalidated the cache); after a lost connection the cache is invalidated once more,
+    as notifications may have been missed, and the thread reconnects.
+    """
+
+    def __init__(self, engine: Engine, cache: CatalogCache = catalog_cache, channel: str = CATALOG_NOTIFY_CHANNEL,
+                 poll_seconds: float = 1.0, reconnect_seconds: float = 5.0):
+        self.engine = engine
+        self.cache = cache
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.reconnect_seconds = reconnect_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    def start(self) -> None:
+        if not self.supported or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="catalog-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_seconds + 1)
+            self._thread = None
+
+    def handle_notifications(self, connection: Any) -> int:
+        """Consume pending notifications of a psycopg2 connection; returns how many came from other processes."""
+        connection.poll()
+        received = 0
+        while connection.notifies:
+            notification = connection.notifies.pop(0)
+            if notification.payload != str(os.getpid()):
+                received += 1
+        if received:
+            self.cache.invalidate(source="notify")
+        return received
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            connection = None
+            try:
+                # A dedicated connection: it stays checked out for as long as the worker runs
+                connection = self.engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                logger.info("Listening for catalog changes on %s", self.channel)
+                while not self._stop.is_set():
+                    if select_module.select([dbapi_connection], [], [], self.poll_seconds)[0]:
+                        self.handle_notifications(dbapi_connection)
+            except Exception:
+                logger.exception("Catalog change listener failed; reconnecting in %.0fs", self.reconnect_seconds)
+                self.cache.invalidate(source="reconnect")
+                self._stop.wait(self.reconnect_seconds)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
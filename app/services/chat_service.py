@@ -1,58 +1,314 @@
-from typing import Dict, List, Any, Tuple
-from openai import OpenAI
+from typing import Dict, List, Any, Tuple, Optional
+from openai import AsyncOpenAI, APITimeoutError
 from app.utils.tools.agents import Agent
-from app.utils.function_schemas import function_to_schema
+from app.utils.function_schemas import get_tool_schemas
 from app.models import Conversation
+from app.services.answer_cache_service import AnswerCache
+from app.services.usage_service import UsageTracker
+from app.services.rate_limiter import LLMAdmissionController, AdmissionRejected, estimate_tokens
+from app.services.resilience import ResilientLLMClient, CircuitOpenError, retry_reason
+from app.services.model_router import ModelRouter, Route
+from app.services.hedging import Hedger
+from app.services.llm_backend import LLMBackend, OpenAIBackend
+from app.services.flight_recorder import FlightRecorder
+from app.services.profiling import Profiler
+from app.utils.metrics import counter, histogram
+from app.utils.logging_config import LazyJson
+from app.config.settings import (
+    TURN_DEADLINE_SECONDS, TURN_MAX_ITERATIONS, TURN_FALLBACK_MESSAGE, LLM_SHED_MESSAGE,
+    LLM_ATTEMPT_TIMEOUT_SECONDS, LLM_UNAVAILABLE_MESSAGE, LOG_TRANSCRIPT_SAMPLE_RATE, LLM_ATTEMPTS_BEFORE_FALLBACK
+)
+import asyncio
 import json
+import random
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+_turn_llm_calls = histogram(
+    "chat_turn_llm_calls", "OpenAI calls needed to complete one conversation turn",
+    ("first_turn", "profile_preloaded"), buckets=(1, 2, 3, 4, 6, 8, 12)
+)
+_route_fallbacks = counter(
+    "llm_route_fallbacks_total", "OpenAI calls retried on the other model tier", ("agent", "route", "model")
+)
+_budget_exhausted = counter(
+    "chat_turn_budget_exhausted_total", "Turns cut short by the deadline or iteration budget", ("agent", "reason")
+)
+_stage_seconds = histogram("chat_stage_seconds", "Time spent in each stage of a /chat request", ("stage",))
+_tool_calls = counter("tool_calls_total", "Tool invocations", ("agent", "tool", "outcome"))
+_transfers = counter("agent_transfers_total", "Hand-offs between agents", ("from_agent", "to_agent"))
+
+class TurnBudgetExceeded(Exception):
+    """Raised when a turn runs out of wall-clock time or LLM iterations."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Turn budget exceeded: {reason}")
+        self.reason = reason  # 'deadline' or 'max_iterations'
+
 class ChatService:
-    def __init__(self, openai_client: OpenAI, initial_agent: Agent):
+    def __init__(self, openai_client: Optional[AsyncOpenAI], initial_agent: Agent, answer_cache: Optional[AnswerCache] = None,
+                 usage_tracker: Optional[UsageTracker] = None,
+                 turn_deadline_seconds: float = TURN_DEADLINE_SECONDS,
+                 max_iterations: int = TURN_MAX_ITERATIONS,
+                 fallback_message: str = TURN_FALLBACK_MESSAGE,
+                 admission: Optional[LLMAdmissionController] = None,
+                 shed_message: str = LLM_SHED_MESSAGE,
+                 resilience: Optional[ResilientLLMClient] = None,
+                 attempt_timeout_seconds: float = LLM_ATTEMPT_TIMEOUT_SECONDS,
+                 unavailable_message: str = LLM_UNAVAILABLE_MESSAGE,
+                 model_router: Optional[ModelRouter] = None,
+                 hedger: Optional[Hedger] = None,
+                 backend: Optional[LLMBackend] = None,
+                 transcript_sample_rate: float = LOG_TRANSCRIPT_SAMPLE_RATE,
+                 flight_recorder: Optional[FlightRecorder] = None,
+                 profiler: Optional[Profiler] = None):
         self.client = openai_client
+        self.backend = backend or OpenAIBackend(openai_client)
         self.initial_agent = initial_agent
-        self.current_agent = initial_agent
-
-    def _print_messages(self, messages: List[Dict[str, Any]]) -> None:
-        """Print messages in a readable format for debugging."""
-        print("\n=== Messages being sent to OpenAI ===")
-        for msg in messages:
-            print(f"Role: {msg['role']}")
-            print(f"Content: {msg['content']}")
-            if 'tool_calls' in msg:
-                print(f"Tool calls: {msg['tool_calls']}")
-            print("---")
-        print("===================================\n")
-
-    def _execute_tool_call(self, tool_call: Any, tools: Dict[str, Any]) -> Any:
+        self.answer_cache = answer_cache
+        self.usage_tracker = usage_tracker or UsageTracker()
+        self.turn_deadline_seconds = turn_deadline_seconds
+        self.max_iterations = max_iterations
+        self.fallback_message = fallback_message
+        self.admission = admission
+        self.shed_message = shed_message
+        self.resilience = resilience
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.unavailable_message = unavailable_message
+        self.model_router = model_router or ModelRouter()
+        self.hedger = hedger
+        self.transcript_sample_rate = transcript_sample_rate
+        self.flight_recorder = flight_recorder
+        self.profiler = profiler
+
+    def _sample_transcript(self) -> bool:
+        """Whether to log the full messages of this turn (always at DEBUG, else a sampled fraction)."""
+        if logger.isEnabledFor(logging.DEBUG):
+            return True
+        return bool(self.transcript_sample_rate) and random.random() < self.transcript_sample_rate \
+            and logger.isEnabledFor(logging.INFO)
+
+    def _log_transcript(self, conversation: Conversation, agent: Agent, messages: List[Dict[str, Any]]) -> None:
+        """Log the messages sent to the LLM as one JSON record."""
+        logger.info("Transcript for %s (%s, %d messages): %s", conversation.phone_number,
+                    agent.name, len(messages), LazyJson(list(messages)))
+
+    def _format_customer_profile(self, profile: Dict[str, Any]) -> str:
+        """Render the preloaded customer profile as a compact block for the system message."""
+        lines = [
+            "Customer profile (already loaded - do not call get_customer_by_phone):",
+            f"- id: {profile['id']}",
+            f"- name: {profile['name'] or 'unknown'}",
+        ]
+        if profile.get("preferences"):
+            lines.append(f"- preferences: {json.dumps(profile['preferences'], separators=(',', ':'))}")
+        if profile.get("recent_orders"):
+            lines.append("- recent orders:")
+            for order in profile["recent_orders"]:
+                line = (f"  - #{order['order_id']} {order['type']} ${order['amount'] or 0:.2f} "
+                        f"{order['status']}/{order['payment_status']} ({order['created_at']})")
+                if order.get("summary"):
+                    line += f": {order['summary']}"
+                lines.append(line)
+        else:
+            lines.append("- recent orders: none")
+        return "\n".join(lines)
+
+    def agent_for(self, conversation: Conversation) -> Agent:
+        """
+        The agent answering a conversation: the last one it was transferred to, else the initial agent.
+
+        Kept on the conversation rather than the service, which is shared by concurrent turns.
+        """
+        return conversation.agent or self.initial_agent
+
+    def _build_system_message(self, conversation: Conversation, agent: Agent) -> str:
+        """Build the system message for the agent and conversation."""
+        system_message = f"{agent.instructions}\n\nCustomer phone number: {conversation.phone_number}"
+        if conversation.customer_profile:
+            system_message += f"\n\n{self._format_customer_profile(conversation.customer_profile)}"
+        return system_message
+
+    def _execute_tool_call(self, tool_call: Any, tools: Dict[str, Any], conversation: Conversation,
+                           agent_name: str) -> Any:
         """Execute a tool call and return the result."""
         name = tool_call.function.name
         args = json.loads(tool_call.function.arguments)
-        print(f"{self.current_agent.name}:", f"{name}({args})")
-        return tools[name](**args)
+        logger.debug("%s: %s(%s)", agent_name, name, args)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = tools[name](**args)
+            outcome = "transfer" if isinstance(result, Agent) else "ok"
+            return result
+        finally:
+            _tool_calls.inc(agent=agent_name, tool=name, outcome=outcome)
+            self.usage_tracker.record_tool_call(conversation.phone_number, agent_name, name,
+                                                time.perf_counter() - started)
+
+    def _remaining(self, deadline: float) -> float:
+        """Seconds left before the turn deadline; raises TurnBudgetExceeded once it has passed."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TurnBudgetExceeded("deadline")
+        return remaining
+
+    async def _with_deadline(self, awaitable: Any, deadline: float, timeout: Optional[float] = None) -> Any:
+        """
+        Await with the remaining turn time, cancelling the awaitable when the deadline passes.
+
+        With a `timeout` shorter than the remaining time, hitting it raises asyncio.TimeoutError
+        (a retryable attempt timeout) rather than TurnBudgetExceeded.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise TurnBudgetExceeded("deadline")
+        try:
+            return await asyncio.wait_for(awaitable, timeout=min(timeout or remaining, remaining))
+        except (asyncio.TimeoutError, APITimeoutError):
+            if time.monotonic() >= deadline:
+                raise TurnBudgetExceeded("deadline")
+            raise asyncio.TimeoutError()
+
+    async def _send_completion(self, model: str, messages: List[Dict[str, Any]], tool_schemas: List[Dict[str, Any]],
+                               deadline: float) -> Tuple[Any, float]:
+        """Send one chat completion request; returns the response and its latency."""
+        started = time.perf_counter()
+        # The HTTP timeout and wait_for both use the attempt timeout capped at the remaining
+        # turn time, so a slow call is cancelled in flight instead of holding the webhook open
+        timeout = min(self.attempt_timeout_seconds, self._remaining(deadline))
+        response = await self._with_deadline(
+            self.backend.create(
+                model=model,
+                messages=messages,
+                tools=tool_schemas,
+                timeout=timeout,
+            ),
+            deadline,
+            timeout
+        )
+        return response, time.perf_counter() - started
+
+    async def _admit_and_send(self, model: str, messages: List[Dict[str, Any]], tool_schemas: List[Dict[str, Any]],
+                              deadline: float) -> Tuple[Any, float]:
+        """Send one chat completion attempt through admission control (when configured)."""
+        if not self.admission:
+            return await self._send_completion(model, messages, tool_schemas, deadline)
+
+        estimated = estimate_tokens(messages, tool_schemas)
+        async with self.admission.slot(estimated, timeout=self._remaining(deadline)):
+            response, latency = await self._send_completion(model, messages, tool_schemas, deadline)
+        if getattr(response, "usage", None):
+            self.admission.reconcile(estimated, response.usage.total_tokens)
+        return response, latency
+
+    async def _send_attempt(self, model: str, messages: List[Dict[str, Any]], tool_schemas: List[Dict[str, Any]],
+                            deadline: float) -> Tuple[Any, float, str]:
+        """Send one attempt, hedged when configured; returns the response, its latency and the model that answered."""
+        if not self.hedger:
+            response, latency = await self._admit_and_send(model, messages, tool_schemas, deadline)
+            return response, latency, model
+
+        hedge_model = self.hedger.hedge_model or model
+        started = time.perf_counter()
+        (response, latency), hedged = await self.hedger.run(
+            model,
+            lambda: self._admit_and_send(model, messages, tool_schemas, deadline),
+            lambda: self._admit_and_send(hedge_model, messages, tool_schemas, deadline)
+        )
+        if hedged:
+            # What the customer waited for, not just the hedge's own round trip
+            return response, time.perf_counter() - started, hedge_model
+        return response, latency, model
+
+    async def _call_model(self, model: str, messages: List[Dict[str, Any]], tool_schemas: List[Dict[str, Any]],
+                          deadline: float, max_attempts: Optional[int] = None) -> Tuple[Any, float, str]:
+        """Call one model, retrying transient failures through the resilient client (when configured)."""
+        if not self.resilience:
+            return await self._send_attempt(model, messages, tool_schemas, deadline)
+        # Every attempt is admitted separately so retries count against the rate limits
+        return await self.resilience.call(
+            lambda: self._send_attempt(model, messages, tool_schemas, deadline),
+            deadline, key=model, max_attempts=max_attempts
+        )
+
+    async def _create_completion(self, route: Route, messages: List[Dict[str, Any]],
+                                 tool_schemas: List[Dict[str, Any]], deadline: float,
+                                 agent_name: str) -> Tuple[Any, float, str]:
+        """
+        Send a chat completion on the routed model, falling back to the other tier on errors or timeouts.
+
+        Returns the response, its latency and the model that answered.
+        """
+        try:
+            # A transient error (e.g. one 429) is retried on the same model before switching tiers;
+            # the fallback keeps the rest of the deadline for the other model
+            return await self._call_model(route.model, messages, tool_schemas, deadline,
+                                          max_attempts=LLM_ATTEMPTS_BEFORE_FALLBACK if route.fallback_model else None)
+        except Exception as e:
+            if not route.fallback_model or not (isinstance(e, CircuitOpenError) or retry_reason(e)):
+                raise
+            _route_fallbacks.inc(agent=agent_name, route=route.name, model=route.fallback_model)
+            logger.warning("%s failed on the %s route (%s), falling back to %s",
+                           route.model, route.name, e, route.fallback_model)
+        return await self._call_model(route.fallback_model, messages, tool_schemas, deadline)
 
     async def _run_full_turn(self, messages: List[Dict[str, Any]], conversation: Conversation) -> Tuple[Dict[str, Any], Agent]:
         """Run a complete conversation turn with OpenAI API."""
         messages = messages.copy()
+        first_turn = len(messages) == 1
+        llm_calls = 0
+        tool_iterations = 0
+        turn_started = time.perf_counter()
+        deadline = time.monotonic() + self.turn_deadline_seconds
+        log_transcript = self._sample_transcript()
+        # Local to the turn: other conversations' turns interleave with this one at every await
+        agent = self.agent_for(conversation)
+        trace = self.flight_recorder.start_turn(conversation.phone_number, agent.name) \
+            if self.flight_recorder else None
+        outcome = "cancelled"
+        completed_tools: List[str] = []
         try:
             # Create tool schemas and mapping
-            tool_schemas = [function_to_schema(tool) for tool in self.current_agent.tools]
-            tools_map = {tool.__name__: tool for tool in self.current_agent.tools}
+            stage_started = time.perf_counter()
+            tool_schemas = get_tool_schemas(agent.tools)
+            tools_map = {tool.__name__: tool for tool in agent.tools}
 
             while True:
+                if llm_calls >= self.max_iterations:
+                    raise TurnBudgetExceeded("max_iterations")
+
                 # Get completion from OpenAI
-                print(f"Current agent: {self.current_agent.name}")
-                system_message = f"{self.current_agent.instructions}\n\nCustomer phone number: {conversation.phone_number}"
+                system_message = self._build_system_message(conversation, agent)
                 full_messages = [{"role": "system", "content": system_message}] + messages
-                self._print_messages(full_messages)
+                if log_transcript:
+                    self._log_transcript(conversation, agent, full_messages)
                 
-                response = self.client.chat.completions.create(
-                    model=self.current_agent.model,
-                    messages=full_messages,
-                    tools=tool_schemas,
+                route = self.model_router.select(agent, messages)
+                _stage_seconds.observe(time.perf_counter() - stage_started, stage="prompt_build")
+                stage_started = time.perf_counter()
+                response, latency, model = await self._create_completion(route, full_messages, tool_schemas, deadline,
+                                                                         agent.name)
+                _stage_seconds.observe(time.perf_counter() - stage_started, stage="llm_call")
+                llm_calls += 1
+                usage = getattr(response, "usage", None)
+                self.usage_tracker.record_llm_call(
+                    conversation.phone_number, agent.name, model,
+                    usage, latency, tool_iterations, route=route.name
                 )
                 message = response.choices[0].message
+                if trace:
+                    trace.add_span(
+                        "llm_call", stage_started, time.perf_counter() - stage_started,
+                        agent=agent.name, route=route.name, model=model,
+                        prompt_tokens=getattr(usage, "prompt_tokens", None),
+                        completion_tokens=getattr(usage, "completion_tokens", None),
+                        tool_calls=[tc.function.name for tc in message.tool_calls or []]
+                    )
 
                 # Prepare assistant message
                 assistant_message = {
@@ -74,17 +330,52 @@ class ChatService:
                 messages.append(assistant_message)
 
                 if not message.tool_calls:
-                    return assistant_message, self.current_agent
+                    _turn_llm_calls.observe(
+                        llm_calls,
+                        first_turn=first_turn,
+                        profile_preloaded=bool(conversation.customer_profile)
+                    )
+                    self.usage_tracker.record_turn(conversation.phone_number, agent.name,
+                                                   time.perf_counter() - turn_started, tool_iterations)
+                    outcome = "ok"
+                    return assistant_message, agent
 
                 # Handle tool calls
+                tool_iterations += 1
+                stage_started = time.perf_counter()
                 for tool_call in message.tool_calls:
-                    result = self._execute_tool_call(tool_call, tools_map)
+                    # The deadline is only checked before a tool starts: tools such as create_order
+                    # or execute_payment commit side effects, so a started call is always awaited
+                    # (shielded from cancellation) and its result kept
+                    self._remaining(deadline)
+                    tool_started = time.perf_counter()
+                    tool_outcome = "error"
+                    tool_task = asyncio.ensure_future(
+                        asyncio.to_thread(self._execute_tool_call, tool_call, tools_map, conversation, agent.name)
+                    )
+                    try:
+                        result = await asyncio.shield(tool_task)
+                        tool_outcome = "ok"
+                    except asyncio.CancelledError:
+                        # The turn is cancelled (e.g. shutdown): still let the tool finish first
+                        tool_outcome = "cancelled"
+                        await asyncio.wait([tool_task])
+                        raise
+                    finally:
+                        if trace:
+                            trace.add_span("tool_call", tool_started, time.perf_counter() - tool_started,
+                                           agent=agent.name, tool=tool_call.function.name,
+                                           arguments=tool_call.function.arguments, outcome=tool_outcome)
                     
                     if isinstance(result, Agent):
-                        self.current_agent = result
-                        result = f"Transferred to {self.current_agent.name}. Adopt persona immediately."
-                        tool_schemas = [function_to_schema(tool) for tool in self.current_agent.tools]
-                        tools_map = {tool.__name__: tool for tool in self.current_agent.tools}
+                        _transfers.inc(from_agent=agent.name, to_agent=result.name)
+                        if trace:
+                            trace.add_span("transfer", time.perf_counter(), 0.0,
+                                           from_agent=agent.name, to_agent=result.name)
+                        agent = conversation.agent = result
+                        result = f"Transferred to {agent.name}. Adopt persona immediately."
+                        tool_schemas = get_tool_schemas(agent.tools)
+                        tools_map = {tool.__name__: tool for tool in agent.tools}
                     
                     tool_message = {
                         "role": "tool",
@@ -92,23 +383,79 @@ class ChatService:
                         "content": str(result)
                     }
                     messages.append(tool_message)
+                    completed_tools.append(f"{tool_call.function.name}({tool_call.function.arguments}) -> {result}")
+                _stage_seconds.observe(time.perf_counter() - stage_started, stage="tool_exec")
+                stage_started = time.perf_counter()
 
+        except TurnBudgetExceeded as e:
+            outcome = e.reason
+            _budget_exhausted.inc(agent=agent.name, reason=e.reason)
+            logger.warning("Turn for %s stopped (%s) after %d LLM calls and %.2fs",
+                           conversation.phone_number, e.reason, llm_calls, time.perf_counter() - turn_started)
+            if completed_tools:
+                # The customer is asked to send the message again: keep what the tools already did
+                # (an order created, a payment made) so the next turn does not repeat it
+                conversation.add_message("system", "Tool calls completed before this reply was cut short "
+                                                   "(do not repeat them):\n" + "\n".join(completed_tools))
+            return {"role": "assistant", "content": self.fallback_message}, agent
+        except AdmissionRejected as e:
+            outcome = "shed"
+            logger.warning("Turn for %s shed by admission control (%s)", conversation.phone_number, e.reason)
+            return {"role": "assistant", "content": self.shed_message}, agent
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            logger.warning("Turn for %s failed fast: OpenAI circuit breaker is open", conversation.phone_number)
+            return {"role": "assistant", "content": self.unavailable_message}, agent
         except Exception as e:
-            logger.error(f"Error in run_full_turn: {str(e)}")
+            if self.resilience and retry_reason(e):
+                outcome = "unavailable"
+                logger.error("OpenAI unavailable for %s after retries: %s", conversation.phone_number, e)
+                return {"role": "assistant", "content": self.unavailable_message}, agent
+            outcome = "error"
+            logger.error("Error in run_full_turn: %s", e)
             raise
+        finally:
+            if trace:
+                self.flight_recorder.finish_turn(trace, outcome)
 
-    async def process_message(self, message: str, conversation: Conversation) -> str:
-        """Process a user message and return the response."""
+    async def process_message(self, message: str, conversation: Conversation, profile_mode: Optional[str] = None) -> str:
+        """
+        Process a user message and return the response.
+
+        With a profiler, the turn is profiled when `profile_mode` asks for it ('cprofile' or
+        'sampling') or when the profiler is armed or samples it.
+        """
+        decision = self.profiler.decide(profile_mode) if self.profiler else None
+        if decision:
+            mode, trigger = decision
+            metadata = {"phone_number": conversation.phone_number, "agent": self.agent_for(conversation).name,
+                        "message_chars": len(message), "history_messages": len(conversation.messages)}
+            return await self.profiler.run(self._process_message(message, conversation), mode, trigger, metadata)
+        return await self._process_message(message, conversation)
+
+    async def _process_message(self, message: str, conversation: Conversation) -> str:
         if message.lower() in ['exit', 'quit', 'bye']:
             conversation.clear()
-            self.current_agent = self.initial_agent
             return "Goodbye! Conversation history has been cleared."
 
+        # Fast path: answer FAQ-style questions from the cache without calling the LLM
+        if self.answer_cache:
+            started = time.perf_counter()
+            cached = self.answer_cache.lookup(message)
+            if cached:
+                conversation.add_message("user", message)
+                conversation.add_message("assistant", cached.answer)
+                self.answer_cache.record_hit_latency(time.perf_counter() - started)
+                return cached.answer
+
         # Add user message to conversation history
         conversation.add_message("user", message)
 
         # Run the full turn with tools and agent switching
+        started = time.perf_counter()
         assistant_message, _ = await self._run_full_turn(conversation.get_messages(), conversation)
+        if self.answer_cache:
+            self.answer_cache.record_llm_turn(time.perf_counter() - started)
         
         # Add assistant response to conversation history
         conversation.add_message("assistant", assistant_message["content"])
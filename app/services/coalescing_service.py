@@ -0,0 +1,81 @@
+from typing import Dict, Any, Optional
+import asyncio
+import time
+import logging
+from app.utils.metrics import counter, histogram
+from app.config.settings import (
+    COALESCE_WINDOW_SECONDS, COALESCE_MAX_WAIT_SECONDS, TWILIO_WEBHOOK_TIMEOUT_SECONDS, WEBHOOK_MARGIN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+_coalesced = counter("coalesced_messages_total", "Inbound messages merged into another message's turn")
+_batch_size = histogram("coalesced_batch_size", "Inbound messages per merged user turn",
+                        buckets=(1, 2, 3, 4, 6, 8))
+
+def clamp_turn_deadline(turn_deadline: float, max_wait_seconds: float = COALESCE_MAX_WAIT_SECONDS,
+                        webhook_timeout: float = TWILIO_WEBHOOK_TIMEOUT_SECONDS,
+                        margin: float = WEBHOOK_MARGIN_SECONDS) -> float:
+    """
+    Turn deadline that fits in a sync webhook after the coalescing wait.
+
+    Args:
+        turn_deadline (float): Configured turn deadline in seconds
+        max_wait_seconds (float): Longest a message waits for its burst to end
+        webhook_timeout (float): Seconds Twilio waits for the webhook response
+        margin (float): Seconds kept free for rendering and the network
+
+    Returns:
+        float: `turn_deadline`, lowered to what is left of the webhook timeout (at least 1s)
+    """
+    return max(min(turn_deadline, webhook_timeout - margin - max_wait_seconds), 1.0)
+
+class MessageCoalescer:
+    """
+    Debounces bursts of messages from the same sender into a single user turn.
+
+    Every call to `submit` waits until the sender has been quiet for `window_seconds`
+    (or `max_wait_seconds` passed since the first buffered message). The call that
+    submitted the last message of the burst receives the merged text; the earlier
+    calls receive None and should acknowledge without replying.
+    """
+
+    def __init__(self, window_seconds: float = COALESCE_WINDOW_SECONDS,
+                 max_wait_seconds: float = COALESCE_MAX_WAIT_SECONDS, separator: str = "\n"):
+        self.window_seconds = window_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.separator = separator
+        self._buffers: Dict[str, Dict[str, Any]] = {}
+
+    async def submit(self, key: str, message: str) -> Optional[str]:
+        """
+        Add a message to the sender's buffer and wait for the burst to end.
+
+        Args:
+            key (str): Sender key, normally the customer phone number
+            message (str): The inbound message text
+
+        Returns:
+            Optional[str]: The merged messages if this call should run the turn, else None
+        """
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = {"messages": [], "first_at": time.monotonic(), "generation": 0}
+            self._buffers[key] = buffer
+        buffer["messages"].append(message)
+        buffer["generation"] += 1
+        generation = buffer["generation"]
+
+        remaining = buffer["first_at"] + self.max_wait_seconds - time.monotonic()
+        await asyncio.sleep(max(0.0, min(self.window_seconds, remaining)))
+
+        if self._buffers.get(key) is not buffer or buffer["generation"] != generation:
+            # A newer message from the same sender took over the burst
+            _coalesced.inc()
+            return None
+
+        del self._buffers[key]
+        _batch_size.observe(len(buffer["messages"]))
+        if len(buffer["messages"]) > 1:
+            logger.info("Coalesced %d messages from %s into one turn", len(buffer['messages']), key)
+        return self.separator.join(buffer["messages"])
@@ -135,4 +135,25 @@ class DatabaseService:
             .filter(Order.customer_id == customer_id)\
             .order_by(Order.created_at.desc())\
             .limit(limit)\
-            .all() 
\ No newline at end of file
+            .all()
+
+    def get_customer_profile(self, customer: Customer, order_limit: int = 3) -> Dict[str, Any]:
+        """Build a compact customer profile (identity, preferences, recent orders) for the system prompt."""
+        return {
+            "id": customer.id,
+            "name": customer.name,
+            "phone_number": customer.phone_number,
+            "preferences": customer.preferences or {},
+            "recent_orders": [
+                {
+                    "order_id": order.id,
+                    "type": order.type,
+                    "status": order.status.value if order.status else None,
+                    "payment_status": order.payment_status,
+                    "amount": order.total_amount,
+                    "created_at": order.created_at.strftime("%Y-%m-%d") if order.created_at else None,
+                    "summary": order.summary
+                }
+                for order in self.get_customer_orders(customer.id, limit=order_limit)
+            ]
+        } 
\ No newline at end of file
@@ -0,0 +1,160 @@
+from typing import Any, Deque, Dict, List, Optional
+from collections import deque
+from datetime import datetime, timezone
+import itertools
+import json
+import os
+import threading
+import time
+import logging
+from app.utils.metrics import counter
+from app.config.settings import (
+    FLIGHT_RECORDER_CAPACITY, FLIGHT_RECORDER_MAX_SPANS, SLOW_TURN_SECONDS, SLOW_TURN_LOG_PATH,
+    SLOW_TURN_LOG_MAX_BYTES
+)
+
+logger = logging.getLogger(__name__)
+
+_slow_turns = counter("slow_turns_total", "Turns slower than SLOW_TURN_SECONDS", ("agent",))
+
+MAX_ATTRIBUTE_CHARS = 500
+
+def _truncate(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > MAX_ATTRIBUTE_CHARS:
+        return value[:MAX_ATTRIBUTE_CHARS] + "..."
+    return value
+
+class TurnTrace:
+    """Spans recorded while one conversation turn runs (LLM calls, tool calls, agent transfers)."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, phone_number: str, agent: str, max_spans: int = FLIGHT_RECORDER_MAX_SPANS):
+        self.id = next(self._ids)
+        self.phone_number = phone_number
+        self.agent = agent
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.max_spans = max_spans
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped_spans = 0
+        self.outcome: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    def add_span(self, kind: str, started: float, duration: float, **attributes: Any) -> None:
+        """
+        Record a span.
+
+        Args:
+            kind (str): 'llm_call', 'tool_call' or 'transfer'
+            started (float): time.perf_counter() when the span started
+            duration (float): Span duration in seconds
+        """
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return
+        span = {"kind": kind, "offset_ms": round((started - self.started) * 1000, 1),
+                "duration_ms": round(duration * 1000, 1)}
+        span.update((key, _truncate(value)) for key, value in attributes.items())
+        self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.duration if self.duration is not None else time.perf_counter() - self.started
+        return {
+            "turn_id": self.id,
+            "phone_number": self.phone_number,
+            "agent": self.agent,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "duration_ms": round(elapsed * 1000, 1),
+            "outcome": self.outcome or "in_progress",
+            "spans": list(self.spans),
+            "dropped_spans": self.dropped_spans,
+        }
+
+class FlightRecorder:
+    """
+    Keeps the spans of the most recent turns in a bounded in-memory ring buffer.
+
+    Turns slower than `slow_turn_seconds` are also appended to a JSON-lines file
+    (rotated to `<path>.1` past `max_log_bytes`), which every worker process shares.
+    """
+
+    def __init__(self, capacity: int = FLIGHT_RECORDER_CAPACITY,
+                 slow_turn_seconds: float = SLOW_TURN_SECONDS,
+                 log_path: Optional[str] = SLOW_TURN_LOG_PATH,
+                 max_log_bytes: int = SLOW_TURN_LOG_MAX_BYTES,
+                 max_spans: int = FLIGHT_RECORDER_MAX_SPANS):
+        self.slow_turn_seconds = slow_turn_seconds
+        self.log_path = log_path or None
+        self.max_log_bytes = max_log_bytes
+        self.max_spans = max_spans
+        self._turns: Deque[TurnTrace] = deque(maxlen=capacity)
+        self._active: Dict[int, TurnTrace] = {}
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    def start_turn(self, phone_number: str, agent: str) -> TurnTrace:
+        trace = TurnTrace(phone_number, agent, self.max_spans)
+        with self._lock:
+            self._active[trace.id] = trace
+        return trace
+
+    def finish_turn(self, trace: TurnTrace, outcome: str) -> None:
+        """Move a turn into the ring buffer and dump it if it was slow."""
+        trace.duration = time.perf_counter() - trace.started
+        trace.outcome = outcome
+        with self._lock:
+            self._active.pop(trace.id, None)
+            self._turns.append(trace)
+        if trace.duration >= self.slow_turn_seconds:
+            _slow_turns.inc(agent=trace.agent)
+            logger.warning("Slow turn for %s: %.2fs (%s, %d spans)", trace.phone_number, trace.duration,
+                           outcome, len(trace.spans))
+            if self.log_path:
+                self._dump(trace)
+
+    def _dump(self, trace: TurnTrace) -> None:
+        line = json.dumps(trace.to_dict(), default=str) + "\n"
+        try:
+            with self._file_lock:
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= self.max_log_bytes:
+                    os.replace(self.log_path, f"{self.log_path}.1")
+                with open(self.log_path, "a") as file:
+                    file.write(line)
+        except OSError as e:
+            logger.error("Could not write slow turn to %s: %s", self.log_path, e)
+
+    def turns(self, phone_number: str) -> Dict[str, List[Dict[str, Any]]]:
+        """In-progress and recently finished turns of one customer in this process, newest first."""
+        with self._lock:
+            active = [trace for trace in self._active.values() if trace.phone_number == phone_number]
+            recent = [trace for trace in self._turns if trace.phone_number == phone_number]
+        return {
+            "in_progress": [trace.to_dict() for trace in reversed(active)],
+            "recent": [trace.to_dict() for trace in reversed(recent)],
+        }
+
+    def slow_turns(self, phone_number: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Slow turns of one customer from the dump file (all workers), newest first."""
+        if not self.log_path:
+            return []
+        found: List[Dict[str, Any]] = []
+        for path in (self.log_path, f"{self.log_path}.1"):
+            if not os.path.exists(path):
+                continue
+            with open(path) as file:
+                matches = []
+                for line in file:
+                    # Cheap substring check before parsing the line
+                    if phone_number not in line:
+                        continue
+                    try:
+                        turn = json.loads(line)
+                    except ValueError:
+                        continue
+                    if turn.get("phone_number") == phone_number:
+                        matches.append(turn)
+            found.extend(reversed(matches))
+            if len(found) >= limit:
+                break
+        return found[:limit]
@@ -0,0 +1,141 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from collections import deque
+import asyncio
+import math
+import time
+import logging
+from app.utils.metrics import counter
+from app.config.settings import (
+    HEDGE_PERCENTILE, HEDGE_MIN_DELAY_SECONDS, HEDGE_MIN_SAMPLES, HEDGE_MAX_RATE, HEDGE_MODEL, HEDGE_WINDOW
+)
+
+logger = logging.getLogger(__name__)
+
+_hedges = counter("llm_hedges_total", "Hedged OpenAI requests", ("model", "outcome"))
+
+class LatencyWindow:
+    """Rolling window of the most recent latencies of one model."""
+
+    def __init__(self, size: int):
+        self._values: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, latency: float) -> None:
+        self._values.append(latency)
+
+    def percentile(self, fraction: float) -> float:
+        """Nearest-rank percentile, e.g. fraction=0.95 for p95."""
+        ordered = sorted(self._values)
+        return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+class Hedger:
+    """
+    Sends a duplicate ("hedge") of a slow OpenAI request and keeps whichever finishes first.
+
+    The hedge fires once the primary request has been running longer than the
+    `percentile` latency of recent calls to the same model (never earlier than
+    `min_delay`, and only after `min_samples` latencies were observed). At most
+    `max_rate` of recent requests are hedged, which bounds the extra cost. The
+    losing request is cancelled.
+    """
+
+    def __init__(self,
+                 percentile: float = HEDGE_PERCENTILE,
+                 min_delay: float = HEDGE_MIN_DELAY_SECONDS,
+                 min_samples: int = HEDGE_MIN_SAMPLES,
+                 max_rate: float = HEDGE_MAX_RATE,
+                 hedge_model: Optional[str] = HEDGE_MODEL,
+                 window: int = HEDGE_WINDOW):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.hedge_model = hedge_model or None
+        self.window = window
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._recent: Deque[bool] = deque(maxlen=window)  # whether each recent request was hedged
+
+    def observe(self, model: str, latency: float) -> None:
+        """Record the latency of a request to `model`."""
+        if model not in self._latencies:
+            self._latencies[model] = LatencyWindow(self.window)
+        self._latencies[model].add(latency)
+
+    def delay_for(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a request to `model`; None while there are too few samples."""
+        latencies = self._latencies.get(model)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return max(latencies.percentile(self.percentile), self.min_delay)
+
+    def hedge_rate(self) -> float:
+        return sum(self._recent) / len(self._recent) if self._recent else 0.0
+
+    def _take_hedge(self) -> bool:
+        """Decide whether a slow request may be hedged without exceeding max_rate, and record the decision."""
+        allowed = (sum(self._recent) + 1) / (len(self._recent) + 1) <= self.max_rate
+        self._recent.append(allowed)
+        return allowed
+
+    async def run(self, model: str, primary: Callable[[], Awaitable[Any]],
+                  hedge: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `primary`, hedging it with `hedge` if it is slow.
+
+        Args:
+            model (str): Model of the primary request (selects the latency window)
+            primary: Coroutine function sending the primary request
+            hedge: Coroutine function sending the duplicate request
+
+        Returns:
+            Tuple[Any, bool]: The first successful result and whether it came from the hedge
+
+        Raises:
+            Exception: The primary's error when every request failed
+        """
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        second: Optional[asyncio.Future] = None
+        delay = self.delay_for(model)
+        try:
+            if delay is None:
+                self._recent.append(False)
+                result = await first
+                self.observe(model, time.monotonic() - started)
+                return result, False
+
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                self._recent.append(False)
+            if done or not self._take_hedge():
+                result = await first
+                self.observe(model, time.monotonic() - started)
+                return result, False
+
+            hedge_model = self.hedge_model or model
+            _hedges.inc(model=hedge_model, outcome="launched")
+            logger.info("Hedging %s request after %.2fs with %s", model, delay, hedge_model)
+            second = asyncio.ensure_future(hedge())
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    won = task is second
+                    _hedges.inc(model=hedge_model, outcome="won" if won else "lost")
+                    # A primary cancelled by a winning hedge took at least this long
+                    self.observe(model, time.monotonic() - started)
+                    return task.result(), won
+            # Both failed: raises the primary's error
+            return await first, False
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except (asyncio.CancelledError, Exception):
+                        pass
@@ -0,0 +1,160 @@
+from typing import Dict, Any, Optional, Tuple, Callable
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import asyncio
+import time
+import logging
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.database import ProcessedMessage
+from app.utils.metrics import counter
+from app.config.settings import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+_duplicates = counter("webhook_duplicates_total", "Retried webhook deliveries detected by MessageSid", ("outcome",))
+
+PROCESSING = "processing"
+DONE = "done"
+
+class InMemoryIdempotencyStore:
+    """
+    Bounded TTL store of MessageSids seen by this process.
+
+    The first delivery of a MessageSid claims it; duplicates can wait for the
+    claimed delivery to complete and reuse its response.
+    """
+
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS, max_entries: int = IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry["created_at"] <= self.ttl_seconds and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+    async def claim(self, key: str) -> bool:
+        """Return True if the caller should process this message, False if it was already seen."""
+        self._expire()
+        if key in self._entries:
+            return False
+        self._entries[key] = {
+            "status": PROCESSING,
+            "response": None,
+            "created_at": time.monotonic(),
+            "event": asyncio.Event(),
+        }
+        return True
+
+    async def complete(self, key: str, response: Optional[str]) -> None:
+        """Mark a claimed message as processed and store the response sent for it."""
+        entry = self._entries.get(key)
+        if entry:
+            entry["status"] = DONE
+            entry["response"] = response
+            entry["event"].set()
+
+    async def release(self, key: str) -> None:
+        """Forget a claim after processing failed so a retry can process it again."""
+        entry = self._entries.pop(key, None)
+        if entry:
+            entry["event"].set()
+
+    async def wait(self, key: str, timeout: float) -> Tuple[bool, Optional[str]]:
+        """
+        Wait for an in-flight message to finish.
+
+        Returns:
+            Tuple[bool, Optional[str]]: (done, response). done is False on timeout or if the claim was released.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry["status"] != DONE:
+            try:
+                await asyncio.wait_for(entry["event"].wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return False, None
+        return entry["status"] == DONE, entry["response"]
+
+class DatabaseIdempotencyStore:
+    """
+    MessageSid store backed by the processed_messages table, shared by all workers.
+
+    Claims rely on the primary key: only one worker can insert a given MessageSid.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS,
+                 poll_interval: float = 0.25, cleanup_every: int = 500):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self.cleanup_every = cleanup_every
+        self._claims = 0
+
+    def _claim(self, key: str) -> bool:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        with self.session_factory() as db:
+            self._claims += 1
+            if self._claims % self.cleanup_every == 0:
+                db.query(ProcessedMessage).filter(ProcessedMessage.created_at < cutoff).delete()
+                db.commit()
+            try:
+                db.add(ProcessedMessage(message_sid=key, status=PROCESSING, created_at=datetime.utcnow()))
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+            # Take over entries older than the TTL, as if they had expired
+            expired = db.query(ProcessedMessage)\
+                .filter(ProcessedMessage.message_sid == key, ProcessedMessage.created_at < cutoff)\
+                .update({"status": PROCESSING, "response": None, "created_at": datetime.utcnow()})
+            db.commit()
+            return expired == 1
+
+    def _complete(self, key: str, response: Optional[str]) -> None:
+        with self.session_factory() as db:
+            db.query(ProcessedMessage).filter(ProcessedMessage.message_sid == key)\
+                .update({"status": DONE, "response": response})
+            db.commit()
+
+    def _release(self, key: str) -> None:
+        with self.session_factory() as db:
+            db.query(ProcessedMessage).filter(ProcessedMessage.message_sid == key).delete()
+            db.commit()
+
+    def _get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        with self.session_factory() as db:
+            row = db.query(ProcessedMessage.status, ProcessedMessage.response)\
+                .filter(ProcessedMessage.message_sid == key).first()
+            return (row.status, row.response) if row else None
+
+    async def claim(self, key: str) -> bool:
+        return await asyncio.to_thread(self._claim, key)
+
+    async def complete(self, key: str, response: Optional[str]) -> None:
+        await asyncio.to_thread(self._complete, key, response)
+
+    async def release(self, key: str) -> None:
+        await asyncio.to_thread(self._release, key)
+
+    async def wait(self, key: str, timeout: float) -> Tuple[bool, Optional[str]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            row = await asyncio.to_thread(self._get, key)
+            if row is None:
+                return False, None
+            if row[0] == DONE:
+                return True, row[1]
+            if time.monotonic() >= deadline:
+                return False, None
+            await asyncio.sleep(self.poll_interval)
+
+def record_duplicate(outcome: str) -> None:
+    """Count a duplicate delivery ('cached', 'acknowledged' or 'timeout')."""
+    _duplicates.inc(outcome=outcome)
@@ -0,0 +1,164 @@
+from typing import Dict, List, Any, Optional, Tuple
+import abc
+import asyncio
+import json
+import math
+import random
+import re
+import logging
+from openai import AsyncOpenAI
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_message_tool_call import Function
+from app.config.settings import (
+    LLM_BACKEND, MOCK_LLM_SEED, MOCK_LLM_LATENCY_MEDIAN_SECONDS, MOCK_LLM_LATENCY_SIGMA,
+    MOCK_LLM_TAIL_PROBABILITY, MOCK_LLM_TAIL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+class LLMBackend(abc.ABC):
+    """Interface used by ChatService to get chat completions."""
+
+    @abc.abstractmethod
+    async def create(self, model: str, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]],
+                     timeout: Optional[float] = None) -> ChatCompletion:
+        """
+        Create a chat completion.
+
+        Args:
+            model (str): Model name
+            messages (List[Dict[str, Any]]): Messages including the system message
+            tools (List[Dict[str, Any]]): Tool schemas offered to the model
+            timeout (Optional[float]): Request timeout in seconds
+
+        Returns:
+            ChatCompletion: Response shaped like the OpenAI chat completions API
+        """
+
+    async def warm_up(self, timeout: Optional[float] = None) -> None:
+        """Open connections ahead of the first completion (no-op by default)."""
+
+class OpenAIBackend(LLMBackend):
+    """Backend calling the OpenAI chat completions API."""
+
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+
+    async def create(self, model: str, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]],
+                     timeout: Optional[float] = None) -> ChatCompletion:
+        return await self.client.chat.completions.create(model=model, messages=messages, tools=tools, timeout=timeout)
+
+    async def warm_up(self, timeout: Optional[float] = None) -> None:
+        # Cheapest authenticated request: leaves a TLS connection in the client's pool
+        await self.client.models.list(timeout=timeout)
+
+class LatencyDistribution:
+    """
+    Log-normal latency with an optional slow tail.
+
+    Most samples are median * exp(sigma * N(0, 1)); with probability `tail_probability`
+    a sample is between `tail_seconds` and 2 * `tail_seconds` instead.
+    """
+
+    def __init__(self, median: float = MOCK_LLM_LATENCY_MEDIAN_SECONDS, sigma: float = MOCK_LLM_LATENCY_SIGMA,
+                 tail_probability: float = MOCK_LLM_TAIL_PROBABILITY, tail_seconds: float = MOCK_LLM_TAIL_SECONDS):
+        self.median = median
+        self.sigma = sigma
+        self.tail_probability = tail_probability
+        self.tail_seconds = tail_seconds
+
+    def sample(self, rng: random.Random) -> float:
+        if self.tail_probability and rng.random() < self.tail_probability:
+            return self.tail_seconds * (1 + rng.random())
+        return self.median * math.exp(self.sigma * rng.gauss(0, 1))
+
+_PHONE_NUMBER = re.compile(r"Customer phone number: (\S+)")
+
+def _phone_number(system_message: str) -> str:
+    match = _PHONE_NUMBER.search(system_message)
+    return match.group(1) if match else ""
+
+# Keywords in the customer's message that make the mock call a tool (when the agent offers it)
+DEFAULT_TOOL_KEYWORDS = {
+    "get_cake_inventory": ("cake", "menu", "available", "pickup"),
+    "get_faq": ("hours", "open", "close", "policy", "allerg"),
+}
+
+class MockLLMBackend(LLMBackend):
+    """
+    Deterministic, offline stand-in for OpenAI used for load tests and local runs.
+
+    It follows a fixed script for each customer message:
+    1. Without a "Customer profile" block, call get_customer_by_phone (once per turn)
+    2. Call each offered tool whose keywords appear in the message (see DEFAULT_TOOL_KEYWORDS)
+    3. Answer with a short text reply
+
+    Latencies are drawn from `latency`, seeded per call from `seed`, the customer phone
+    number and the conversation length, so a run is reproducible regardless of how
+    concurrent requests interleave.
+    """
+
+    def __init__(self, seed: int = MOCK_LLM_SEED, latency: Optional[LatencyDistribution] = None,
+                 tool_keywords: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.seed = seed
+        self.latency = latency or LatencyDistribution()
+        self.tool_keywords = DEFAULT_TOOL_KEYWORDS if tool_keywords is None else tool_keywords
+        self.calls = 0
+
+    def _next_tool_call(self, messages: List[Dict[str, Any]], offered: List[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        user_index = next((i for i in range(len(messages) - 1, -1, -1) if messages[i]["role"] == "user"), None)
+        if user_index is None:
+            return None
+        user_text = (messages[user_index].get("content") or "").lower()
+        called = {tc["function"]["name"] for message in messages[user_index:]
+                  for tc in message.get("tool_calls", [])}
+        system = messages[0].get("content") or ""
+
+        if "get_customer_by_phone" in offered and "get_customer_by_phone" not in called \
+                and "Customer profile" not in system:
+            return "get_customer_by_phone", {"phone_number": _phone_number(system)}
+        for tool, keywords in self.tool_keywords.items():
+            if tool in offered and tool not in called and any(keyword in user_text for keyword in keywords):
+                return tool, {}
+        return None
+
+    async def create(self, model: str, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]],
+                     timeout: Optional[float] = None) -> ChatCompletion:
+        phone_number = _phone_number(messages[0].get("content") or "")
+        rng = random.Random(f"{self.seed}|{phone_number}|{len(messages)}|{model}")
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample(rng))
+
+        offered = [tool["function"]["name"] for tool in tools]
+        next_call = self._next_tool_call(messages, offered)
+        if next_call:
+            name, args = next_call
+            message = ChatCompletionMessage(role="assistant", content=None, tool_calls=[
+                ChatCompletionMessageToolCall(id=f"call_{rng.getrandbits(48):012x}", type="function",
+                                              function=Function(name=name, arguments=json.dumps(args)))
+            ])
+            finish_reason = "tool_calls"
+        else:
+            message = ChatCompletionMessage(role="assistant", content="Thanks for your message! (mock reply)")
+            finish_reason = "stop"
+
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4 + len(json.dumps(tools)) // 4
+        completion_tokens = len(message.content or "") // 4 + (20 if message.tool_calls else 0)
+        return ChatCompletion(
+            id=f"chatcmpl-mock-{rng.getrandbits(48):012x}",
+            object="chat.completion",
+            created=0,
+            model=model,
+            choices=[Choice(index=0, finish_reason=finish_reason, message=message)],
+            usage=CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens)
+        )
+
+def create_backend(name: str = LLM_BACKEND, client: Optional[AsyncOpenAI] = None) -> LLMBackend:
+    """Build the backend selected by LLM_BACKEND ('openai' or 'mock')."""
+    if name == "mock":
+        logger.warning("Using the mock LLM backend - replies are scripted, OpenAI is not called")
+        return MockLLMBackend()
+    return OpenAIBackend(client)
@@ -0,0 +1,86 @@
+from typing import Dict, List, Any, Optional, NamedTuple
+from app.config.settings import MODEL_ROUTING_ENABLED
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+
+class Route(NamedTuple):
+    """Model selected for one LLM call, and the other tier to fall back to on errors or timeouts."""
+    name: str  # 'default', 'fast' or 'strong'
+    model: str
+    fallback_model: Optional[str] = None
+
+def call_cost(model: str, usage: Any) -> float:
+    """
+    Estimate the USD cost of one call from its usage object.
+
+    Unknown models (e.g. dated snapshots) are priced by their longest known prefix and
+    cost 0 when nothing matches.
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        matches = [name for name in MODEL_PRICES if model.startswith(name)]
+        if not matches:
+            return 0.0
+        prices = MODEL_PRICES[max(matches, key=len)]
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    input_price, cached_price, output_price = prices
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1_000_000
+
+def _last_tool_names(messages: List[Dict[str, Any]]) -> List[str]:
+    """Names of the tools whose results the model is about to read."""
+    for message in reversed(messages):
+        if message["role"] == "assistant":
+            return [tc["function"]["name"] for tc in message.get("tool_calls", [])]
+    return []
+
+class ModelRouter:
+    """
+    Picks the model for each LLM call of a turn from the agent's routing policy.
+
+    Agents without a `strong_model` always use `agent.model`. Otherwise the fast
+    model handles tool dispatch and short answers, and the strong model is used when:
+    - the model is about to read the result of one of `agent.strong_after_tools`, or
+    - the latest user message is at least `agent.strong_min_user_chars` long.
+    Either tier falls back to the other one when the call fails.
+    """
+
+    def __init__(self, enabled: bool = MODEL_ROUTING_ENABLED):
+        self.enabled = enabled
+
+    def select(self, agent: Any, messages: List[Dict[str, Any]]) -> Route:
+        """
+        Choose the route for the next call.
+
+        Args:
+            agent (Agent): The current agent
+            messages (List[Dict[str, Any]]): Conversation messages (without the system message)
+
+        Returns:
+            Route: Selected route
+        """
+        if not self.enabled or not agent.strong_model:
+            return Route("default", agent.model)
+
+        fast_model = agent.fast_model or agent.model
+        strong = False
+        last = messages[-1] if messages else None
+        if last and last["role"] == "tool":
+            strong = any(name in agent.strong_after_tools for name in _last_tool_names(messages))
+        elif last and last["role"] == "user" and agent.strong_min_user_chars:
+            strong = len(last.get("content") or "") >= agent.strong_min_user_chars
+
+        if strong:
+            route = Route("strong", agent.strong_model, fast_model)
+        else:
+            route = Route("fast", fast_model, agent.strong_model)
+        if route.model == route.fallback_model:
+            return route._replace(fallback_model=None)
+        return route
@@ -0,0 +1,254 @@
+from typing import Any, Awaitable, Counter as CounterType, Dict, List, Optional, Tuple
+from collections import Counter
+from datetime import datetime, timezone
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+import logging
+from app.utils.metrics import counter
+from app.config.settings import (
+    PROFILING_DIR, PROFILING_SAMPLE_RATE, PROFILING_DEFAULT_MODE, PROFILING_MAX_PROFILES,
+    PROFILING_SAMPLE_INTERVAL_MS, PROFILING_TRACEMALLOC_FRAMES
+)
+
+logger = logging.getLogger(__name__)
+
+_profiles = counter("profiles_total", "Profiling requests by outcome", ("mode", "trigger", "outcome"))
+
+MODES = ("cprofile", "sampling")
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 25
+
+class StackSampler:
+    """Samples the stack of one thread every `interval` seconds into folded-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: CounterType[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Samples in the collapsed-stack format read by flame graph tools (speedscope, flamegraph.pl)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+class Profiler:
+    """
+    Opt-in profiling of conversation turns.
+
+    A turn is profiled when the request asks for it, while an admin has armed profiling for the
+    next N turns, or for a random `sample_rate` fraction of turns. Each profile captures either
+    cProfile statistics or sampled stacks of the event loop thread, plus tracemalloc allocation
+    differences, and is stored in `directory` with the request metadata. Only one turn is
+    profiled at a time per process; profiles include whatever else the event loop ran
+    concurrently.
+    """
+
+    def __init__(self, directory: str = PROFILING_DIR,
+                 sample_rate: float = PROFILING_SAMPLE_RATE,
+                 default_mode: str = PROFILING_DEFAULT_MODE,
+                 max_profiles: int = PROFILING_MAX_PROFILES,
+                 sample_interval_ms: float = PROFILING_SAMPLE_INTERVAL_MS,
+                 tracemalloc_frames: int = PROFILING_TRACEMALLOC_FRAMES):
+        if default_mode not in MODES:
+            raise ValueError(f"Profiling mode must be one of {MODES}")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.default_mode = default_mode
+        self.max_profiles = max_profiles
+        self.sample_interval = sample_interval_ms / 1000
+        self.tracemalloc_frames = tracemalloc_frames
+        self._armed_remaining = 0
+        self._armed_mode = default_mode
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def arm(self, turns: int, mode: Optional[str] = None) -> Dict[str, Any]:
+        """Profile the next `turns` turns of this process (0 disarms)."""
+        mode = mode or self.default_mode
+        if mode not in MODES:
+            raise ValueError(f"Profiling mode must be one of {MODES}")
+        with self._lock:
+            self._armed_remaining = max(turns, 0)
+            self._armed_mode = mode
+        return self.state()
+
+    def state(self) -> Dict[str, Any]:
+        return {"armed_turns": self._armed_remaining, "mode": self._armed_mode,
+                "sample_rate": self.sample_rate, "busy": self._busy}
+
+    def decide(self, requested_mode: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        Decide whether to profile the current turn and reserve the profiler if so.
+
+        Args:
+            requested_mode (Optional[str]): Mode asked for by the request (X-Profile header)
+
+        Returns:
+            Optional[Tuple[str, str]]: (mode, trigger) or None when the turn is not profiled
+        """
+        with self._lock:
+            if requested_mode:
+                mode, trigger = (requested_mode if requested_mode in MODES else self.default_mode), "request"
+            elif self._armed_remaining:
+                mode, trigger = self._armed_mode, "admin"
+            elif self.sample_rate and random.random() < self.sample_rate:
+                mode, trigger = self.default_mode, "sample"
+            else:
+                return None
+            if self._busy:
+                _profiles.inc(mode=mode, trigger=trigger, outcome="skipped_busy")
+                return None
+            if trigger == "admin":
+                self._armed_remaining -= 1
+            self._busy = True
+        return mode, trigger
+
+    def _start(self, mode: str) -> Tuple[Optional[cProfile.Profile], Optional[StackSampler], bool,
+                                         Optional[tracemalloc.Snapshot]]:
+        started_tracemalloc = self.tracemalloc_frames > 0 and not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(self.tracemalloc_frames)
+        memory_before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        profile = sampler = None
+        if mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), self.sample_interval)
+            sampler.start()
+        return profile, sampler, started_tracemalloc, memory_before
+
+    def _release(self) -> None:
+        with self._lock:
+            self._busy = False
+
+    async def run(self, awaitable: Awaitable[Any], mode: str, trigger: str, metadata: Dict[str, Any]) -> Any:
+        """Await `awaitable` under the profiler reserved by decide() and store the profile."""
+        try:
+            profile, sampler, started_tracemalloc, memory_before = self._start(mode)
+        except Exception as e:
+            # e.g. another profiler (a debugger, coverage) already owns the interpreter hook
+            logger.error("Could not start %s profiler: %s", mode, e)
+            self._release()
+            return await awaitable
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        error = None
+        try:
+            return await awaitable
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if profile:
+                profile.disable()
+            if sampler:
+                sampler.stop()
+            memory_after = tracemalloc.take_snapshot() if memory_before is not None else None
+            if started_tracemalloc:
+                tracemalloc.stop()
+            metadata = dict(metadata, id=profile_id, mode=mode, trigger=trigger, error=error,
+                            started_at=started_at.isoformat(timespec="milliseconds"),
+                            duration_ms=round(duration * 1000, 1))
+            try:
+                # Writing stats and diffing snapshots can take a while; keep it off the event loop
+                await asyncio.to_thread(self._save, profile_id, profile, sampler, memory_before, memory_after,
+                                        metadata)
+                _profiles.inc(mode=mode, trigger=trigger, outcome="captured")
+            except OSError as e:
+                logger.error("Could not store profile %s: %s", profile_id, e)
+            finally:
+                self._release()
+
+    def _save(self, profile_id: str, profile: Optional[cProfile.Profile], sampler: Optional[StackSampler],
+              memory_before: Optional[tracemalloc.Snapshot], memory_after: Optional[tracemalloc.Snapshot],
+              metadata: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if profile:
+            metadata["file"] = f"{profile_id}.prof"
+            profile.dump_stats(os.path.join(self.directory, metadata["file"]))
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            metadata["top_functions"] = summary.getvalue()
+        if sampler:
+            metadata["file"] = f"{profile_id}.folded"
+            metadata["samples"] = sum(sampler.samples.values())
+            with open(os.path.join(self.directory, metadata["file"]), "w") as file:
+                file.write(sampler.folded())
+        if memory_before is not None and memory_after is not None:
+            differences = memory_after.compare_to(memory_before, "lineno")
+            metadata["allocated_bytes"] = sum(stat.size_diff for stat in differences)
+            metadata["top_allocations"] = [
+                {"location": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in differences[:TOP_ALLOCATIONS]
+            ]
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as file:
+            json.dump(metadata, file, indent=2, default=str)
+        self._prune()
+
+    def _prune(self) -> None:
+        """Keep only the newest `max_profiles` profiles."""
+        for stale in self.list_profiles()[self.max_profiles:]:
+            for name in (f"{stale['id']}.json", stale.get("file")):
+                if name and os.path.exists(os.path.join(self.directory, name)):
+                    os.remove(os.path.join(self.directory, name))
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Metadata of stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".json"):
+                profile = self.get_profile(name[:-len(".json")])
+                if profile:
+                    profiles.append(profile)
+        return profiles
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        path = self.profile_path(f"{profile_id}.json")
+        if not path:
+            return None
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Path of a stored profile file, or None if it does not exist (rejects path traversal)."""
+        if os.path.basename(name) != name:
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
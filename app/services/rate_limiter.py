@@ -0,0 +1,153 @@
+from typing import Dict, List, Any, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import time
+import logging
+from app.utils.metrics import counter, gauge, histogram
+from app.config.settings import (
+    LLM_MAX_CONCURRENCY, OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, LLM_MAX_QUEUE, LLM_LIMITER_WORKERS,
+    LLM_ESTIMATED_COMPLETION_TOKENS
+)
+
+logger = logging.getLogger(__name__)
+
+_queue_seconds = histogram("llm_admission_queue_seconds", "Time an OpenAI call waited for admission")
+_waiting = gauge("llm_admission_waiting", "OpenAI calls waiting for admission")
+_in_flight = gauge("llm_in_flight", "OpenAI calls currently in flight")
+_shed = counter("llm_admission_shed_total", "OpenAI calls rejected by admission control", ("reason",))
+
+class AdmissionRejected(Exception):
+    """Raised when an OpenAI call is shed because the admission queue is full or too slow."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"LLM call rejected: {reason}")
+        self.reason = reason  # 'queue_full' or 'queue_timeout'
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`, holding at most one minute of budget."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+
+    def consume(self, amount: float) -> None:
+        """Take tokens; the balance may go negative when correcting an underestimate."""
+        self._refill()
+        self.tokens -= amount
+
+def estimate_tokens(messages: List[Dict[str, Any]], tool_schemas: List[Dict[str, Any]],
+                    completion_tokens: int = LLM_ESTIMATED_COMPLETION_TOKENS) -> int:
+    """Rough token estimate for a chat completion (about 4 characters per token)."""
+    characters = sum(len(str(message.get("content") or "")) for message in messages)
+    characters += sum(len(json.dumps(message["tool_calls"])) for message in messages if "tool_calls" in message)
+    characters += len(json.dumps(tool_schemas))
+    return characters // 4 + completion_tokens
+
+class LLMAdmissionController:
+    """
+    Admission control shared by all OpenAI calls of this process.
+
+    A call is admitted once the requests-per-minute and tokens-per-minute buckets have
+    budget and then a concurrency slot is free. Calls wait in a bounded FIFO queue; when the
+    queue is full (or the wait exceeds the caller's timeout) the call is shed with
+    AdmissionRejected. Limits are divided by `workers` so the whole deployment stays
+    within the OpenAI tier.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: float = OPENAI_RPM_LIMIT,
+                 tokens_per_minute: float = OPENAI_TPM_LIMIT,
+                 max_queue: int = LLM_MAX_QUEUE,
+                 workers: int = LLM_LIMITER_WORKERS):
+        workers = max(workers, 1)
+        self.max_concurrency = max(max_concurrency // workers, 1)
+        self.max_queue = max_queue
+        self.requests = TokenBucket(requests_per_minute / workers)
+        self.tokens = TokenBucket(tokens_per_minute / workers)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket_lock: Optional[asyncio.Lock] = None
+        self._waiting = 0
+
+    def _primitives(self):
+        # Created lazily so they belong to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket_lock = asyncio.Lock()
+        return self._semaphore, self._bucket_lock
+
+    async def _admit(self, estimated_tokens: int) -> None:
+        semaphore, bucket_lock = self._primitives()
+        # Budget first: a call waiting for tokens must not hold a concurrency slot that a
+        # call with budget could use. One waiter at a time drains the buckets (FIFO).
+        async with bucket_lock:
+            while True:
+                wait = max(self.requests.time_until(1), self.tokens.time_until(estimated_tokens))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            # Shed or cancelled before it was sent: give the budget back
+            self.requests.consume(-1)
+            self.tokens.consume(-estimated_tokens)
+            raise
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Wait for admission, hold a concurrency slot for the duration of the block.
+
+        Args:
+            estimated_tokens (int): Expected prompt + completion tokens of the call
+            timeout (Optional[float]): Maximum seconds to wait in the queue
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait exceeds the timeout
+        """
+        if self._waiting >= self.max_queue:
+            _shed.inc(reason="queue_full")
+            raise AdmissionRejected("queue_full")
+
+        self._waiting += 1
+        _waiting.set(self._waiting)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._admit(estimated_tokens), timeout=timeout)
+        except asyncio.TimeoutError:
+            _shed.inc(reason="queue_timeout")
+            raise AdmissionRejected("queue_timeout")
+        finally:
+            self._waiting -= 1
+            _waiting.set(self._waiting)
+            _queue_seconds.observe(time.monotonic() - started)
+
+        _in_flight.inc()
+        try:
+            yield
+        finally:
+            _in_flight.dec()
+            self._semaphore.release()
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the tokens-per-minute bucket once the real usage of a call is known."""
+        self.tokens.consume(actual_tokens - estimated_tokens)
@@ -0,0 +1,66 @@
+from typing import Dict, Any, Callable, Awaitable, List, Optional
+import asyncio
+import logging
+from app.utils.metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+_jobs = counter("reply_jobs_total", "Background reply jobs by outcome", ("outcome",))
+_queue_depth = gauge("reply_queue_depth", "Background reply jobs waiting for a worker")
+
+class ReplyWorkerPool:
+    """
+    Fixed-size pool of asyncio workers that process chat turns in the background,
+    so /chat can acknowledge the Twilio webhook immediately.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], workers: int = 4, queue_size: int = 1000):
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        # Created here so the queue belongs to the running event loop
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(i)))
+        logger.info("Started %d reply workers", self.workers)
+
+    async def stop(self) -> None:
+        """Let queued jobs finish, then stop the workers."""
+        for _ in self._tasks:
+            await self.queue.put(None)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: Dict[str, Any]) -> bool:
+        """
+        Queue a job for background processing.
+
+        Returns:
+            bool: False if the queue is full and the job was not accepted
+        """
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            _jobs.inc(outcome="rejected")
+            return False
+        _queue_depth.set(self.queue.qsize())
+        return True
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            _queue_depth.set(self.queue.qsize())
+            try:
+                if job is None:
+                    return
+                await self.handler(job)
+                _jobs.inc(outcome="completed")
+            except Exception as e:
+                _jobs.inc(outcome="failed")
+                logger.error("Reply worker %d failed: %s", index, e, exc_info=True)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,198 @@
+from typing import Any, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+import logging
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models.database import Product, StockReservation
+from app.services.catalog_cache import availability, catalog_changed
+from app.utils.metrics import counter
+from app.config.settings import RESERVATION_HOLD_SECONDS, RESERVATION_SWEEP_BATCH
+
+logger = logging.getLogger(__name__)
+
+_reservations = counter("stock_reservations_total", "Stock reservations by outcome", ("outcome",))
+
+HELD = "held"
+COMMITTED = "committed"
+RELEASED = "released"
+EXPIRED = "expired"
+
+def _take_stock(db: Session, product_id: int, quantity: int) -> Optional[int]:
+    """
+    Take `quantity` from a product's stock if it has that many left.
+
+    A single conditional UPDATE: concurrent checkouts never read-modify-write the row, so
+    stock cannot be oversold and no lock is held beyond the statement's own transaction.
+    Returns the quantity left, or None when there is not enough stock.
+    """
+    return db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.quantity >= quantity)
+        .values(quantity=Product.quantity - quantity)
+        .returning(Product.quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+def _return_stock(db: Session, product_id: int, quantity: int) -> Optional[int]:
+    """Give `quantity` back to a product's stock; returns the new quantity (None if the product is gone)."""
+    return db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(quantity=Product.quantity + quantity)
+        .returning(Product.quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+def _transition(db: Session, reservation_id: int, from_statuses: Iterable[str], to_status: str,
+                expires_at: Optional[datetime] = None) -> Optional[Tuple[int, int]]:
+    """
+    Move a reservation out of one of `from_statuses`, if it is still in one of them.
+
+    Conditional like _take_stock, so of two racing transitions (e.g. a payment and the expiry
+    sweep) exactly one wins. Returns the reservation's (product_id, quantity) if this call won.
+    """
+    values = {"status": to_status}
+    if expires_at is not None:
+        values["expires_at"] = expires_at
+    row = db.execute(
+        update(StockReservation)
+        .where(StockReservation.id == reservation_id, StockReservation.status.in_(tuple(from_statuses)))
+        .values(**values)
+        .returning(StockReservation.product_id, StockReservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return tuple(row) if row else None
+
+def _stock_changed(db: Session, before: int, after: int) -> None:
+    """Invalidate the catalog when a stock change shows, e.g. a product selling out."""
+    if availability(before) != availability(after):
+        catalog_changed(db)
+
+def reserve_stock(db: Session, product_id: int, quantity: int = 1, order_id: Optional[int] = None,
+                  hold_seconds: float = RESERVATION_HOLD_SECONDS) -> Optional[StockReservation]:
+    """
+    Hold stock of a product until it is paid for or the hold expires.
+
+    Commits the session's transaction, including pending changes such as the order being
+    reserved for, so the order and its stock are saved together. When there is not enough
+    stock the transaction is rolled back instead.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        product_id (int): Product to reserve
+        quantity (int): Number of items
+        order_id (Optional[int]): Order the reservation belongs to
+        hold_seconds (float): How long the stock is held without payment
+
+    Returns:
+        Optional[StockReservation]: The held reservation, or None if the product is sold out
+    """
+    if quantity < 1:
+        raise ValueError("Quantity must be at least 1")
+    try:
+        remaining = _take_stock(db, product_id, quantity)
+        if remaining is None:
+            db.rollback()
+            _reservations.inc(outcome="sold_out")
+            return None
+        reservation = StockReservation(product_id=product_id, order_id=order_id, quantity=quantity, status=HELD,
+                                       expires_at=datetime.utcnow() + timedelta(seconds=hold_seconds))
+        db.add(reservation)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    _reservations.inc(outcome="reserved")
+    _stock_changed(db, remaining + quantity, remaining)
+    return reservation
+
+def commit_reservation(db: Session, reservation_id: int) -> bool:
+    """Mark a held reservation as paid: its stock is sold. False if it is no longer held."""
+    committed = _transition(db, reservation_id, (HELD,), COMMITTED) is not None
+    db.commit()
+    if committed:
+        _reservations.inc(outcome="committed")
+    return committed
+
+def release_reservation(db: Session, reservation_id: int, status: str = RELEASED) -> bool:
+    """Give a held reservation's stock back (status 'released' or 'expired'). False if it is no longer held."""
+    try:
+        held = _transition(db, reservation_id, (HELD,), status)
+        remaining = _return_stock(db, *held) if held else None
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if not held:
+        return False
+    _reservations.inc(outcome=status)
+    if remaining is not None:
+        _stock_changed(db, remaining - held[1], remaining)
+    return True
+
+def release_expired_reservations(db: Session, now: Optional[datetime] = None,
+                                 limit: int = RESERVATION_SWEEP_BATCH) -> int:
+    """
+    Give back the stock of up to `limit` held reservations past their expiry.
+
+    Safe to run from every worker at once: each reservation is released by one of them.
+    Returns the number of reservations released.
+    """
+    now = now or datetime.utcnow()
+    expired = db.execute(
+        select(StockReservation.id)
+        .where(StockReservation.status == HELD, StockReservation.expires_at < now)
+        .order_by(StockReservation.expires_at)
+        .limit(limit)
+    ).scalars().all()
+    released = sum(release_reservation(db, reservation_id, EXPIRED) for reservation_id in expired)
+    if released:
+        logger.info("Released %d expired stock reservations", released)
+    return released
+
+def _order_reservations(db: Session, order_id: int, statuses: Iterable[str]) -> List[Any]:
+    return db.execute(
+        select(StockReservation.id, StockReservation.product_id, StockReservation.quantity, StockReservation.status)
+        .where(StockReservation.order_id == order_id, StockReservation.status.in_(tuple(statuses)))
+        .order_by(StockReservation.id)
+    ).all()
+
+def commit_order_reservations(db: Session, order_id: int) -> int:
+    """Commit every held reservation of a paid order; returns how many were committed."""
+    return sum(commit_reservation(db, row.id) for row in _order_reservations(db, order_id, (HELD,)))
+
+def release_order_reservations(db: Session, order_id: int) -> int:
+    """Release every held reservation of an order; returns how many were released."""
+    return sum(release_reservation(db, row.id) for row in _order_reservations(db, order_id, (HELD,)))
+
+def renew_order_reservations(db: Session, order_id: int, hold_seconds: float = RESERVATION_HOLD_SECONDS) -> bool:
+    """
+    Make sure an order's stock is held before it is paid for.
+
+    Held reservations are extended by `hold_seconds`; released or expired ones take their
+    stock again. Returns False when a product no longer has enough stock (the order must
+    not be charged); orders without reservations always return True.
+    """
+    expires_at = datetime.utcnow() + timedelta(seconds=hold_seconds)
+    for row in _order_reservations(db, order_id, (HELD, RELEASED, EXPIRED)):
+        if row.status == HELD and _transition(db, row.id, (HELD,), HELD, expires_at):
+            db.commit()
+            continue
+        # Released, or expired by the sweep since it was read
+        try:
+            remaining = _take_stock(db, row.product_id, row.quantity)
+            if remaining is None:
+                db.rollback()
+                _reservations.inc(outcome="sold_out")
+                return False
+            if not _transition(db, row.id, (RELEASED, EXPIRED), HELD, expires_at):
+                # Renewed by a concurrent call meanwhile
+                db.rollback()
+                continue
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        _reservations.inc(outcome="renewed")
+        _stock_changed(db, remaining + row.quantity, remaining)
+    return True
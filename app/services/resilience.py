@@ -0,0 +1,220 @@
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import random
+import threading
+import time
+import logging
+import openai
+from app.utils.metrics import counter, gauge
+from app.config.settings import (
+    LLM_MAX_ATTEMPTS, LLM_RETRY_BASE_DELAY_SECONDS, LLM_RETRY_MAX_DELAY_SECONDS,
+    LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RECOVERY_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_retries = counter("llm_retries_total", "OpenAI call attempts that were retried", ("reason",))
+_transitions = counter("circuit_breaker_transitions_total", "Circuit breaker state changes", ("breaker", "from_state", "to_state"))
+_state = gauge("circuit_breaker_state", "Circuit breaker state (0=closed, 1=half_open, 2=open)", ("breaker",),
+               multiprocess_mode="max")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls fail
+    fast. After `recovery_seconds` it lets a single trial call through (half-open);
+    success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+                 recovery_seconds: float = LLM_BREAKER_RECOVERY_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._listeners: List[Callable[[str, str, str], None]] = []
+        self._lock = threading.Lock()
+        _state.set(_STATE_VALUES[CLOSED], breaker=name)
+
+    def add_listener(self, listener: Callable[[str, str, str], None]) -> None:
+        """Register a callback invoked as listener(breaker_name, from_state, to_state) on every transition."""
+        self._listeners.append(listener)
+
+    def _transition(self, new_state: str) -> None:
+        old_state = self.state
+        if old_state == new_state:
+            return
+        self.state = new_state
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+        _transitions.inc(breaker=self.name, from_state=old_state, to_state=new_state)
+        _state.set(_STATE_VALUES[new_state], breaker=self.name)
+        log = logger.warning if new_state == OPEN else logger.info
+        log("Circuit breaker '%s' %s -> %s", self.name, old_state, new_state)
+        for listener in self._listeners:
+            listener(self.name, old_state, new_state)
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed now."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+                self._transition(HALF_OPEN)
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition(CLOSED)
+
+    def release_trial(self) -> None:
+        """Give back a half-open trial whose outcome says nothing about the dependency (e.g. a cancelled call)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+def retry_reason(error: BaseException) -> Optional[str]:
+    """Classify an error from an OpenAI call; returns a retry reason or None if it must not be retried."""
+    if isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code == 429:
+            return "rate_limited"
+        if error.status_code >= 500:
+            return "server_error"
+        if error.status_code in (408, 409):
+            return "conflict"
+    return None
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Read the server-requested delay from Retry-After / retry-after-ms headers, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max((parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+class ResilientLLMClient:
+    """
+    Wraps OpenAI calls with retries (exponential backoff with full jitter, honouring
+    Retry-After) and a circuit breaker that fails fast during outages.
+    """
+
+    def __init__(self,
+                 breaker: Optional[CircuitBreaker] = None,
+                 max_attempts: int = LLM_MAX_ATTEMPTS,
+                 base_delay: float = LLM_RETRY_BASE_DELAY_SECONDS,
+                 max_delay: float = LLM_RETRY_MAX_DELAY_SECONDS):
+        self.breaker = breaker or CircuitBreaker("openai")
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker_for(self, key: Optional[str]) -> CircuitBreaker:
+        """Breaker for `key` (e.g. a model name), so one failing model does not trip the others."""
+        if key is None:
+            return self.breaker
+        with self._breakers_lock:
+            if key not in self._breakers:
+                breaker = CircuitBreaker(f"{self.breaker.name}:{key}", self.breaker.failure_threshold,
+                                         self.breaker.recovery_seconds)
+                self._breakers[key] = breaker
+            return self._breakers[key]
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """Delay before retry number `attempt` (0-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            # The server's requested delay wins over the backoff cap; the deadline still bounds it
+            delay = max(delay, retry_after)
+        return delay
+
+    async def call(self, send: Callable[[], Awaitable[T]], deadline: Optional[float] = None,
+                   key: Optional[str] = None, max_attempts: Optional[int] = None) -> T:
+        """
+        Run `send` with retries and circuit breaking.
+
+        Args:
+            send: Coroutine function performing one attempt
+            deadline (Optional[float]): time.monotonic() deadline; no retry is scheduled past it
+            key (Optional[str]): Breaker key (see breaker_for); None uses the default breaker
+            max_attempts (Optional[int]): Override of the configured number of attempts
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            Exception: The last error when it is not retryable or attempts are exhausted
+        """
+        breaker = self.breaker_for(key)
+        attempts = max(max_attempts or self.max_attempts, 1)
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit breaker '{breaker.name}' is open")
+            try:
+                result = await send()
+            except Exception as e:
+                reason = retry_reason(e)
+                if reason is None:
+                    breaker.release_trial()
+                    raise
+                breaker.record_failure()
+                delay = self.backoff(attempt, e)
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+                if attempt == attempts - 1 or out_of_time:
+                    raise
+                _retries.inc(reason=reason)
+                logger.warning("OpenAI call failed (%s: %s), retry %d in %.2fs", reason, e, attempt + 1, delay)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                breaker.release_trial()
+                raise
+            breaker.record_success()
+            return result
@@ -16,24 +16,33 @@ class ResponseService:
     <Message>{message}</Message>
 </Response>"""
 
+    def create_empty_twiml_response(self) -> Response:
+        """Acknowledge a Twilio webhook without replying (the reply is sent later via the REST API)."""
+        return Response(
+            content='<?xml version="1.0" encoding="UTF-8"?>\n<Response></Response>',
+            media_type="text/xml",
+            headers={"Cache-Control": "no-cache"}
+        )
+
     async def extract_message(self, request: Request) -> str:
         """Extract message from request based on input format."""
         if INPUT_FORMAT == "form":
             try:
                 form_data = await request.form()
                 message = form_data.get('Body', '')
-                logger.info(f"Form data received: {dict(form_data)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Form data received: %s", dict(form_data))
                 return message
             except Exception as e:
-                logger.error(f"Error parsing form data: {str(e)}")
+                logger.error("Error parsing form data: %s", e)
                 raise HTTPException(status_code=400, detail=f"Error processing form data: {str(e)}")
         else:  # json format
             try:
                 data = await request.json()
-                logger.info(f"JSON data received: {json.dumps(data, indent=2)}")
+                logger.debug("JSON data received: %s", data)
                 return data.get('message', '')
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON: {str(e)}")
+                logger.error("Failed to parse JSON: %s", e)
                 raise HTTPException(status_code=400, detail=f"Invalid JSON payload: {str(e)}")
 
     def create_response(self, response_text: str) -> Response:
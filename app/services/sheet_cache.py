@@ -0,0 +1,101 @@
+from typing import Generator, Hashable, Iterable, List, Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+import logging
+from app.utils.metrics import counter
+from app.config.settings import SHEET_CACHE_TTL_SECONDS, SHEET_CACHE_MAX_ENTRIES, SHEET_CACHE_MAX_ROWS
+
+logger = logging.getLogger(__name__)
+
+_fetches = counter("sheet_fetches_total", "Google Sheet reads by source and cache outcome", ("source", "outcome"))
+
+class CachedSheet:
+    def __init__(self, rows: List[List[str]], etag: Optional[str], content_hash: str):
+        self.rows = rows
+        self.etag = etag
+        self.content_hash = content_hash
+        self.fetched_at = time.monotonic()
+
+class SheetCache:
+    """
+    Recently read sheet contents, so repeated admin views of a sheet are served locally.
+
+    Entries younger than `ttl_seconds` are served without any request. Older entries are
+    revalidated: with If-None-Match when the server sent an ETag, otherwise by downloading
+    the sheet again and comparing a hash of its rows. Sheets over `max_rows` rows are
+    streamed through without being cached; at most `max_entries` sheets are kept.
+    """
+
+    def __init__(self, ttl_seconds: float = SHEET_CACHE_TTL_SECONDS,
+                 max_entries: int = SHEET_CACHE_MAX_ENTRIES,
+                 max_rows: int = SHEET_CACHE_MAX_ROWS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Hashable, CachedSheet]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedSheet]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: CachedSheet, max_age: Optional[float] = None) -> bool:
+        """Whether the entry can be served without revalidation (max_age defaults to the TTL)."""
+        max_age = self.ttl_seconds if max_age is None else max_age
+        return time.monotonic() - entry.fetched_at < max_age
+
+    def serve(self, entry: CachedSheet, source: str, outcome: str) -> Generator[List[str], None, None]:
+        """Rows of a cached entry (shared between readers: do not modify them)."""
+        _fetches.inc(source=source, outcome=outcome)
+        if outcome == "not_modified":
+            entry.fetched_at = time.monotonic()
+        return (row for row in entry.rows)
+
+    def record(self, key: Hashable, rows: Iterable[List[str]], source: str,
+               etag: Optional[str] = None) -> Generator[List[str], None, None]:
+        """
+        Pass downloaded rows through, caching them once the download completes.
+
+        A download that is not read to the end (or fails) is not cached.
+        """
+        collected: Optional[List[List[str]]] = []
+        digest = hashlib.blake2b(digest_size=16)
+        for row in rows:
+            digest.update("\x1f".join(map(str, row)).encode())
+            digest.update(b"\x1e")
+            if collected is not None:
+                collected.append(row)
+                if len(collected) > self.max_rows:
+                    collected = None
+            yield row
+
+        content_hash = digest.hexdigest()
+        previous = self.get(key)
+        outcome = "changed" if previous is None or previous.content_hash != content_hash else "unchanged"
+        if collected is None:
+            _fetches.inc(source=source, outcome="too_large")
+            self.invalidate(key)
+            return
+        _fetches.inc(source=source, outcome=outcome)
+        if outcome == "unchanged":
+            logger.debug("Sheet %s unchanged since the last download", key)
+        with self._lock:
+            self._entries[key] = CachedSheet(collected, etag, content_hash)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+sheet_cache = SheetCache()
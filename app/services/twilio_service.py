@@ -0,0 +1,82 @@
+from typing import Dict, Any, Optional
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.config.settings import (
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_API_BASE_URL,
+    TWILIO_REQUEST_TIMEOUT_SECONDS, TWILIO_MAX_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+class TwilioMessageSender:
+    """
+    Sends outbound messages through the Twilio Messages REST API.
+
+    Uses a single pooled requests.Session (keep-alive connections are reused across
+    replies). Creating a message is not idempotent, so only requests Twilio cannot have
+    accepted are retried: connection errors and 429/503 responses (honouring Retry-After).
+    Other 5xx responses and read timeouts are not retried, as the message may already be
+    on its way. The base URL can point at a local Twilio stand-in for tests.
+    """
+
+    def __init__(self,
+                 account_sid: Optional[str] = TWILIO_ACCOUNT_SID,
+                 auth_token: Optional[str] = TWILIO_AUTH_TOKEN,
+                 base_url: str = TWILIO_API_BASE_URL,
+                 timeout: float = TWILIO_REQUEST_TIMEOUT_SECONDS,
+                 max_retries: int = TWILIO_MAX_RETRIES,
+                 backoff_factor: float = 0.5,
+                 pool_size: int = 10):
+        if not account_sid or not auth_token:
+            raise ValueError("TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN are required to send replies")
+        self.account_sid = account_sid
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            other=0,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 503),
+            allowed_methods=frozenset(["POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.auth = (account_sid, auth_token)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def send_message(self, to: str, from_: str, body: str) -> Dict[str, Any]:
+        """
+        Send a message through Twilio.
+
+        Args:
+            to (str): Recipient address, e.g. "whatsapp:+1234567890"
+            from_ (str): Sender address (our Twilio/WhatsApp number)
+            body (str): Message text
+
+        Returns:
+            Dict[str, Any]: The created Message resource as returned by Twilio
+
+        Raises:
+            requests.HTTPError: If Twilio still rejects the request after retries
+        """
+        url = f"{self.base_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json"
+        response = self.session.post(
+            url,
+            data={"To": to, "From": from_, "Body": body},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        message = response.json()
+        logger.info("Sent reply to %s (sid=%s)", to, message.get('sid'))
+        return message
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,149 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import threading
+import logging
+from app.utils.metrics import counter, histogram
+from app.services.model_router import call_cost
+
+logger = logging.getLogger(__name__)
+
+_llm_calls = counter("llm_calls_total", "OpenAI chat completion calls", ("agent", "model"))
+_llm_tokens = counter("llm_tokens_total", "Tokens used by OpenAI calls", ("agent", "model", "kind"))
+_llm_latency = histogram("llm_call_latency_seconds", "Latency of a single OpenAI call", ("agent", "model"))
+_route_calls = counter("llm_route_calls_total", "OpenAI calls per routing tier", ("agent", "route", "model"))
+_route_latency = histogram("llm_route_latency_seconds", "Latency of OpenAI calls per routing tier", ("route", "model"))
+_route_cost = counter("llm_cost_usd_total", "Estimated OpenAI spend in USD", ("agent", "route", "model"))
+_tool_latency = histogram("tool_call_latency_seconds", "Latency of a single tool execution", ("agent", "tool"))
+_turn_latency = histogram("chat_turn_latency_seconds", "Latency of a full conversation turn", ("agent",))
+_turn_tool_iterations = histogram(
+    "chat_turn_tool_iterations", "Tool-call rounds needed to complete one turn", ("agent",),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12)
+)
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "llm_latency_seconds": 0.0,
+        "cost_usd": 0.0,
+        "tool_calls": 0,
+        "tool_latency_seconds": 0.0,
+        "turns": 0,
+        "tool_iterations": 0,
+    }
+
+class UsageTracker:
+    """
+    Aggregates token and latency usage of LLM calls, tools and turns per
+    conversation and per agent, and mirrors them into the metrics registry.
+    """
+
+    def __init__(self, max_conversations: int = 1000):
+        self.max_conversations = max_conversations
+        self._by_conversation: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._by_agent: Dict[str, Dict[str, Any]] = {}
+        self._by_tool: Dict[str, Dict[str, Any]] = {}
+        self._by_route: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _conversation_totals(self, conversation_id: str) -> Dict[str, Any]:
+        totals = self._by_conversation.get(conversation_id)
+        if totals is None:
+            totals = _empty_totals()
+            self._by_conversation[conversation_id] = totals
+            while len(self._by_conversation) > self.max_conversations:
+                self._by_conversation.popitem(last=False)
+        else:
+            self._by_conversation.move_to_end(conversation_id)
+        return totals
+
+    def _agent_totals(self, agent: str) -> Dict[str, Any]:
+        if agent not in self._by_agent:
+            self._by_agent[agent] = _empty_totals()
+        return self._by_agent[agent]
+
+    def record_llm_call(self, conversation_id: str, agent: str, model: str, usage: Any,
+                        latency_seconds: float, tool_iterations: int, route: str = "default") -> None:
+        """
+        Record one chat completion call.
+
+        Args:
+            conversation_id (str): Conversation key (customer phone number)
+            agent (str): Name of the agent that made the call
+            model (str): Model used for the call
+            usage (Any): The `usage` object of the OpenAI response (may be None)
+            latency_seconds (float): Wall-clock time of the call
+            tool_iterations (int): Tool-call rounds already completed in this turn
+            route (str): Routing tier that selected the model ('default', 'fast' or 'strong')
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        cost = call_cost(model, usage)
+
+        with self._lock:
+            for totals in (self._conversation_totals(conversation_id), self._agent_totals(agent)):
+                totals["llm_calls"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["completion_tokens"] += completion_tokens
+                totals["cached_tokens"] += cached_tokens
+                totals["llm_latency_seconds"] += latency_seconds
+                totals["cost_usd"] += cost
+            route_totals = self._by_route.setdefault(
+                f"{route}:{model}", {"calls": 0, "latency_seconds": 0.0, "cost_usd": 0.0}
+            )
+            route_totals["calls"] += 1
+            route_totals["latency_seconds"] += latency_seconds
+            route_totals["cost_usd"] += cost
+
+        _llm_calls.inc(agent=agent, model=model)
+        _llm_tokens.inc(prompt_tokens, agent=agent, model=model, kind="prompt")
+        _llm_tokens.inc(completion_tokens, agent=agent, model=model, kind="completion")
+        _llm_tokens.inc(cached_tokens, agent=agent, model=model, kind="cached")
+        _llm_latency.observe(latency_seconds, agent=agent, model=model)
+        _route_calls.inc(agent=agent, route=route, model=model)
+        _route_latency.observe(latency_seconds, route=route, model=model)
+        _route_cost.inc(cost, agent=agent, route=route, model=model)
+        logger.info(
+            "LLM call agent=%s route=%s model=%s prompt_tokens=%d completion_tokens=%d cached_tokens=%d "
+            "cost=$%.6f latency=%.3fs tool_iterations=%d", agent, route, model, prompt_tokens,
+            completion_tokens, cached_tokens, cost, latency_seconds, tool_iterations
+        )
+
+    def record_tool_call(self, conversation_id: str, agent: str, tool: str, latency_seconds: float) -> None:
+        """Record one tool execution."""
+        with self._lock:
+            for totals in (self._conversation_totals(conversation_id), self._agent_totals(agent)):
+                totals["tool_calls"] += 1
+                totals["tool_latency_seconds"] += latency_seconds
+            tool_totals = self._by_tool.setdefault(tool, {"calls": 0, "latency_seconds": 0.0})
+            tool_totals["calls"] += 1
+            tool_totals["latency_seconds"] += latency_seconds
+        _tool_latency.observe(latency_seconds, agent=agent, tool=tool)
+
+    def record_turn(self, conversation_id: str, agent: str, latency_seconds: float, tool_iterations: int) -> None:
+        """Record a completed conversation turn (all LLM calls and tools for one user message)."""
+        with self._lock:
+            for totals in (self._conversation_totals(conversation_id), self._agent_totals(agent)):
+                totals["turns"] += 1
+                totals["tool_iterations"] += tool_iterations
+        _turn_latency.observe(latency_seconds, agent=agent)
+        _turn_tool_iterations.observe(tool_iterations, agent=agent)
+
+    def get_conversation_usage(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            totals = self._by_conversation.get(conversation_id)
+            return dict(totals) if totals else None
+
+    def summary(self) -> Dict[str, Any]:
+        """Return usage aggregated per agent, tool and route ('<route>:<model>'), plus the number of tracked conversations."""
+        with self._lock:
+            return {
+                "agents": {name: dict(totals) for name, totals in self._by_agent.items()},
+                "tools": {name: dict(totals) for name, totals in self._by_tool.items()},
+                "routes": {name: dict(totals) for name, totals in self._by_route.items()},
+                "conversations_tracked": len(self._by_conversation),
+            }
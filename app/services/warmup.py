@@ -0,0 +1,118 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+import asyncio
+import time
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.services.llm_backend import LLMBackend
+from app.utils.function_schemas import get_tool_schemas
+from app.utils.metrics import gauge
+from app.config.settings import (
+    WARMUP_ENABLED, WARMUP_DB_CONNECTIONS, WARMUP_LLM, WARMUP_TIMEOUT_SECONDS, WARMUP_RETRY_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# 'min' across workers: 1 only when every worker is ready
+_ready = gauge("worker_ready", "1 once warm-up has finished and the worker accepts traffic",
+               multiprocess_mode="min")
+
+def open_pool_connections(engine: Engine, connections: int) -> int:
+    """Open up to `connections` pooled connections (capped at the pool size) and return them to the pool."""
+    pool_size = engine.pool.size() if hasattr(engine.pool, "size") else connections
+    opened = []
+    try:
+        for _ in range(min(connections, pool_size)):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+class WarmUp:
+    """
+    Readiness of this worker.
+
+    run() pays the costs the first requests after a deploy would otherwise pay: it opens
+    database connections, connects the LLM HTTP client and builds every agent's tool
+    schemas. /ready reports the worker ready only once run() has finished. The database
+    step is required and retried every `retry_seconds`; an unreachable LLM API is logged
+    but does not keep the worker out of rotation (turns handle LLM errors themselves).
+    """
+
+    def __init__(self, engine: Engine, backend: Optional[LLMBackend], agents: Iterable[Any],
+                 enabled: bool = WARMUP_ENABLED,
+                 db_connections: int = WARMUP_DB_CONNECTIONS,
+                 warm_llm: bool = WARMUP_LLM,
+                 timeout: float = WARMUP_TIMEOUT_SECONDS,
+                 retry_seconds: float = WARMUP_RETRY_SECONDS):
+        self.engine = engine
+        self.backend = backend
+        self.agents = list(agents)
+        self.enabled = enabled
+        self.db_connections = db_connections
+        self.warm_llm = warm_llm
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.ready = False
+        self.stopping = False
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        _ready.set(0)
+
+    async def _step(self, name: str, action: Callable[[], Any]) -> bool:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(action(), self.timeout)
+        except Exception as e:
+            # wait_for raises TimeoutError, whose message is empty
+            error = str(e) or type(e).__name__
+            self.steps[name] = {"status": "failed", "error": error,
+                                "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+            logger.warning("Warm-up step %s failed: %s", name, error)
+            return False
+        self.steps[name] = {"status": "ok", "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+        if detail is not None:
+            self.steps[name]["detail"] = detail
+        return True
+
+    async def _open_db_connections(self) -> int:
+        return await asyncio.to_thread(open_pool_connections, self.engine, self.db_connections)
+
+    async def _connect_llm(self) -> None:
+        await self.backend.warm_up(timeout=self.timeout)
+
+    async def _build_tool_schemas(self) -> int:
+        return sum(len(get_tool_schemas(agent.tools)) for agent in self.agents)
+
+    async def run(self) -> None:
+        """Warm up, then mark the worker ready."""
+        started = time.perf_counter()
+        if self.enabled:
+            await self._step("tool_schemas", self._build_tool_schemas)
+            if self.warm_llm and self.backend:
+                await self._step("llm_client", self._connect_llm)
+            if self.db_connections > 0:
+                while not await self._step("db_pool", self._open_db_connections):
+                    await asyncio.sleep(self.retry_seconds)
+        if self.stopping:
+            return
+        self.ready = True
+        _ready.set(1)
+        logger.info("Worker ready after %.2fs of warm-up", time.perf_counter() - started)
+
+    def stop(self) -> None:
+        """Report not ready again so load balancers drain the worker during shutdown."""
+        self.stopping = True
+        self.ready = False
+        _ready.set(0)
+
+    def status(self) -> Dict[str, Any]:
+        if self.ready:
+            state = "ready"
+        elif self.stopping:
+            state = "stopping"
+        else:
+            state = "warming_up"
+        return {"status": state, "steps": dict(self.steps)}
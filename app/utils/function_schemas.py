@@ -1,4 +1,6 @@
 import inspect
+from functools import lru_cache
+from typing import Callable, List, Sequence, Tuple
 
 def function_to_schema(func) -> dict:
     type_map = {
@@ -45,4 +47,16 @@ def function_to_schema(func) -> dict:
                 "required": required,
             },
         },
-    }
\ No newline at end of file
+    }
+
+def get_tool_schemas(tools: Sequence[Callable]) -> List[dict]:
+    """
+    Schemas for a list of tools, built once per distinct list (agents' tools never change).
+
+    The returned list is shared between callers and must not be modified.
+    """
+    return _cached_tool_schemas(tuple(tools))
+
+@lru_cache(maxsize=None)
+def _cached_tool_schemas(tools: Tuple[Callable, ...]) -> List[dict]:
+    return [function_to_schema(tool) for tool in tools]
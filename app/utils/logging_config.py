@@ -1,9 +1,103 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+from typing import Any, Optional
+from app.config.settings import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE
+from app.utils.metrics import counter
 
-def setup_logging() -> logging.Logger:
-    """Configure and return the logger."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-    return logging.getLogger(__name__) 
\ No newline at end of file
+_dropped = counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# LogRecord attributes; anything else on a record came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with `extra=` are included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class LazyJson:
+    """Log argument serialized to JSON only when the record is formatted (on the listener thread)."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller: records are dropped (and counted) when the queue is full.
+
+    Records are queued unformatted: merging `args` into the message, JSON rendering and
+    tracebacks are left to the listener's handlers, so none of it runs on the event loop.
+    Arguments are therefore read when the record is written; do not mutate them after logging.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped.inc()
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT,
+                  queue_size: int = LOG_QUEUE_SIZE) -> logging.Logger:
+    """
+    Configure and return the logger.
+
+    Records are put on a bounded queue and written to stderr by a background listener
+    thread, so request handlers never wait on the output stream. Calling it again
+    replaces the previous configuration.
+    """
+    global _listener
+    if _listener:
+        _listener.stop()
+
+    output = logging.StreamHandler(sys.stderr)
+    if log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(message)s'))
+
+    log_queue: "queue.Queue[Any]" = queue.Queue(queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return logging.getLogger(__name__)
+
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,329 @@
+import bisect
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Tuple, Any, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """Turn label keyword arguments into a tuple ordered like labelnames."""
+        if len(labels) == len(self.labelnames):
+            try:
+                return tuple(str(labels[name]) for name in self.labelnames)
+            except KeyError:
+                pass
+        raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+
+class Counter(_Metric):
+    """Monotonically increasing value, e.g. number of requests served."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in items]
+
+GAUGE_MODES = ("sum", "max", "min", "all")
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, e.g. number of active conversations.
+
+    `multiprocess_mode` says how values from several worker processes are combined:
+    'sum', 'max', 'min', or 'all' (one series per process, labelled with its pid).
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 multiprocess_mode: str = "sum"):
+        if multiprocess_mode not in GAUGE_MODES:
+            raise ValueError(f"multiprocess_mode must be one of {GAUGE_MODES}")
+        super().__init__(name, description, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in items]
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies, sizes) in cumulative buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        # Only the first bucket holding the value is incremented; samples() makes the counts cumulative
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"count": 0, "sum": 0.0, "buckets": [0] * (len(self.buckets) + 1)}
+                self._values[key] = state
+            state["count"] += 1
+            state["sum"] += value
+            state["buckets"][index] += 1
+
+    def count(self, **labels: Any) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def samples(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [(key, dict(state, buckets=list(state["buckets"]))) for key, state in self._values.items()]
+        samples = []
+        for key, state in items:
+            cumulative, running = [], 0
+            for bucket_count in state["buckets"][:-1]:
+                running += bucket_count
+                cumulative.append(running)
+            samples.append({
+                "labels": dict(zip(self.labelnames, key)),
+                "count": state["count"],
+                "sum": state["sum"],
+                "buckets": dict(zip([str(b) for b in self.buckets], cumulative)),
+            })
+        return samples
+
+class MetricsRegistry:
+    """Process-wide collection of named metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type, name: str, description: str, labelnames: Tuple[str, ...], **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+              multiprocess_mode: str = "sum") -> Gauge:
+        return self._get_or_create(Gauge, name, description, labelnames, multiprocess_mode=multiprocess_mode)
+
+    def histogram(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Optional[Tuple[float, ...]] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labelnames, buckets=buckets or DEFAULT_BUCKETS)
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Register a callback run before every snapshot.
+
+        Collectors set gauges whose value is cheap to read but not worth tracking on every
+        change (pool usage, number of live conversations).
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            snapshot[metric.name] = {
+                "type": metric.kind,
+                "description": metric.description,
+                "samples": metric.samples(),
+            }
+            if isinstance(metric, Gauge):
+                snapshot[metric.name]["multiprocess_mode"] = metric.multiprocess_mode
+        return snapshot
+
+REGISTRY = MetricsRegistry()
+
+def counter(name: str, description: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    """Get or create a counter in the default registry."""
+    return REGISTRY.counter(name, description, labelnames)
+
+def gauge(name: str, description: str, labelnames: Tuple[str, ...] = (), multiprocess_mode: str = "sum") -> Gauge:
+    """Get or create a gauge in the default registry."""
+    return REGISTRY.gauge(name, description, labelnames, multiprocess_mode)
+
+def histogram(name: str, description: str, labelnames: Tuple[str, ...] = (),
+              buckets: Optional[Tuple[float, ...]] = None) -> Histogram:
+    """Get or create a histogram in the default registry."""
+    return REGISTRY.histogram(name, description, labelnames, buckets)
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"' for name, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value))
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Render a snapshot in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        description = metric["description"].replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for sample in metric["samples"]:
+            labels = sample["labels"]
+            if metric["type"] == "histogram":
+                for bound, bucket_count in sample["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {_format_value(bucket_count)}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {_format_value(sample['count'])}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(sample['count'])}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(sample['value'])}")
+    return "\n".join(lines) + "\n"
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+def merge_snapshots(snapshots: List[Tuple[int, Dict[str, Any], bool]]) -> Dict[str, Any]:
+    """
+    Combine snapshots from several worker processes into one.
+
+    Args:
+        snapshots: (pid, snapshot, alive) per process. Counters and histograms of exited
+            processes still count towards the totals; their gauges are dropped.
+
+    Returns:
+        Dict[str, Any]: A snapshot in the same format as MetricsRegistry.snapshot()
+    """
+    merged: Dict[str, Any] = {}
+    series: Dict[str, Dict[Tuple[Tuple[str, str], ...], Dict[str, Any]]] = {}
+    for pid, snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            kind = metric["type"]
+            if kind == "gauge" and not alive:
+                continue
+            entry = merged.setdefault(name, {key: value for key, value in metric.items() if key != "samples"})
+            by_labels = series.setdefault(name, {})
+            mode = metric.get("multiprocess_mode", "sum")
+            for sample in metric["samples"]:
+                labels = dict(sample["labels"], pid=str(pid)) if kind == "gauge" and mode == "all" else sample["labels"]
+                key = _label_key(labels)
+                current = by_labels.get(key)
+                if current is None:
+                    by_labels[key] = dict(sample, labels=labels,
+                                          **({"buckets": dict(sample["buckets"])} if kind == "histogram" else {}))
+                elif kind == "histogram":
+                    current["count"] += sample["count"]
+                    current["sum"] += sample["sum"]
+                    for bound, bucket_count in sample["buckets"].items():
+                        current["buckets"][bound] = current["buckets"].get(bound, 0) + bucket_count
+                elif kind == "gauge" and mode == "max":
+                    current["value"] = max(current["value"], sample["value"])
+                elif kind == "gauge" and mode == "min":
+                    current["value"] = min(current["value"], sample["value"])
+                else:
+                    current["value"] += sample["value"]
+    for name, entry in merged.items():
+        entry["samples"] = list(series.get(name, {}).values())
+    return merged
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class MultiProcessStore:
+    """
+    Shares metrics between worker processes through one JSON file per pid in a directory.
+
+    Each worker writes its own snapshot periodically and before serving a scrape; the scrape
+    merges every file. Clear the directory when the deployment (not a single worker) restarts.
+    """
+
+    def __init__(self, directory: str, registry: MetricsRegistry = REGISTRY, pid: Optional[int] = None):
+        self.directory = directory
+        self.registry = registry
+        self.pid = pid or os.getpid()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def write(self) -> None:
+        """Write this process's current snapshot (atomically, so readers never see half a file)."""
+        path = self._path(self.pid)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.registry.snapshot(), file)
+        os.replace(temporary, path)
+
+    def collect(self) -> Dict[str, Any]:
+        """Refresh this process's file and merge the snapshots of all worker processes."""
+        self.write()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            try:
+                pid = int(filename[len("metrics_"):-len(".json")])
+                with open(os.path.join(self.directory, filename)) as file:
+                    snapshots.append((pid, json.load(file), pid == self.pid or _pid_alive(pid)))
+            except (ValueError, OSError):
+                continue
+        return merge_snapshots(snapshots)
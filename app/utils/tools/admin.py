@@ -1,12 +1,13 @@
-from typing import List, Dict, Optional, Union
+from typing import Any, List, Dict, Optional, Union
 from datetime import datetime
-import os
-from dotenv import load_dotenv
+import logging
 from sqlalchemy.orm import Session
+from app.config.settings import get_settings
 from app.database import SessionLocal
 from app.models.database import Order, Customer, OrderStatus, Product
+from app.utils.tools.gdrive import iter_products, iter_sheet_rows
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 def verify_admin_password(password: str) -> Dict[str, bool]:
     """
@@ -25,7 +26,7 @@ def verify_admin_password(password: str) -> Dict[str, bool]:
         >>> print(result)
         {'is_valid': True}
     """
-    correct_password = os.getenv('ADMIN_PASSWORD')
+    correct_password = get_settings().admin_password
     return {"is_valid": password == correct_password}
 
 def view_all_orders(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, db: Optional[Session] = None) -> List[Dict]:
@@ -110,11 +111,16 @@ def _update_product_price(product_id: int, new_price: float, db: Session) -> boo
     Returns:
         bool: True if update successful, False if product not found
     """
+    from app.services.catalog_cache import catalog_changed
+
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         return False
     product.price = new_price
+    # Edited by hand: the next inventory sync rewrites it from the sheet
+    product.content_hash = None
     db.commit()
+    catalog_changed(db)
     return True
 
 def add_new_product(name: str, price: float, description: str, quantity: int, db: Optional[Session] = None) -> Dict:
@@ -163,6 +169,8 @@ def _add_new_product(name: str, price: float, description: str, quantity: int, d
     Returns:
         Dict: Dictionary containing the new product's details
     """
+    from app.services.catalog_cache import catalog_changed
+
     product = Product(
         name=name,
         price=price,
@@ -171,6 +179,7 @@ def _add_new_product(name: str, price: float, description: str, quantity: int, d
     )
     db.add(product)
     db.commit()
+    catalog_changed(db)
     return product.to_dict()
 
 def remove_product(product_id: int, db: Optional[Session] = None) -> bool:
@@ -205,11 +214,14 @@ def _remove_product(product_id: int, db: Session) -> bool:
     Returns:
         bool: True if removal successful, False if product not found
     """
+    from app.services.catalog_cache import catalog_changed
+
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         return False
     db.delete(product)
     db.commit()
+    catalog_changed(db)
     return True
 
 def view_customer_history(customer_id: int, db: Optional[Session] = None) -> List[Dict]:
@@ -304,3 +316,85 @@ def _get_daily_sales_report(date: datetime, db: Session) -> Dict:
         "number_of_orders": num_orders,
         "orders": [order.to_dict() for order in orders]
     }
+
+def approve_cached_answer(question: str, answer: str) -> Dict[str, Union[bool, str]]:
+    """
+    Approve an answer for a customer question so it is served instantly from the answer cache.
+
+    Future customer messages that closely match the question will receive this answer
+    directly, without going through the assistant. Use this for recurring questions that
+    are not covered by the FAQ.
+
+    Args:
+        question (str): The customer question, e.g. "Do you deliver on Sundays?"
+        answer (str): The exact answer customers should receive
+
+    Returns:
+        Dict[str, Union[bool, str]]: A dictionary with:
+            - success (bool): True if the answer was stored
+            - message (str): Status message
+
+    Example:
+        >>> approve_cached_answer("Do you deliver on Sundays?", "No, we only deliver Monday to Saturday.")
+        {'success': True, 'message': 'Answer approved and cached'}
+    """
+    from app.services.answer_cache_service import answer_cache
+
+    if not answer_cache.approve(question, answer):
+        return {"success": False, "message": "Question and answer must not be empty"}
+    return {"success": True, "message": "Answer approved and cached"}
+
+def sync_inventory_from_sheet(sheet_url: str, require_auth: bool = False, delete_missing: bool = True,
+                              dry_run: bool = False, db: Optional[Session] = None) -> Dict[str, Any]:
+    """
+    Sync the product catalog from a Google Sheet in one transaction.
+
+    Sheet rows are matched to products by name (ignoring case and spacing). Only new,
+    changed and removed products are written; unchanged ones are skipped. Use dry_run=True
+    to preview the changes first.
+
+    Args:
+        sheet_url (str): URL of the inventory sheet (columns: name, price, description, quantity, optional image)
+        require_auth (bool): Set to True for private sheets
+        delete_missing (bool): Remove products that are no longer in the sheet
+        dry_run (bool): Only report what would change
+        db (Optional[Session]): SQLAlchemy database session. If None, a new session will be created.
+
+    Returns:
+        Dict[str, Any]: A dictionary with:
+            - success (bool): False if the sheet could not be read or is invalid
+            - applied (bool): Whether the changes were written
+            - inserted, updated, deleted, unchanged (int): Number of products per change
+            - inserted_names, updated_names, deleted_names, duplicate_names (List[str]): First names per change
+            - message (str): Error message when success is False
+
+    Example:
+        >>> sync_inventory_from_sheet("https://docs.google.com/spreadsheets/d/your_sheet_id/edit", dry_run=True)
+        {'success': True, 'applied': False, 'inserted': 2, 'updated': 1, 'deleted': 0, 'unchanged': 40, ...}
+    """
+    if db is None:
+        with SessionLocal() as db:
+            return _sync_inventory_from_sheet(sheet_url, require_auth, delete_missing, dry_run, db)
+    return _sync_inventory_from_sheet(sheet_url, require_auth, delete_missing, dry_run, db)
+
+def _sync_inventory_from_sheet(sheet_url: str, require_auth: bool, delete_missing: bool, dry_run: bool,
+                               db: Session) -> Dict[str, Any]:
+    """
+    Internal function streaming validated sheet rows into the inventory sync engine.
+    """
+    from app.services.inventory_sync import sync_products
+
+    # Revalidate any cached copy: a sync must apply the sheet as it is now
+    rows = iter_sheet_rows(sheet_url, require_auth=require_auth, max_age=0)
+    if rows is None:
+        return {"success": False, "message": "Failed to read product inventory sheet"}
+    try:
+        report = sync_products(iter_products(rows), db, delete_missing=delete_missing, dry_run=dry_run)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    except Exception as e:
+        logger.error("Inventory sync failed: %s", e, exc_info=True)
+        return {"success": False, "message": f"Inventory sync failed, nothing was changed: {e}"}
+    finally:
+        rows.close()
+    return dict(report, success=True)
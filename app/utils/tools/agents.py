@@ -2,18 +2,21 @@ from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 import os
 from datetime import datetime
-from dotenv import load_dotenv
+from app.config.settings import LLM_FAST_MODEL, LLM_STRONG_MODEL
 from app.utils.tools import admin, customer, inventory, payment
 from app.utils.tools.gdrive import print_inventory, load_product_inventory
 
-# Load environment variables
-load_dotenv()
-
 class Agent(BaseModel):
     name: str = "Agent"
     model: str = "gpt-4o-mini"
     instructions: str = "You are a helpful Agent"
     tools: list = []
+    # Model routing policy (see app/services/model_router.py); without a strong_model
+    # every call uses `model`
+    fast_model: Optional[str] = None
+    strong_model: Optional[str] = None
+    strong_after_tools: List[str] = []
+    strong_min_user_chars: Optional[int] = None
 
 # Import required tools
 from app.utils.tools.inventory import get_cake_inventory, calculate_custom_cake_price
@@ -22,7 +25,7 @@ from app.utils.tools.customer import get_faq, update_customer_name, get_customer
 from app.utils.tools.admin import (
     view_all_orders, update_product_price, add_new_product, 
     remove_product, view_customer_history, get_daily_sales_report,
-    verify_admin_password
+    verify_admin_password, approve_cached_answer, sync_inventory_from_sheet
 )
 
 # Pre-declare agents for type hints
@@ -64,7 +67,9 @@ BAKERY_AGENT = Agent(
     Follow this routine with customers:
     1. At the start of EVERY conversation:
        - The customer's phone number is provided in the system message as "Customer phone number: <number>"
-       - Use get_customer_by_phone with this exact phone number
+       - If the system message contains a "Customer profile" block, use it (id, name, preferences, recent orders)
+         and do NOT call get_customer_by_phone
+       - Only if there is no customer profile block, use get_customer_by_phone with this exact phone number
        - If customer exists and has name, greet them by name: "Welcome back to chocolate therapy [name]! Let's cure your cravings with a heavy dose of sweetness. I can help you order cakes for pickup, design custom cakes, check order status, or process refunds."
        - If customer doesn't exist or has no name, use default greeting: "Welcome to chocolate therapy, let's cure your cravings with a heavy dose of sweetness. I can help you order cakes for pickup, design custom cakes, check order status, or process refunds."
        - NEVER ask customer for their phone number - it's already provided in the system message
@@ -79,7 +84,9 @@ BAKERY_AGENT = Agent(
     4. Ask if they want immediate pickup or custom cake order
     5. For immediate pickup:
        - Inform about available cakes using get_cake_inventory
-       - Create order using create_order with type='immediate'
+       - Create order using create_order with type='immediate', the cake_name and quantity
+         (this holds the cakes for the customer); if it fails because the cake is sold out,
+         say so and suggest other cakes from the inventory
        - Process payment and confirm order:
            a. Present payment options
            b. Process payment using execute_payment
@@ -115,7 +122,9 @@ BAKERY_AGENT = Agent(
     - Monitor payment status and update accordingly
     - For admin requests, always use transfer_to('admin')
     """,
-    model="gpt-4o-mini",
+    model=LLM_FAST_MODEL,
+    fast_model=LLM_FAST_MODEL,
+    strong_model=LLM_STRONG_MODEL,
     tools=[get_cake_inventory, calculate_custom_cake_price, check_payment_status, update_payment_status,
            execute_payment, create_order, get_faq, update_customer_name, get_customer_by_phone, get_customer_orders,
            transfer_to]
@@ -128,7 +137,9 @@ ORDER_AGENT = Agent(
     Follow this routine for custom orders:
     1. At the start of EVERY conversation:
        - The customer's phone number is provided in the system message as "Customer phone number: <number>"
-       - Use get_customer_by_phone with this exact phone number
+       - If the system message contains a "Customer profile" block, use it (id, name, preferences, recent orders)
+         and do NOT call get_customer_by_phone
+       - Only if there is no customer profile block, use get_customer_by_phone with this exact phone number
        - If customer exists and has name, greet them: "Welcome [name]! I'm excited to help create your perfect custom cake!"
        - If customer doesn't exist or has no name, use default greeting: "I'm excited to help create your perfect custom cake!"
        - NEVER ask customer for their phone number - it's already provided in the system message
@@ -185,7 +196,12 @@ ORDER_AGENT = Agent(
     - Monitor payment status and update accordingly
     - For admin requests, always use transfer_to('admin')
     """,
-    model="gpt-4o-mini",
+    model=LLM_FAST_MODEL,
+    fast_model=LLM_FAST_MODEL,
+    strong_model=LLM_STRONG_MODEL,
+    # Pricing summaries/confirmations and long requirement descriptions need the stronger model
+    strong_after_tools=["calculate_custom_cake_price"],
+    strong_min_user_chars=200,
     tools=[calculate_custom_cake_price, check_payment_status, update_payment_status, execute_payment, create_order, get_faq, 
            update_customer_name, get_customer_by_phone, transfer_to]
 )
@@ -232,7 +248,9 @@ REFUND_AGENT = Agent(
     - Update payment status after successful refund
     - For admin requests, always use transfer_to('admin')
     """,
-    model="gpt-4o-mini",
+    model=LLM_FAST_MODEL,
+    fast_model=LLM_FAST_MODEL,
+    strong_model=LLM_STRONG_MODEL,
     tools=[check_payment_status, execute_refund, update_payment_status, get_faq,
            transfer_to]
 )
@@ -264,9 +282,13 @@ ADMIN_AGENT = Agent(
     - Remove products from inventory
     - View customer order history
     - Generate daily sales reports
+    - Approve answers to recurring customer questions using approve_cached_answer
+      (approved answers are sent to customers instantly for matching questions)
     - Load and view inventory from Google Sheets:
         * View inventory from a Google Sheet using print_inventory
         * Load inventory data from a Google Sheet using load_product_inventory
+        * Update the product catalog from a Google Sheet using sync_inventory_from_sheet
+          (run it with dry_run=True first, show the changes and ask for confirmation)
         * For public sheets, no authentication is needed
         * For private sheets, use require_auth=True
     
@@ -304,13 +326,15 @@ ADMIN_AGENT = Agent(
     - Provide clear error messages
     - Format currency values in USD
     """,
-    model="gpt-4o-mini",
+    model=LLM_FAST_MODEL,
+    fast_model=LLM_FAST_MODEL,
+    strong_model=LLM_STRONG_MODEL,
     tools=[
         verify_admin_password,
         view_all_orders, update_product_price, add_new_product,
         remove_product, view_customer_history, get_daily_sales_report,
-        print_inventory, load_product_inventory,
-        transfer_to
+        approve_cached_answer, print_inventory, load_product_inventory,
+        sync_inventory_from_sheet, transfer_to
     ]
 )
 
@@ -3,6 +3,9 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.database import Order, Customer
 from app.database import get_db
+import logging
+
+logger = logging.getLogger(__name__)
 
 def get_customer_orders(customer_id: int) -> List[Dict[str, Union[str, float, datetime]]]:
     """
@@ -109,7 +112,7 @@ def update_customer_name(customer_id: int, name: str) -> bool:
         customer = db_service.update_customer_name(customer_id, name)
         return customer is not None
     except Exception as e:
-        print(f"Error updating customer name: {str(e)}")
+        logger.error("Error updating customer name: %s", e)
         return False
 
 def get_customer_by_phone(phone_number: str) -> Dict[str, Any]:
@@ -138,5 +141,5 @@ def get_customer_by_phone(phone_number: str) -> Dict[str, Any]:
             }
         return {}
     except Exception as e:
-        print(f"Error getting customer: {str(e)}")
+        logger.error("Error getting customer: %s", e)
         return {} 
\ No newline at end of file
@@ -1,21 +1,36 @@
-from typing import List, Dict, Optional, Union
+from typing import TYPE_CHECKING, Any, Generator, Iterable, Iterator, List, Dict, Optional, Union
+import csv
+import io
 import os
-import requests
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 import re
-from dotenv import load_dotenv
 from decimal import Decimal
 import decimal
+import threading
+import logging
+from app.config.settings import SHEETS_PAGE_ROWS, SHEETS_RANGES_PER_REQUEST, SHEETS_REQUEST_TIMEOUT_SECONDS
+from app.services.sheet_cache import sheet_cache
 
-load_dotenv()
+# requests and the Google client libraries are imported on first use: they take longer to
+# import than the rest of the app and are only needed for the occasional admin sheet load
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    import requests
+
+logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
 
-def get_credentials() -> Optional[Credentials]:
+# Credentials are read from token.json once per process and refreshed in place when they expire
+_credentials: Optional["Credentials"] = None
+_credentials_lock = threading.Lock()
+# Pooled HTTP connections for the public CSV export (requests.Session is safe to share)
+_http: Optional["requests.Session"] = None
+_http_lock = threading.Lock()
+# Sheets API clients are built once per thread: their httplib2 transport is not thread-safe
+_thread_local = threading.local()
+
+def get_credentials() -> Optional["Credentials"]:
     """
     Get or refresh Google API credentials.
     
@@ -26,39 +41,52 @@ def get_credentials() -> Optional[Credentials]:
         Requires credentials.json file in the project root with Google API credentials
         Will create/update token.json for persistent authentication
     """
-    creds = None
-    # The file token.json stores the user's access and refresh tokens, and is
-    # created automatically when the authorization flow completes for the first time.
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
-            creds = flow.run_local_server(port=0)
-        # Save the credentials for the next run
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-            
-    return creds
+    global _credentials
+    with _credentials_lock:
+        if _credentials and _credentials.valid:
+            return _credentials
+
+        from google.oauth2.credentials import Credentials
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from google.auth.transport.requests import Request
+
+        creds = _credentials
+        # The file token.json stores the user's access and refresh tokens, and is
+        # created automatically when the authorization flow completes for the first time.
+        if creds is None and os.path.exists('token.json'):
+            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+
+        # If there are no (valid) credentials available, let the user log in.
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    'credentials.json', SCOPES)
+                creds = flow.run_local_server(port=0)
+            # Save the credentials for the next run
+            with open('token.json', 'w') as token:
+                token.write(creds.to_json())
+
+        _credentials = creds
+        return creds
+
+def http_session() -> "requests.Session":
+    """Shared requests session, so repeated sheet downloads reuse pooled connections."""
+    global _http
+    with _http_lock:
+        if _http is None:
+            import requests
+            _http = requests.Session()
+        return _http
 
 def extract_sheet_id(sheet_url: str) -> Optional[str]:
     """
     Extract the sheet ID from a Google Sheets URL.
     """
-    print("\n=== URL Processing Debug ===")
-    print(f"Original URL: {sheet_url}")
-    
     # Clean the URL first - remove any fragments or query parameters
     sheet_url = sheet_url.split('#')[0]  # Remove fragment
-    print(f"After removing fragment: {sheet_url}")
-    
     sheet_url = sheet_url.split('?')[0]  # Remove query parameters
-    print(f"After removing query params: {sheet_url}")
     
     # Pattern to match sheet ID in various Google Sheets URL formats
     patterns = [
@@ -66,116 +94,194 @@ def extract_sheet_id(sheet_url: str) -> Optional[str]:
         r"^([a-zA-Z0-9-_]+)$"                 # Direct ID
     ]
     
-    for i, pattern in enumerate(patterns):
-        print(f"\nTrying pattern {i+1}: {pattern}")
+    for pattern in patterns:
         match = re.search(pattern, sheet_url)
         if match:
             sheet_id = match.group(1)
-            print(f"Match found! Sheet ID: {sheet_id}")
+            logger.debug("Sheet ID %s extracted from %s", sheet_id, sheet_url)
             return sheet_id
-        print("No match found with this pattern")
             
-    print("Failed to extract sheet ID from URL")
+    logger.warning("Failed to extract sheet ID from URL %s", sheet_url)
     return None
 
+def iter_csv_rows(lines: Iterable[str]) -> Iterator[List[str]]:
+    """
+    Parse CSV (RFC 4180) rows from an iterable of text, e.g. a file opened with newline=''.
+
+    Quoted fields may contain commas, escaped quotes ("") and line breaks. Values are
+    stripped of surrounding whitespace and rows without any value are skipped.
+    """
+    for row in csv.reader(lines):
+        values = [value.strip() for value in row]
+        if any(values):
+            yield values
+
+def _iter_response_rows(response: Any) -> Generator[List[str], None, None]:
+    """CSV rows of a streamed requests response, parsed as the body downloads."""
+    try:
+        # Let urllib3 undo gzip/deflate so the text wrapper sees plain bytes
+        response.raw.decode_content = True
+        # The export is always UTF-8; requests would guess ISO-8859-1 for text/csv without a charset
+        yield from iter_csv_rows(io.TextIOWrapper(response.raw, encoding="utf-8", newline=""))
+    finally:
+        response.close()
+
+def _get_public_export(sheet_id: str, etag: Optional[str] = None) -> Optional[Any]:
+    """
+    Streamed response for a public sheet's CSV export: HTTP 200, or 304 when `etag` still
+    matches. Returns None (and logs why) for any other status.
+    """
+    # URL for public sheets CSV export
+    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+    headers = {"If-None-Match": etag} if etag else {}
+    response = http_session().get(url, stream=True, headers=headers, timeout=SHEETS_REQUEST_TIMEOUT_SECONDS)
+    logger.debug("GET %s -> HTTP %s", url, response.status_code)
+
+    if response.status_code not in (200, 304):
+        if response.status_code == 404:
+            logger.error("Sheet %s not found - please check if the URL is correct", sheet_id)
+        elif response.status_code == 403:
+            logger.error("Access denied to sheet %s - please check sheet permissions", sheet_id)
+        else:
+            logger.error("Reading sheet %s failed with HTTP %s: %.200s", sheet_id, response.status_code,
+                         response.text)
+        response.close()
+        return None
+    return response
+
+def open_public_sheet(sheet_id: str) -> Optional[Generator[List[str], None, None]]:
+    """
+    Start downloading a public Google Sheet's CSV export.
+
+    Returns:
+        Optional[Generator]: Rows parsed incrementally from the response (the
+            connection is released once it is exhausted or closed), or None if
+            the sheet cannot be read
+    """
+    response = _get_public_export(sheet_id)
+    return _iter_response_rows(response) if response is not None else None
+
 def read_public_sheet(sheet_id: str) -> Optional[List[List[str]]]:
     """
     Read a public Google Sheet without authentication.
     """
-    print("\n=== Sheet Reading Debug ===")
     try:
-        # URL for public sheets CSV export
-        url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-        print(f"1. Constructed URL: {url}")
-        
-        print("2. Sending HTTP request...")
-        response = requests.get(url)
-        print(f"3. Response status code: {response.status_code}")
-        print(f"4. Response headers: {dict(response.headers)}")
-        
-        if response.status_code != 200:
-            print(f"Error: HTTP {response.status_code}")
-            if response.status_code == 404:
-                print("Sheet not found - please check if the URL is correct")
-            elif response.status_code == 403:
-                print("Access denied - please check sheet permissions")
-            print(f"Response content: {response.text[:200]}...")  # First 200 chars
+        rows = open_public_sheet(sheet_id)
+        if rows is None:
             return None
-            
-        # Parse CSV content
-        content = response.text
-        print(f"\n5. Response content type: {type(content)}")
-        print(f"6. Content preview: {content[:200]}...")  # First 200 chars
-        
-        if not content.strip():
-            print("7. Error: Received empty content")
+        parsed_rows = list(rows)
+        if not parsed_rows:
+            logger.error("Sheet %s is empty", sheet_id)
             return None
-            
-        print(f"8. Content length: {len(content)} characters")
-        
-        # Split into lines and handle different line endings
-        lines = [line for line in content.splitlines() if line.strip()]
-        print(f"9. Found {len(lines)} non-empty lines")
-        if lines:
-            print("10. First line preview:", lines[0][:100])
-            if len(lines) > 1:
-                print("11. Second line preview:", lines[1][:100])
-        
-        if not lines:
-            print("Error: No data found in sheet after parsing")
-            return None
-            
-        # Parse CSV more carefully
-        parsed_rows = []
-        print("\n=== CSV Parsing Debug ===")
-        for i, line in enumerate(lines):
-            print(f"\nProcessing line {i+1}:")
-            print(f"Raw line: {line[:100]}...")
-            
-            # Handle quoted values that might contain commas
-            in_quotes = False
-            current_value = []
-            row_values = []
-            
-            for char in line:
-                if char == '"':
-                    in_quotes = not in_quotes
-                    print(f"Quote found, in_quotes now: {in_quotes}")
-                elif char == ',' and not in_quotes:
-                    value = ''.join(current_value).strip().strip('"')
-                    print(f"Found value: {value}")
-                    row_values.append(value)
-                    current_value = []
-                else:
-                    current_value.append(char)
-                    
-            # Add the last value
-            value = ''.join(current_value).strip().strip('"')
-            print(f"Last value in row: {value}")
-            row_values.append(value)
-            print(f"Complete row: {row_values}")
-            parsed_rows.append(row_values)
-            
-        print(f"\nFinal result: {len(parsed_rows)} rows parsed successfully")
+
+        logger.debug("Parsed %d rows from sheet %s", len(parsed_rows), sheet_id)
         return parsed_rows
-        
+
+    except Exception:
+        logger.exception("Error reading public sheet %s", sheet_id)
+        return None
+
+def build_sheets_service() -> Any:
+    """Authenticated Google Sheets API client, reused by the calling thread."""
+    creds = get_credentials()
+    if not creds:
+        raise Exception("Failed to get Google API credentials")
+
+    service = getattr(_thread_local, "sheets_service", None)
+    if service is None or _thread_local.credentials is not creds:
+        from googleapiclient.discovery import build
+        service = build('sheets', 'v4', credentials=creds)
+        _thread_local.sheets_service, _thread_local.credentials = service, creds
+    return service
+
+def column_letter(column: int) -> str:
+    """A1-notation letters of a 1-based column number (1 -> 'A', 27 -> 'AA')."""
+    letters = ""
+    while column > 0:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def iter_google_sheet_rows(service: Any, sheet_id: str, page_rows: int = SHEETS_PAGE_ROWS,
+                           ranges_per_request: int = SHEETS_RANGES_PER_REQUEST) -> Generator[List[str], None, None]:
+    """
+    Rows of the first tab of a sheet through the Sheets API, fetched page by page.
+
+    The tab's dimensions are looked up first; rows are then requested in `page_rows`-row
+    ranges, `ranges_per_request` ranges per values.batchGet call, and yielded as each
+    call returns. Rows without any value are skipped.
+    """
+    spreadsheet = service.spreadsheets().get(
+        spreadsheetId=sheet_id,
+        fields="sheets.properties(title,gridProperties(rowCount,columnCount))"
+    ).execute()
+    properties = spreadsheet["sheets"][0]["properties"]
+    title = "'" + properties["title"].replace("'", "''") + "'"
+    row_count = properties["gridProperties"]["rowCount"]
+    last_column = column_letter(properties["gridProperties"]["columnCount"])
+    logger.debug("Sheet %s: %d rows, columns A-%s", sheet_id, row_count, last_column)
+
+    ranges = [f"{title}!A{first}:{last_column}{min(first + page_rows - 1, row_count)}"
+              for first in range(1, row_count + 1, page_rows)]
+    for batch_start in range(0, len(ranges), ranges_per_request):
+        result = service.spreadsheets().values().batchGet(
+            spreadsheetId=sheet_id,
+            ranges=ranges[batch_start:batch_start + ranges_per_request]
+        ).execute()
+        for value_range in result.get("valueRanges", []):
+            for row in value_range.get("values", []):
+                if any(str(value).strip() for value in row):
+                    yield row
+
+def iter_sheet_rows(sheet_url: str, require_auth: bool = False,
+                    max_age: Optional[float] = None) -> Optional[Generator[List[str], None, None]]:
+    """
+    Rows of a Google Sheet, read incrementally or served from the sheet cache.
+
+    Args:
+        sheet_url (str): The URL of the Google Sheet to read
+        require_auth (bool): Use the Sheets API (private sheets) instead of the public CSV export
+        max_age (Optional[float]): Serve a cached copy younger than this many seconds without
+            any request (default SHEET_CACHE_TTL_SECONDS); 0 always revalidates
+
+    Returns:
+        Optional[Generator]: Rows as they are downloaded, or None if the sheet
+            cannot be opened. Errors while iterating propagate to the caller; close() it when
+            stopping early.
+    """
+    try:
+        sheet_id = extract_sheet_id(sheet_url)
+        if not sheet_id:
+            raise ValueError("Invalid Google Sheets URL")
+        source = "api" if require_auth else "csv"
+        key = (sheet_id, source)
+        cached = sheet_cache.get(key)
+        if cached and sheet_cache.is_fresh(cached, max_age):
+            return sheet_cache.serve(cached, source, "cached")
+        if require_auth:
+            # The Sheets API has no conditional reads; a changed copy is detected by its hash
+            return sheet_cache.record(key, iter_google_sheet_rows(build_sheets_service(), sheet_id), source)
+
+        response = _get_public_export(sheet_id, cached.etag if cached else None)
+        if response is None:
+            return None
+        if response.status_code == 304 and cached:
+            response.close()
+            return sheet_cache.serve(cached, source, "not_modified")
+        return sheet_cache.record(key, _iter_response_rows(response), source, response.headers.get("ETag"))
     except Exception as e:
-        print(f"\nError reading public sheet:")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        import traceback
-        print("Traceback:")
-        print(traceback.format_exc())
+        logger.error("Error reading Google Sheet: %s", e)
         return None
 
-def read_google_sheet(sheet_url: str, range_name: str = 'A1:Z1000', require_auth: bool = False) -> Optional[List[List[str]]]:
+def read_google_sheet(sheet_url: str, range_name: Optional[str] = None,
+                      require_auth: bool = False) -> Optional[List[List[str]]]:
     """
     Read contents of a Google Sheet given its URL.
     
     Args:
         sheet_url (str): The URL of the Google Sheet to read
-        range_name (str): The range to read in A1 notation. Defaults to 'A1:Z1000'.
-                         Only used when require_auth is True.
+        range_name (Optional[str]): Range to read in A1 notation; by default the whole first
+                         tab is read in pages. Only used when require_auth is True.
         require_auth (bool): Whether to use authentication. Set to True for private sheets,
                            False for public sheets.
         
@@ -190,10 +296,6 @@ def read_google_sheet(sheet_url: str, range_name: str = 'A1:Z1000', require_auth
         
         >>> # For private sheet
         >>> data = read_google_sheet(url, require_auth=True)
-        
-    Raises:
-        ValueError: If the sheet URL is invalid
-        Exception: If there's an error accessing the sheet
     """
     try:
         # Get sheet ID from URL
@@ -201,32 +303,24 @@ def read_google_sheet(sheet_url: str, range_name: str = 'A1:Z1000', require_auth
         if not sheet_id:
             raise ValueError("Invalid Google Sheets URL")
         
-        if not require_auth:
-            return read_public_sheet(sheet_id)
-            
-        # Get credentials and build service for authenticated access
-        creds = get_credentials()
-        if not creds:
-            raise Exception("Failed to get Google API credentials")
-        
-        service = build('sheets', 'v4', credentials=creds)
-        
-        # Call the Sheets API
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=sheet_id,
-            range=range_name
-        ).execute()
-        
-        values = result.get('values', [])
+        if require_auth and range_name:
+            values = build_sheets_service().spreadsheets().values().get(
+                spreadsheetId=sheet_id,
+                range=range_name
+            ).execute().get('values', [])
+        else:
+            rows = iter_sheet_rows(sheet_id, require_auth=require_auth)
+            if rows is None:
+                return None
+            values = list(rows)
         if not values:
-            print('No data found in the sheet.')
+            logger.warning("No data found in sheet %s", sheet_id)
             return None
             
         return values
         
     except Exception as e:
-        print(f"Error reading Google Sheet: {str(e)}")
+        logger.error("Error reading Google Sheet: %s", e)
         return None
 
 def get_sheet_contents(sheet_url: str, require_auth: bool = False) -> None:
@@ -253,40 +347,21 @@ def get_sheet_contents(sheet_url: str, require_auth: bool = False) -> None:
     else:
         print("Failed to read sheet contents")
 
-def load_product_inventory(sheet_url: str, require_auth: bool = False) -> List[Dict[str, Union[str, Decimal, int]]]:
+def iter_products(rows: Iterator[List[str]]) -> Iterator[Dict[str, Union[str, Decimal, int]]]:
     """
-    Load and validate product inventory from a Google Sheet.
-    
-    Args:
-        sheet_url (str): The URL of the Google Sheet containing product inventory
-        require_auth (bool): Whether to use authentication
-        
-    Returns:
-        List[Dict]: List of validated product dictionaries with the following structure:
-            - name (str): Product name
-            - price (Decimal): Product price
-            - description (str): Product description
-            - quantity (int): Available quantity
-            - image (Optional[str]): Image URL if available
-            
+    Validate product rows as they are read; the first row is the header.
+
+    Invalid rows are logged and skipped. See load_product_inventory for the product fields.
+
     Raises:
-        ValueError: If sheet format is invalid or required data is missing
-        
-    Example:
-        >>> url = "https://docs.google.com/spreadsheets/d/your_sheet_id/edit"
-        >>> products = load_product_inventory(url)
-        >>> for product in products:
-        ...     print(f"{product['name']}: ${product['price']} (Qty: {product['quantity']})")
+        ValueError: If the header is missing required fields or there are no product rows
     """
-    data = read_google_sheet(sheet_url, require_auth=require_auth)
-    if not data:
-        raise ValueError("Failed to read product inventory sheet")
-        
-    if len(data) < 2:  # Need at least header and one product
+    header = next(rows, None)
+    if header is None:
         raise ValueError("Sheet must contain header row and at least one product")
         
     # Validate header row
-    headers = [h.strip().lower() for h in data[0]]
+    headers = [h.strip().lower() for h in header]
     required_fields = {'name', 'price', 'description', 'quantity'}
     if not required_fields.issubset(set(headers)):
         raise ValueError(f"Sheet must contain required fields: {required_fields}")
@@ -298,20 +373,19 @@ def load_product_inventory(sheet_url: str, require_auth: bool = False) -> List[D
     qty_idx = headers.index('quantity')
     image_idx = headers.index('image') if 'image' in headers else None
     
-    products = []
-    
-    # Process each product row
-    for row_num, row in enumerate(data[1:], 2):  # Start from 2 for error messages
+    # Process each product row as it arrives
+    row_num = 1
+    for row_num, row in enumerate(rows, 2):  # Start from 2 for error messages
         try:
             # Ensure row has enough columns
             if len(row) < len(required_fields):
-                print(f"Warning: Skipping row {row_num} - insufficient columns")
+                logger.warning("Skipping row %d - insufficient columns", row_num)
                 continue
                 
             # Clean and validate data
             name = row[name_idx].strip()
             if not name:
-                print(f"Warning: Skipping row {row_num} - missing product name")
+                logger.warning("Skipping row %d - missing product name", row_num)
                 continue
                 
             try:
@@ -319,7 +393,7 @@ def load_product_inventory(sheet_url: str, require_auth: bool = False) -> List[D
                 if price < 0:
                     raise ValueError("Price cannot be negative")
             except (ValueError, decimal.InvalidOperation):
-                print(f"Warning: Skipping row {row_num} - invalid price format")
+                logger.warning("Skipping row %d - invalid price format", row_num)
                 continue
                 
             try:
@@ -327,7 +401,7 @@ def load_product_inventory(sheet_url: str, require_auth: bool = False) -> List[D
                 if quantity < 0:
                     raise ValueError("Quantity cannot be negative")
             except ValueError:
-                print(f"Warning: Skipping row {row_num} - invalid quantity format")
+                logger.warning("Skipping row %d - invalid quantity format", row_num)
                 continue
                 
             # Create product dictionary
@@ -344,12 +418,55 @@ def load_product_inventory(sheet_url: str, require_auth: bool = False) -> List[D
                 if image_url:
                     product['image'] = image_url
                     
-            products.append(product)
+            yield product
             
         except Exception as e:
-            print(f"Warning: Error processing row {row_num}: {str(e)}")
+            logger.warning("Error processing row %d: %s", row_num, e)
             continue
+
+    if row_num == 1:  # Need at least header and one product
+        raise ValueError("Sheet must contain header row and at least one product")
+
+def load_product_inventory(sheet_url: str, require_auth: bool = False) -> List[Dict[str, Union[str, Decimal, int]]]:
+    """
+    Load and validate product inventory from a Google Sheet.
+    
+    Args:
+        sheet_url (str): The URL of the Google Sheet containing product inventory
+        require_auth (bool): Whether to use authentication
+        
+    Returns:
+        List[Dict]: List of validated product dictionaries with the following structure:
+            - name (str): Product name
+            - price (Decimal): Product price
+            - description (str): Product description
+            - quantity (int): Available quantity
+            - image (Optional[str]): Image URL if available
             
+    Raises:
+        ValueError: If sheet format is invalid or required data is missing
+        
+    Example:
+        >>> url = "https://docs.google.com/spreadsheets/d/your_sheet_id/edit"
+        >>> products = load_product_inventory(url)
+        >>> for product in products:
+        ...     print(f"{product['name']}: ${product['price']} (Qty: {product['quantity']})")
+    """
+    rows = iter_sheet_rows(sheet_url, require_auth=require_auth)
+    if rows is None:
+        raise ValueError("Failed to read product inventory sheet")
+
+    # Rows are downloaded, parsed and validated page by page; only valid products are kept
+    try:
+        products = list(iter_products(rows))
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error("Error reading product inventory sheet: %s", e)
+        raise ValueError("Failed to read product inventory sheet") from e
+    finally:
+        rows.close()
+
     if not products:
         raise ValueError("No valid products found in sheet")
         
@@ -1,32 +1,13 @@
-from typing import List, Dict
-
-def get_cake_inventory() -> List[Dict[str, str]]:
+def get_cake_inventory() -> str:
     """
     Get the current inventory of available cakes.
     
     Returns:
-        List[Dict[str, str]]: List of cakes with their details
+        str: One line per cake with its name, price, availability and description
     """
-    return [
-        {
-            "name": "Chocolate Therapy",
-            "description": "Triple chocolate cake with ganache filling",
-            "price": "$45.00",
-            "availability": "in stock"
-        },
-        {
-            "name": "Red Velvet Dream",
-            "description": "Classic red velvet with cream cheese frosting",
-            "price": "$40.00",
-            "availability": "in stock"
-        },
-        {
-            "name": "Vanilla Bean Bliss",
-            "description": "Madagascar vanilla bean cake with buttercream",
-            "price": "$35.00",
-            "availability": "limited"
-        }
-    ]
+    # Imported here: app.services modules import app.utils, which imports this module
+    from app.services.catalog_cache import catalog_cache
+    return catalog_cache.get()
 
 def calculate_custom_cake_price(description: str) -> float:
     """
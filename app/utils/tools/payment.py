@@ -1,11 +1,16 @@
 from typing import Dict, Union, Optional
 from datetime import datetime
 import random
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, get_db
-from app.models.database import Order, OrderStatus
+from app.models.database import Order, OrderStatus, Product
 
-def create_order(customer_id: int, order_type: str, total_amount: float, pickup_time: Union[datetime, str, None] = None) -> Dict[str, Union[int, str]]:
+# Payment statuses that give the order's held stock back
+RELEASE_STOCK_STATUSES = ("failed", "cancelled")
+
+def create_order(customer_id: int, order_type: str, total_amount: float, pickup_time: Union[datetime, str, None] = None,
+                 cake_name: Optional[str] = None, quantity: int = 1) -> Dict[str, Union[int, str]]:
     """
     Create a new order in the database.
     
@@ -14,13 +19,19 @@ def create_order(customer_id: int, order_type: str, total_amount: float, pickup_
         order_type: Type of order ('immediate' or 'custom')
         total_amount: Total amount of the order
         pickup_time: When the order should be picked up (optional). Can be datetime object, ISO format string, or None
+        cake_name: For immediate orders, the cake bought (as listed by get_cake_inventory). Its stock is
+            held for the order until it is paid for; the order fails if not enough is left
+        quantity: Number of cakes of cake_name
         
     Returns:
         Dict containing order details:
         - order_id: The ID of the created order
         - status: Order status
         - message: Status message
+        - reserved_until: Until when the cakes are held without payment (with cake_name)
     """
+    from app.services.reservation_service import reserve_stock
+
     db = next(get_db())
     try:
         # Handle pickup_time
@@ -41,13 +52,32 @@ def create_order(customer_id: int, order_type: str, total_amount: float, pickup_
             payment_status="pending"
         )
         db.add(order)
-        db.commit()
-        db.refresh(order)
-        
+        if not cake_name:
+            db.commit()
+            db.refresh(order)
+            return {
+                'order_id': order.id,
+                'status': order.status.value,
+                'message': 'Order created successfully'
+            }
+
+        product_id = db.execute(
+            select(Product.id).where(func.lower(Product.name) == cake_name.strip().lower()).order_by(Product.id)
+        ).scalars().first()
+        if product_id is None:
+            db.rollback()
+            return {'order_id': None, 'status': 'failed', 'message': f'No cake named {cake_name} in the inventory'}
+        db.flush()
+        # Saves the order together with its stock reservation, or neither when sold out
+        reservation = reserve_stock(db, product_id, quantity, order_id=order.id)
+        if reservation is None:
+            return {'order_id': None, 'status': 'failed',
+                    'message': f'Sorry, there are not enough {cake_name} left (sold out)'}
         return {
-            'order_id': order.id,
-            'status': order.status.value,
-            'message': 'Order created successfully'
+            'order_id': reservation.order_id,
+            'status': OrderStatus.PENDING.value,
+            'message': 'Order created successfully',
+            'reserved_until': reservation.expires_at.isoformat()
         }
     except Exception as e:
         db.rollback()
@@ -118,11 +148,18 @@ def _update_payment_status(order_id: int, status: str, db: Session) -> Dict[str,
     
     order.payment_status = status
     db.commit()
+    if status in RELEASE_STOCK_STATUSES:
+        from app.services.reservation_service import release_order_reservations
+        release_order_reservations(db, order_id)
     return {"success": True, "status": status}
 
 def execute_payment(order_id: int, amount: float) -> Dict[str, Union[bool, str, datetime]]:
     """
     Execute a payment transaction for a customer order.
+
+    Stock held for the order is checked first and taken again if its hold expired: nothing
+    is charged when the cakes sold out meanwhile. A successful payment makes the hold final;
+    after a failed one the hold stays (until it expires), so the payment can be retried.
     
     Args:
         order_id: The ID of the order to process payment for
@@ -135,8 +172,25 @@ def execute_payment(order_id: int, amount: float) -> Dict[str, Union[bool, str,
         - timestamp: When the payment was processed
         - message: Status message
     """
+    with SessionLocal() as db:
+        return _execute_payment(order_id, amount, db)
+
+def _execute_payment(order_id: int, amount: float, db: Session) -> Dict[str, Union[bool, str, datetime]]:
+    """Internal function to handle payment logic with the order's stock reservations"""
+    from app.services.reservation_service import commit_order_reservations, renew_order_reservations
+
+    if not renew_order_reservations(db, order_id):
+        return {
+            'success': False,
+            'payment_id': None,
+            'timestamp': datetime.utcnow(),
+            'message': 'Payment not processed: the ordered cakes are no longer in stock'
+        }
+
     # Simulate a successful payment 70% of the time
     success = random.random() < 0.70
+    if success:
+        commit_order_reservations(db, order_id)
     
     return {
         'success': success,
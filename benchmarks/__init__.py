@@ -0,0 +1 @@
+"""Micro-benchmarks for the bakerybot hot paths; run with `python -m benchmarks`."""
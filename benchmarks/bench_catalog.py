@@ -0,0 +1,36 @@
+"""
+Product catalog served by get_cake_inventory for a 200-product catalog.
+
+`catalog_load_200_products` is the cost of a cache miss (query and render);
+`catalog_cached_200_products` is what every other call pays.
+"""
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.runner import benchmark
+from app.models.database import Base, Product
+from app.services.catalog_cache import CatalogCache, load_catalog
+
+def _setup():
+    path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add_all([Product(name=f"Cake {number}", price=number % 50 + 20,
+                            description="Sponge, cream and berries", quantity=number % 7)
+                    for number in range(200)])
+        db.commit()
+    return factory
+
+@benchmark(number=200, setup=_setup)
+def catalog_load_200_products(factory):
+    with factory() as db:
+        load_catalog(db)
+
+@benchmark(number=100_000, setup=lambda: CatalogCache(_setup()))
+def catalog_cached_200_products(cache):
+    cache.get()
@@ -0,0 +1,80 @@
+"""Benchmarks for the functions on the webhook and tool hot paths."""
+from datetime import datetime, timedelta
+import os
+
+from benchmarks.runner import benchmark
+from app.utils.function_schemas import function_to_schema
+from app.services.response_service import ResponseService
+from app.models import Conversation, ConversationManager
+from app.models.database import Order, OrderDetail, OrderStatus
+from app.utils.tools.agents import ORDER_AGENT
+from app.utils.tools.customer import get_faq
+from app.utils.tools.inventory import calculate_custom_cake_price
+from app.utils.metrics import MetricsRegistry
+
+@benchmark(number=2000)
+def function_to_schema_order_tools():
+    for tool in ORDER_AGENT.tools:
+        function_to_schema(tool)
+
+def _response_service():
+    return ResponseService()
+
+@benchmark(number=20000, setup=_response_service)
+def create_twilio_response(response_service):
+    response_service.create_twilio_response("Your <Chocolate Therapy> cake & card are ready for \"pickup\" at 5pm!")
+
+@benchmark(number=20000, setup=lambda: Conversation("+15550001"))
+def conversation_add_message(conversation):
+    conversation.add_message("user", "Do you have any vegan cakes today?")
+    if len(conversation.messages) > 100:
+        conversation.messages.clear()
+
+def _conversation_manager():
+    manager = ConversationManager()
+    # An hour old: well within max_age, so the scan expires nothing
+    active_an_hour_ago = datetime.now() - timedelta(hours=1)
+    for number in range(1000):
+        manager.get_conversation(f"+1555{number:07d}").last_updated = active_an_hour_ago
+    return manager
+
+@benchmark(number=200, setup=_conversation_manager)
+def cleanup_old_conversations_1k(manager):
+    # Nothing is old enough to expire: this is the per-turn cost of the scan
+    manager.cleanup_old_conversations()
+
+def _faq_path():
+    # get_faq reads app/faq.txt relative to the working directory
+    if not os.path.exists("app/faq.txt"):
+        raise RuntimeError("Run the benchmarks from the project root (app/faq.txt not found)")
+
+@benchmark(number=2000, setup=_faq_path)
+def get_faq_parse(_):
+    get_faq()
+
+@benchmark(number=20000)
+def custom_cake_price():
+    calculate_custom_cake_price("Three tier vanilla cake with fondant, fresh flowers and a custom topper, gluten free")
+
+def _order():
+    order = Order(id=1, customer_id=7, type="custom", status=OrderStatus.CONFIRMED, total_amount=95.0,
+                  payment_status="paid", created_at=datetime(2024, 5, 1, 10, 0),
+                  pickup_time=datetime(2024, 5, 3, 16, 0), summary="Two tier birthday cake")
+    order.details = [
+        OrderDetail(id=index, order_id=1, cake_name="Custom", size="8 inch", tiers=2, flavor="vanilla",
+                    filling="raspberry", frosting="buttercream", dietary_restrictions=["nut-free"],
+                    message="Happy Birthday!", special_instructions="Blue flowers")
+        for index in range(3)
+    ]
+    return order
+
+@benchmark(number=5000, setup=_order)
+def order_to_dict(order):
+    order.to_dict()
+
+def _stage_histogram():
+    return MetricsRegistry().histogram("chat_stage_seconds", "Stage timing", ("stage",))
+
+@benchmark(number=50000, setup=_stage_histogram)
+def metrics_histogram_observe(stage_seconds):
+    stage_seconds.observe(0.42, stage="llm_call")
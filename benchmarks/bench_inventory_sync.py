@@ -0,0 +1,40 @@
+"""
+Syncing a 50k-product sheet into the products table when 1% of the rows changed.
+
+Each call alternates between two versions of the sheet that differ in 500 rows (300 price
+changes, 100 new products, 100 removed), so every call writes 1% of the catalog.
+"""
+from decimal import Decimal
+import os
+import tempfile
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.runner import benchmark
+from app.models.database import Base
+from app.services.inventory_sync import sync_products
+
+PRODUCTS = 50_000
+
+def _product(number, price):
+    return {"name": f"Cake {number}", "price": Decimal(price), "description": "Sponge, cream and berries",
+            "quantity": number % 7, "image": f"https://example.com/{number}.jpg"}
+
+def _setup():
+    path = os.path.join(tempfile.mkdtemp(), "inventory_sync.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    before = [_product(number, f"{number % 50 + 20}.00") for number in range(PRODUCTS)]
+    after = [_product(number, "99.00" if number % 500 >= 497 else f"{number % 50 + 20}.00")
+             for number in range(100, PRODUCTS + 100)]
+    sync_products(before, db)
+    return {"db": db, "sheets": [after, before], "calls": 0}
+
+@benchmark(number=1, setup=_setup)
+def inventory_sync_50k_1pct_changed(state):
+    sheet = state["sheets"][state["calls"] % 2]
+    state["calls"] += 1
+    report = sync_products(iter(sheet), state["db"])
+    assert report["inserted"] + report["updated"] + report["deleted"] == 500
@@ -0,0 +1,88 @@
+"""
+Per-request logging overhead: the old print/f-string logging against queued, level-gated logging.
+
+`request_logging_legacy` reproduces what one /chat request used to write (headers, form data,
+phone number and message at INFO, and the full transcript printed before each of three LLM
+calls); `request_logging` is what the same request logs now at INFO with transcripts unsampled.
+"""
+import logging
+import logging.handlers
+import os
+import queue
+
+from benchmarks.runner import benchmark
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.utils.logging_config import DroppingQueueHandler
+from app.utils.tools.agents import bakery_agent
+
+LLM_CALLS_PER_TURN = 3
+HEADERS = {"host": "bakerybot.example.com", "user-agent": "TwilioProxy/1.1",
+           "content-type": "application/x-www-form-urlencoded", "x-twilio-signature": "b2x9Qm5vZ0JmV1h6aGx3c2R0Z3A=",
+           "accept": "*/*", "content-length": "412"}
+FORM = {"From": "whatsapp:+15550001", "To": "whatsapp:+15559999", "Body": "Can I get a chocolate cake for Saturday?",
+        "MessageSid": "SM0123456789abcdef0123456789abcdef", "NumMedia": "0", "ProfileName": "Sam"}
+
+def _messages():
+    messages = [{"role": "system", "content": bakery_agent.instructions}]
+    for turn in range(15):
+        messages.append({"role": "user", "content": f"Message {turn}: do you have a vegan chocolate cake for Saturday?"})
+        messages.append({"role": "assistant", "content": "Yes! Our Chocolate Therapy cake can be made vegan. " * 3})
+    return messages
+
+def _logger(name, handler):
+    logger = logging.getLogger(f"benchmarks.{name}")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+def _devnull_handler():
+    handler = logging.StreamHandler(open(os.devnull, "w"))
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    return handler
+
+def _legacy():
+    return _logger("legacy", _devnull_handler()), open(os.devnull, "w"), _messages()
+
+def _print_messages(messages, stream):
+    """The transcript dump ChatService used to print before every LLM call."""
+    print("\n=== Messages being sent to OpenAI ===", file=stream)
+    for msg in messages:
+        print(f"Role: {msg['role']}", file=stream)
+        print(f"Content: {msg['content']}", file=stream)
+        if 'tool_calls' in msg:
+            print(f"Tool calls: {msg['tool_calls']}", file=stream)
+        print("---", file=stream)
+    print("===================================\n", file=stream)
+
+@benchmark(number=500, setup=_legacy)
+def request_logging_legacy(state):
+    logger, stream, messages = state
+    logger.info("\n=== Request received ===")
+    logger.info(f"Headers: {dict(HEADERS)}")
+    logger.info(f"Form data: {dict(FORM)}")
+    logger.info(f"Phone number: {FORM['From']}")
+    logger.info(f"Message: {FORM['Body']}")
+    for _ in range(LLM_CALLS_PER_TURN):
+        print(f"Current agent: {bakery_agent.name}", file=stream)
+        _print_messages(messages, stream)
+
+def _queued():
+    # Large queue so the benchmark measures enqueueing, not dropping
+    log_queue = queue.Queue(1_000_000)
+    logging.handlers.QueueListener(log_queue, _devnull_handler()).start()
+    service = ChatService(openai_client=None, initial_agent=bakery_agent, transcript_sample_rate=0.0)
+    return _logger("queued", DroppingQueueHandler(log_queue)), service, Conversation("+15550001"), _messages()
+
+@benchmark(number=500, setup=_queued)
+def request_logging(state):
+    logger, service, conversation, messages = state
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Headers: %s", dict(HEADERS))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Form data: %s", dict(FORM))
+    logger.info("Message from %s (%d chars)", FORM["From"], len(FORM["Body"]))
+    if service._sample_transcript():
+        for _ in range(LLM_CALLS_PER_TURN):
+            service._log_transcript(conversation, bakery_agent, messages)
@@ -0,0 +1,47 @@
+"""
+Contention on one product: 300 concurrent checkouts (64 threads) for 100 cakes in stock.
+
+Each checkout is one conditional UPDATE plus the reservation insert, so exactly 100 succeed.
+Runs on SQLite, which serializes writers; on PostgreSQL only the product row is contended.
+Each call first restocks the product.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+
+from sqlalchemy import create_engine, delete, update
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.runner import benchmark
+from app.models.database import Base, Product, StockReservation
+from app.services.reservation_service import reserve_stock
+
+THREADS = 64
+CHECKOUTS = 300
+STOCK = 100
+
+def _setup():
+    path = os.path.join(tempfile.mkdtemp(), "reservations.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30},
+                           pool_size=THREADS)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        product = Product(name="Chocolate Therapy", price=45.0, quantity=STOCK)
+        db.add(product)
+        db.commit()
+        product_id = product.id
+    return {"factory": factory, "product_id": product_id, "pool": ThreadPoolExecutor(max_workers=THREADS)}
+
+def _checkout(state):
+    with state["factory"]() as db:
+        return reserve_stock(db, state["product_id"]) is not None
+
+@benchmark(number=1, setup=_setup)
+def reserve_stock_300_concurrent_checkouts(state):
+    with state["factory"]() as db:
+        db.execute(delete(StockReservation))
+        db.execute(update(Product).values(quantity=STOCK))
+        db.commit()
+    sold = sum(state["pool"].map(_checkout, [state] * CHECKOUTS))
+    assert sold == STOCK
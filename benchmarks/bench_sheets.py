@@ -0,0 +1,90 @@
+"""
+Google Sheets CSV export parsing.
+
+`parse_sheet_csv_legacy_200k_rows` reproduces the character-by-character parser that
+read_public_sheet used before it streamed the response through the csv module.
+`read_google_sheet_cached_5k_rows` and `read_google_sheet_not_modified_5k_rows` are repeated
+reads of one sheet served from the sheet cache, without and with an ETag revalidation.
+"""
+from unittest import mock
+import io
+
+from benchmarks.runner import benchmark
+from app.utils.tools import gdrive
+
+HEADER = "name,description,price,quantity,image"
+
+def _sheet_csv(rows):
+    lines = [HEADER]
+    lines += [f'Cake {row},"Sponge, cream and berries",{row % 50 + 20}.00,{row % 7},https://example.com/{row}.jpg'
+              for row in range(rows)]
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+class _StreamedResponse:
+    """What Session.get(..., stream=True) returns for the export, with the body in memory."""
+
+    def __init__(self, body, status_code=200):
+        self.raw = io.BytesIO(body)
+        self.status_code = status_code
+        self.headers = {"ETag": '"v1"'}
+
+    def close(self):
+        pass
+
+def _read(body, expected_rows):
+    with mock.patch("requests.Session.get", side_effect=lambda *args, **kwargs: _StreamedResponse(body)):
+        rows = gdrive.read_public_sheet("benchmark-sheet")
+    assert len(rows) == expected_rows + 1
+
+@benchmark(number=5, setup=lambda: _sheet_csv(500))
+def read_public_sheet_500_rows(body):
+    _read(body, 500)
+
+@benchmark(number=1, setup=lambda: _sheet_csv(200_000))
+def read_public_sheet_200k_rows(body):
+    _read(body, 200_000)
+
+def _export_with_etag(url, headers, **kwargs):
+    if headers.get("If-None-Match") == '"v1"':
+        return _StreamedResponse(b"", status_code=304)
+    return _StreamedResponse(_sheet_csv(5_000))
+
+def _cached_sheet():
+    gdrive.sheet_cache.clear()
+    with mock.patch("requests.Session.get", side_effect=_export_with_etag):
+        gdrive.read_google_sheet("benchmark-sheet")
+
+@benchmark(number=100, setup=_cached_sheet)
+def read_google_sheet_cached_5k_rows(_):
+    with mock.patch("requests.Session.get", side_effect=_export_with_etag) as get:
+        assert len(gdrive.read_google_sheet("benchmark-sheet")) == 5_001
+    assert not get.called
+
+@benchmark(number=100, setup=_cached_sheet)
+def read_google_sheet_not_modified_5k_rows(_):
+    with mock.patch("requests.Session.get", side_effect=_export_with_etag):
+        assert sum(1 for _ in gdrive.iter_sheet_rows("benchmark-sheet", max_age=0)) == 5_001
+
+def _parse_legacy(content):
+    """The old parser: split on line breaks, then toggle on every quote character."""
+    lines = [line for line in content.splitlines() if line.strip()]
+    parsed_rows = []
+    for line in lines:
+        in_quotes = False
+        current_value = []
+        row_values = []
+        for char in line:
+            if char == '"':
+                in_quotes = not in_quotes
+            elif char == ',' and not in_quotes:
+                row_values.append(''.join(current_value).strip().strip('"'))
+                current_value = []
+            else:
+                current_value.append(char)
+        row_values.append(''.join(current_value).strip().strip('"'))
+        parsed_rows.append(row_values)
+    return parsed_rows
+
+@benchmark(number=1, setup=lambda: _sheet_csv(200_000).decode())
+def parse_sheet_csv_legacy_200k_rows(content):
+    assert len(_parse_legacy(content)) == 200_000 + 1
@@ -0,0 +1,29 @@
+"""
+Cold-start import time, measured in a fresh interpreter per call.
+
+`import_app_main` is what a new worker pays before it can serve a request; heavy optional
+dependencies (the Google API client, OAuth libraries) must not show up in it. Use
+`python -X importtime -c "import app.main"` to see which module a regression comes from.
+"""
+import os
+import subprocess
+import sys
+
+from benchmarks.runner import benchmark, BENCHMARKS_DIR
+
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+
+def _environment():
+    # AsyncOpenAI is created at import time and needs some API key
+    return dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "benchmark")
+
+def _import(module, environment):
+    subprocess.run([sys.executable, "-c", f"import {module}"], env=environment, cwd=PROJECT_ROOT, check=True)
+
+@benchmark(number=1, setup=_environment)
+def import_app_main(environment):
+    _import("app.main", environment)
+
+@benchmark(number=1, setup=_environment)
+def import_gdrive_tools(environment):
+    _import("app.utils.tools.gdrive", environment)
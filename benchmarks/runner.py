@@ -0,0 +1,154 @@
+"""
+Micro-benchmark runner.
+
+Benchmarks are plain functions registered with @benchmark in benchmarks/bench_*.py.
+Each run appends a record to a JSON-lines history file and is compared with the
+previous record so regressions show up between releases.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import importlib
+import json
+import os
+import pkgutil
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY_FILE = os.path.join(BENCHMARKS_DIR, "history.jsonl")
+DEFAULT_THRESHOLD = 0.20  # flag benchmarks more than 20% slower than the previous run
+
+class Benchmark:
+    def __init__(self, name: str, func: Callable[[], Any], setup: Optional[Callable[[], Any]], number: int):
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.number = number
+
+REGISTRY: Dict[str, Benchmark] = {}
+
+def benchmark(name: Optional[str] = None, number: int = 1000, setup: Optional[Callable[[], Any]] = None):
+    """
+    Register a benchmark.
+
+    Args:
+        name (Optional[str]): Benchmark name (defaults to the function name)
+        number (int): Calls per timing sample
+        setup (Optional[Callable]): Called once before timing; its return value is passed to the benchmark
+
+    Example:
+        @benchmark(number=10000)
+        def twiml_response():
+            response_service.create_twilio_response("Your order is ready!")
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        REGISTRY[name or func.__name__] = Benchmark(name or func.__name__, func, setup, number)
+        return func
+    return decorator
+
+def load_benchmarks() -> None:
+    """Import every benchmarks/bench_*.py module so their benchmarks register."""
+    for module in pkgutil.iter_modules([BENCHMARKS_DIR]):
+        if module.name.startswith("bench_"):
+            importlib.import_module(f"benchmarks.{module.name}")
+
+def run_benchmark(bench: Benchmark, repeat: int) -> Dict[str, float]:
+    """Time a benchmark; returns per-call timings in microseconds."""
+    if bench.setup:
+        state = bench.setup()
+        func = lambda: bench.func(state)
+    else:
+        func = bench.func
+    func()  # warm-up (imports, caches)
+    samples = [t / bench.number * 1e6 for t in timeit.repeat(func, number=bench.number, repeat=repeat)]
+    return {
+        "min_us": round(min(samples), 3),
+        "median_us": round(statistics.median(samples), 3),
+        "calls": bench.number * repeat,
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=BENCHMARKS_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def read_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def append_history(path: str, record: Dict[str, Any]) -> None:
+    with open(path, "a") as file:
+        file.write(json.dumps(record) + "\n")
+
+def find_regressions(previous: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Benchmarks whose min time grew by more than `threshold` (a fraction) since `previous`."""
+    regressions = []
+    for name, result in current["results"].items():
+        before = previous.get("results", {}).get(name)
+        if not before or not before["min_us"]:
+            continue
+        change = result["min_us"] / before["min_us"] - 1
+        if change > threshold:
+            regressions.append({"name": name, "before_us": before["min_us"], "after_us": result["min_us"],
+                                "change": round(change, 3)})
+    return regressions
+
+def run(names: Optional[List[str]] = None, repeat: int = 5, history_file: str = DEFAULT_HISTORY_FILE,
+        threshold: float = DEFAULT_THRESHOLD, save: bool = True) -> Dict[str, Any]:
+    """
+    Run benchmarks, record them in the history file and compare with the previous record.
+
+    Returns:
+        Dict[str, Any]: The history record plus a 'regressions' list
+    """
+    load_benchmarks()
+    selected = [REGISTRY[name] for name in names] if names else list(REGISTRY.values())
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {bench.name: run_benchmark(bench, repeat) for bench in selected},
+    }
+    history = read_history(history_file)
+    regressions = find_regressions(history[-1], record, threshold) if history else []
+    if save:
+        append_history(history_file, record)
+    return {**record, "regressions": regressions}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the bakerybot micro-benchmarks")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing samples per benchmark")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="JSON-lines history file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown (fraction) reported as a regression")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        load_benchmarks()
+        print("\n".join(sorted(REGISTRY)))
+        return 0
+
+    report = run(args.names or None, args.repeat, args.history, args.threshold, save=not args.no_save)
+    width = max(len(name) for name in report["results"]) if report["results"] else 0
+    for name, result in report["results"].items():
+        print(f"{name:<{width}}  min {result['min_us']:>12.3f} us  median {result['median_us']:>12.3f} us")
+    for regression in report["regressions"]:
+        print(f"REGRESSION {regression['name']}: {regression['before_us']} us -> {regression['after_us']} us "
+              f"(+{regression['change']:.0%})")
+    return 1 if report["regressions"] and args.fail_on_regression else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
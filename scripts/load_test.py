@@ -0,0 +1,150 @@
+"""
+End-to-end load generator for the /chat webhook.
+
+Simulates many customers (one phone number each) sending form-encoded Twilio
+webhooks and reports throughput and latency percentiles.
+
+Offline run against the app in-process with the mock LLM backend and SQLite:
+
+    python scripts/load_test.py --users 2000 --messages 3 --concurrency 200
+
+Against a running server (start it with LLM_BACKEND=mock to avoid OpenAI costs):
+
+    python scripts/load_test.py --url http://localhost:8000 --users 2000
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+MESSAGES = [
+    "hi",
+    "what cakes do you have available for pickup today?",
+    "what are your opening hours?",
+    "I'd like the chocolate cake please",
+    "thanks, bye for now",
+]
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+def summarize(latencies: List[float], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    """Build the report of a run."""
+    requests_sent = len(latencies) + sum(errors.values())
+    return {
+        "requests": requests_sent,
+        "ok": len(latencies),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests_sent / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 0.50), 4),
+            "p95": round(percentile(latencies, 0.95), 4),
+            "p99": round(percentile(latencies, 0.99), 4),
+            "max": round(max(latencies), 4) if latencies else 0.0,
+        },
+    }
+
+async def simulate_user(client: httpx.AsyncClient, user: int, messages: int, think_time: float,
+                        latencies: List[float], errors: Dict[str, int], semaphore: asyncio.Semaphore) -> None:
+    """Send `messages` webhooks in order for one simulated phone number."""
+    phone_number = f"whatsapp:+1555{user:07d}"
+    for index in range(messages):
+        form = {
+            "From": phone_number,
+            "Body": MESSAGES[index % len(MESSAGES)],
+            "MessageSid": f"SM{uuid.uuid4().hex}",
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/chat", data=form)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            latency = time.perf_counter() - started
+        if response.status_code == 200:
+            latencies.append(latency)
+        else:
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        if think_time:
+            await asyncio.sleep(think_time)
+
+async def run_load(client: httpx.AsyncClient, users: int, messages: int, concurrency: int,
+                   think_time: float = 0.0) -> Dict[str, Any]:
+    """
+    Drive `users` simulated customers through /chat with at most `concurrency` requests in flight.
+
+    Returns:
+        Dict[str, Any]: Report with request counts, errors, throughput and latency percentiles
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        simulate_user(client, user, messages, think_time, latencies, errors, semaphore)
+        for user in range(users)
+    ])
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the app in this process (mock LLM, form input) and load it through an ASGI transport."""
+    os.environ.setdefault("LLM_BACKEND", "mock")
+    os.environ.setdefault("INPUT_FORMAT", "form")
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./load_test.db")
+    os.environ.setdefault("DB_SCHEMA_CHECK", "create")
+    # Admission control is sized for OpenAI; lift it so the app itself is measured
+    os.environ.setdefault("OPENAI_RPM_LIMIT", "1000000000")
+    os.environ.setdefault("OPENAI_TPM_LIMIT", "1000000000")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.concurrency))
+    os.environ.setdefault("LLM_MAX_QUEUE", str(args.concurrency * 2))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+            return await run_load(client, args.users, args.messages, args.concurrency, args.think_time)
+
+async def run_remote(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        return await run_load(client, args.users, args.messages, args.concurrency, args.think_time)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the /chat webhook")
+    parser.add_argument("--url", help="Base URL of a running server; omit to run the app in-process")
+    parser.add_argument("--users", type=int, default=1000, help="Simulated phone numbers")
+    parser.add_argument("--messages", type=int, default=3, help="Messages sent by each phone number")
+    parser.add_argument("--concurrency", type=int, default=100, help="Maximum requests in flight")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a user's messages")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run_remote(args) if args.url else run_in_process(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    latency = report["latency_seconds"]
+    print(f"Requests:   {report['requests']} ({report['ok']} ok, errors: {report['errors'] or 'none'})")
+    print(f"Elapsed:    {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['throughput_rps']} req/s")
+    print(f"Latency:    p50={latency['p50']}s p95={latency['p95']}s p99={latency['p99']}s max={latency['max']}s")
+
+if __name__ == "__main__":
+    main()
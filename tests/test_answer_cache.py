@@ -0,0 +1,55 @@
+import pytest
+from app.services.answer_cache_service import AnswerCache, normalize_question
+
+FAQS = [
+    {"question": "What are your opening hours?", "answer": "We are open 7 AM to 7 PM."},
+    {"question": "Do you offer gluten-free options?", "answer": "Yes, every day."},
+    {"question": "Can I place custom cake orders?", "answer": "Yes, with 48 hours notice."},
+]
+
+@pytest.fixture
+def cache():
+    return AnswerCache(threshold=0.88, ttl_seconds=60, max_entries=2,
+                       faq_loader=lambda: FAQS, faq_path=None)
+
+def test_normalize_question():
+    assert normalize_question("Hi!! What are your OPENING hours, please?") == "what are your opening hours"
+
+def test_lookup_matches_near_verbatim_faq(cache):
+    hit = cache.lookup("hey, what are your opening hours??")
+    assert hit is not None
+    assert hit.source == "faq"
+    assert hit.answer == "We are open 7 AM to 7 PM."
+
+def test_lookup_misses_unrelated_message(cache):
+    assert cache.lookup("I'd like to order a chocolate cake") is None
+    assert cache.lookup("yes") is None
+    assert cache.stats()["hit_ratio"] == 0.0
+
+@pytest.mark.parametrize("message", [
+    "Can I cancel custom cake orders?",
+    "Can I place custom cookie orders?",
+    "Can I not place custom cake orders?",
+    "What are your closing hours?",
+])
+def test_lookup_misses_near_miss_questions(cache, message):
+    assert cache.lookup(message) is None
+
+def test_lookup_matches_singular_and_plural_wording(cache):
+    assert cache.lookup("can i place a custom cake order").answer == "Yes, with 48 hours notice."
+
+def test_approved_answers_are_served_and_bounded(cache):
+    assert cache.approve("Do you deliver on Sundays?", "No Sunday deliveries.")
+    assert cache.lookup("do you deliver on sundays").answer == "No Sunday deliveries."
+
+    cache.approve("Is there parking?", "Yes, behind the shop.")
+    cache.approve("Do you sell coffee?", "Yes, all day.")
+    # max_entries=2 evicts the least recently used approval
+    assert cache.lookup("do you deliver on sundays") is None
+
+def test_approved_answers_expire(cache, monkeypatch):
+    cache.approve("Is there parking?", "Yes, behind the shop.")
+    import app.services.answer_cache_service as module
+    real_time = module.time.time
+    monkeypatch.setattr(module.time, "time", lambda: real_time() + 120)
+    assert cache.lookup("is there parking") is None
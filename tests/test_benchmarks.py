@@ -0,0 +1,32 @@
+import json
+from benchmarks import runner
+
+def result(min_us):
+    return {"min_us": min_us, "median_us": min_us, "calls": 10}
+
+def test_find_regressions_flags_slowdowns_over_threshold():
+    previous = {"results": {"fast": result(10.0), "steady": result(10.0), "gone": result(5.0)}}
+    current = {"results": {"fast": result(13.0), "steady": result(11.0), "new": result(1.0)}}
+
+    regressions = runner.find_regressions(previous, current, threshold=0.2)
+
+    assert regressions == [{"name": "fast", "before_us": 10.0, "after_us": 13.0, "change": 0.3}]
+
+def test_run_appends_history_and_compares_with_previous_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, "REGISTRY", {})
+    monkeypatch.setattr(runner, "load_benchmarks", lambda: None)
+    runner.benchmark(number=10)(lambda: sum(range(10)))
+    runner.benchmark(name="with_setup", number=10, setup=lambda: list(range(10)))(lambda values: sorted(values))
+    history = tmp_path / "history.jsonl"
+    history.write_text(json.dumps({"results": {"with_setup": result(1e-6)}}) + "\n")
+
+    report = runner.run(repeat=2, history_file=str(history))
+
+    records = [json.loads(line) for line in history.read_text().splitlines()]
+    assert len(records) == 2
+    assert set(records[-1]["results"]) == {"<lambda>", "with_setup"}
+    assert records[-1]["results"]["with_setup"]["calls"] == 20
+    assert [regression["name"] for regression in report["regressions"]] == ["with_setup"]
+
+    runner.run(repeat=1, history_file=str(history), save=False)
+    assert len(history.read_text().splitlines()) == 2
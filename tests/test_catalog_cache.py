@@ -0,0 +1,142 @@
+import os
+from decimal import Decimal
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.models.database import Base, Product
+from app.services import catalog_cache as catalog
+from app.services.catalog_cache import CatalogCache, CatalogChangeListener, render_catalog
+from app.services.inventory_sync import sync_products
+from app.utils.tools import admin
+from app.utils.tools.inventory import get_cake_inventory
+
+@pytest.fixture
+def db_factory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    loads = []
+
+    def counting_factory():
+        loads.append(1)
+        return factory()
+
+    monkeypatch.setattr(catalog.catalog_cache, "session_factory", counting_factory)
+    catalog.catalog_cache.invalidate()
+    factory.loads = loads
+    yield factory
+    catalog.catalog_cache.invalidate()
+
+def test_render_catalog():
+    products = [("Chocolate Therapy", 45.0, "Triple chocolate cake\nwith  ganache", 10),
+                ("Vanilla Bean Bliss", 35, "x" * 200, 2),
+                ("Lemon Drizzle", 30.5, None, 0)]
+
+    text = render_catalog(products, total=5, description_chars=20)
+
+    assert text.splitlines() == [
+        "Cakes (name | price | availability | description):",
+        "Chocolate Therapy | $45.00 | in stock | Triple chocolate...",
+        "Vanilla Bean Bliss | $35.00 | limited (2 left) | xxxxxxxxxxxxxxxxx...",
+        "Lemon Drizzle | $30.50 | sold out",
+        "...and 2 more products not listed",
+    ]
+    assert render_catalog([], total=0) == "No cakes are available right now."
+
+def test_catalog_is_read_through_and_lists_in_stock_products_first(db_factory):
+    with db_factory() as db:
+        db.add_all([Product(name="Lemon Drizzle", price=30, quantity=0),
+                    Product(name="Chocolate Therapy", price=45, description="Rich", quantity=8)])
+        db.commit()
+
+    first = get_cake_inventory()
+
+    assert first.splitlines()[1:] == ["Chocolate Therapy | $45.00 | in stock | Rich", "Lemon Drizzle | $30.00 | sold out"]
+    assert get_cake_inventory() is first
+    assert len(db_factory.loads) == 1
+
+def test_admin_edits_and_syncs_invalidate_the_catalog(db_factory):
+    with db_factory() as db:
+        product = admin.add_new_product("Brownie", 3.5, "Fudgy", 12, db=db)
+        assert "Brownie | $3.50" in get_cake_inventory()
+
+        assert admin.update_product_price(product["id"], 4.25, db=db)
+        assert "Brownie | $4.25" in get_cake_inventory()
+
+        assert admin.remove_product(product["id"], db=db)
+        assert get_cake_inventory() == "No cakes are available right now."
+
+        sync_products([{"name": "Scone", "price": Decimal("2"), "description": "Buttery", "quantity": 1}], db)
+        assert get_cake_inventory().splitlines()[1] == "Scone | $2.00 | limited (1 left) | Buttery"
+
+        # A sync that changes nothing keeps the cached catalog
+        loads = len(db_factory.loads)
+        sync_products([{"name": "Scone", "price": Decimal("2"), "description": "Buttery", "quantity": 1}], db)
+        get_cake_inventory()
+        assert len(db_factory.loads) == loads
+
+def test_load_overlapping_an_invalidation_is_not_cached(db_factory):
+    cache = CatalogCache(db_factory)
+
+    def invalidated_during_load():
+        cache.invalidate()
+        return db_factory()
+
+    cache.session_factory = invalidated_during_load
+    assert cache.get() == "No cakes are available right now."
+    cache.session_factory = db_factory
+    with db_factory() as db:
+        db.add(Product(name="Brownie", price=3, quantity=5))
+        db.commit()
+    assert "Brownie" in cache.get()
+
+def test_previous_catalog_is_served_when_the_database_fails(db_factory):
+    cache = CatalogCache(db_factory, ttl_seconds=0)
+    with pytest.raises(Exception):
+        CatalogCache(lambda: 1 / 0).get()
+    first = cache.get()
+
+    cache.session_factory = lambda: 1 / 0
+    assert cache.get() == first
+
+def test_listener_invalidates_on_notifications_from_other_workers(db_factory):
+    cache = CatalogCache(db_factory)
+    cache.get()
+    listener = CatalogChangeListener(create_engine("sqlite://"), cache=cache)
+    connection = SimpleNamespace(poll=lambda: None, notifies=[SimpleNamespace(payload=str(os.getpid()))])
+
+    assert not listener.supported
+    assert listener.handle_notifications(connection) == 0
+    assert cache._cached() is not None
+
+    connection.notifies = [SimpleNamespace(payload="1"), SimpleNamespace(payload="2")]
+    assert listener.handle_notifications(connection) == 2
+    assert connection.notifies == []
+    assert cache._cached() is None
+
+def test_new_databases_start_with_the_starter_catalog(tmp_path, monkeypatch):
+    from alembic import command
+    from alembic.config import Config
+
+    # alembic upgrade head on an empty database
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    monkeypatch.setattr(database, "DATABASE_URL", url)
+    # No alembic.ini: its logging config would disable the app's loggers for later tests
+    config = Config()
+    config.set_main_option("script_location", os.path.join(database.PROJECT_ROOT, "alembic"))
+    command.upgrade(config, "head")
+    with sessionmaker(bind=create_engine(url))() as db:
+        migrated = catalog.load_catalog(db)
+    assert "Chocolate Therapy | $45.00 | in stock" in migrated
+    assert "Vanilla Bean Bliss | $35.00 | limited (3 left)" in migrated
+
+    # DB_SCHEMA_CHECK=create, run twice
+    engine = create_engine(f"sqlite:///{tmp_path / 'created.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    database.init_db()
+    database.init_db()
+    with database.SessionLocal() as db:
+        assert catalog.load_catalog(db) == migrated
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.utils.tools.agents import Agent
+
+def get_customer_by_phone(phone_number: str) -> dict:
+    """Stub lookup used by the scripted model."""
+    return {"id": 7, "name": "Sam", "phone_number": phone_number}
+
+class ScriptedCompletions:
+    """Behaves like a model that follows the agent routine: look the customer up unless the profile is preloaded."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, messages, tools, **kwargs):
+        self.calls.append(messages)
+        system = messages[0]["content"]
+        if "Customer profile" not in system and messages[-1]["role"] == "user":
+            tool_call = SimpleNamespace(
+                id="call_1",
+                function=SimpleNamespace(name="get_customer_by_phone",
+                                         arguments=json.dumps({"phone_number": "+15550001"}))
+            )
+            message = SimpleNamespace(content=None, tool_calls=[tool_call])
+        else:
+            message = SimpleNamespace(content="Welcome back to chocolate therapy Sam!", tool_calls=None)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=40))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def make_service():
+    completions = ScriptedCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent = Agent(name="TestBot", instructions="Greet the customer.", tools=[get_customer_by_phone])
+    return ChatService(openai_client=client, initial_agent=agent), completions
+
+def test_first_turn_without_profile_needs_lookup_round_trip():
+    service, completions = make_service()
+    conversation = Conversation("+15550001")
+
+    reply = asyncio.run(service.process_message("hi", conversation))
+
+    assert reply.startswith("Welcome back")
+    assert len(completions.calls) == 2
+
+def test_preloaded_profile_skips_lookup_round_trip():
+    service, completions = make_service()
+    conversation = Conversation("+15550001")
+    conversation.customer_profile = {
+        "id": 7, "name": "Sam", "phone_number": "+15550001", "preferences": {"flavor": "chocolate"},
+        "recent_orders": [{"order_id": 3, "type": "immediate", "status": "completed", "payment_status": "paid",
+                           "amount": 45.0, "created_at": "2025-01-10", "summary": "Chocolate Therapy"}]
+    }
+
+    reply = asyncio.run(service.process_message("hi", conversation))
+
+    assert reply.startswith("Welcome back")
+    assert len(completions.calls) == 1
+    system = completions.calls[0][0]["content"]
+    assert "- name: Sam" in system
+    assert '{"flavor":"chocolate"}' in system
+    assert "#3 immediate $45.00 completed/paid (2025-01-10): Chocolate Therapy" in system
+
+def test_usage_is_aggregated_per_conversation_agent_and_tool():
+    service, _ = make_service()
+    conversation = Conversation("+15550001")
+
+    asyncio.run(service.process_message("hi", conversation))
+
+    usage = service.usage_tracker.get_conversation_usage("+15550001")
+    assert usage["llm_calls"] == 2
+    assert usage["prompt_tokens"] == 200
+    assert usage["completion_tokens"] == 20
+    assert usage["cached_tokens"] == 80
+    assert usage["turns"] == 1
+    assert usage["tool_iterations"] == 1
+    summary = service.usage_tracker.summary()
+    assert summary["agents"]["TestBot"]["tool_calls"] == 1
+    assert summary["tools"]["get_customer_by_phone"]["calls"] == 1
+
+class LoopingCompletions:
+    """A model stuck in a tool loop, optionally slow to answer."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, model, messages, tools, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        tool_call = SimpleNamespace(
+            id=f"call_{self.calls}",
+            function=SimpleNamespace(name="get_customer_by_phone",
+                                     arguments=json.dumps({"phone_number": "+15550001"}))
+        )
+        message = SimpleNamespace(content=None, tool_calls=[tool_call])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+def make_looping_service(delay: float, **kwargs):
+    completions = LoopingCompletions(delay)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent = Agent(name="TestBot", instructions="Greet the customer.", tools=[get_customer_by_phone])
+    return ChatService(openai_client=client, initial_agent=agent, fallback_message="Please try again", **kwargs), completions
+
+def test_iteration_budget_returns_fallback():
+    service, completions = make_looping_service(0.0, max_iterations=3)
+    conversation = Conversation("+15550001")
+
+    reply = asyncio.run(service.process_message("hi", conversation))
+
+    assert reply == "Please try again"
+    assert completions.calls == 3
+    assert conversation.get_messages()[-1] == {"role": "assistant", "content": "Please try again"}
+
+def test_deadline_cancels_slow_call_and_returns_fallback():
+    service, completions = make_looping_service(5.0, turn_deadline_seconds=0.2)
+    conversation = Conversation("+15550001")
+
+    started = time.monotonic()
+    reply = asyncio.run(service.process_message("hi", conversation))
+
+    assert reply == "Please try again"
+    assert time.monotonic() - started < 2
+
+def test_started_tool_finishes_past_the_deadline_and_its_result_is_kept():
+    finished = []
+
+    def create_order(customer_id: int) -> dict:
+        """Slow side-effecting tool."""
+        time.sleep(0.3)
+        finished.append(customer_id)
+        return {"order_id": 42, "status": "pending"}
+
+    class OrderingCompletions:
+        async def create(self, model, messages, tools, **kwargs):
+            tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(name="create_order",
+                                                                              arguments='{"customer_id": 7}'))
+            message = SimpleNamespace(content=None, tool_calls=[tool_call])
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=OrderingCompletions()))
+    agent = Agent(name="TestBot", instructions="Take orders.", tools=[create_order])
+    service = ChatService(openai_client=client, initial_agent=agent, fallback_message="Please try again",
+                          turn_deadline_seconds=0.1)
+    conversation = Conversation("+15550001")
+
+    reply = asyncio.run(service.process_message("one cake please", conversation))
+
+    assert reply == "Please try again"
+    assert finished == [7]
+    note = conversation.get_messages()[-2]
+    assert note["role"] == "system" and 'create_order({"customer_id": 7}) -> ' in note["content"]
+    assert "'order_id': 42" in note["content"]
+
+ORDER_AGENT = Agent(name="OrderBot", instructions="Take the order.", tools=[get_customer_by_phone])
+
+def transfer_to_orders() -> Agent:
+    """Stub transfer."""
+    return ORDER_AGENT
+
+def get_opening_hours() -> str:
+    """Stub hours."""
+    return "7 AM to 7 PM"
+
+class InterleavedCompletions:
+    """+15550001 is transferred to the order agent while +15550002's turn waits on its first model call."""
+
+    def __init__(self):
+        self.calls = []
+        self.transferred = asyncio.Event()
+
+    async def create(self, model, messages, tools, **kwargs):
+        system = messages[0]["content"]
+        phone_number = system.rsplit(" ", 1)[-1]
+        self.calls.append((phone_number, system.split("\n")[0], sorted(tool["function"]["name"] for tool in tools)))
+        if phone_number == "+15550002" and messages[-1]["role"] == "user":
+            await self.transferred.wait()
+            tool_call = SimpleNamespace(id="call_2", function=SimpleNamespace(name="get_opening_hours", arguments="{}"))
+            message = SimpleNamespace(content=None, tool_calls=[tool_call])
+        elif phone_number == "+15550002":
+            message = SimpleNamespace(content="We open at 7.", tool_calls=None)
+        elif messages[-1]["role"] == "user":
+            tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(name="transfer_to_orders", arguments="{}"))
+            message = SimpleNamespace(content=None, tool_calls=[tool_call])
+        else:
+            self.transferred.set()
+            message = SimpleNamespace(content="What would you like?", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+def test_transfer_in_one_conversation_does_not_change_another_turns_agent():
+    completions = InterleavedCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    triage = Agent(name="TriageBot", instructions="Route the customer.", tools=[transfer_to_orders, get_opening_hours])
+    service = ChatService(openai_client=client, initial_agent=triage)
+    transferred, waiting = Conversation("+15550001"), Conversation("+15550002")
+
+    async def run():
+        return await asyncio.gather(service.process_message("cake please", transferred),
+                                    service.process_message("hi", waiting))
+
+    assert asyncio.run(run()) == ["What would you like?", "We open at 7."]
+    triage_tools = ["get_opening_hours", "transfer_to_orders"]
+    assert completions.calls == [
+        ("+15550001", "Route the customer.", triage_tools),
+        ("+15550002", "Route the customer.", triage_tools),
+        ("+15550001", "Take the order.", ["get_customer_by_phone"]),
+        ("+15550002", "Route the customer.", triage_tools),
+    ]
+    assert (transferred.agent, waiting.agent) == (ORDER_AGENT, None)
+    assert service.agent_for(waiting) is triage
+
+    transferred.clear()
+    assert service.agent_for(transferred) is triage
@@ -0,0 +1,42 @@
+import asyncio
+from app.services.coalescing_service import MessageCoalescer, clamp_turn_deadline
+
+async def send_burst(coalescer, key, messages, gap):
+    tasks = []
+    for message in messages:
+        tasks.append(asyncio.create_task(coalescer.submit(key, message)))
+        await asyncio.sleep(gap)
+    return await asyncio.gather(*tasks)
+
+def test_burst_is_merged_into_last_submission():
+    coalescer = MessageCoalescer(window_seconds=0.1, max_wait_seconds=1.0)
+
+    results = asyncio.run(send_burst(coalescer, "+1555", ["hi", "I want a cake", "for 10 people"], 0.02))
+
+    assert results == [None, None, "hi\nI want a cake\nfor 10 people"]
+
+def test_senders_are_coalesced_independently():
+    coalescer = MessageCoalescer(window_seconds=0.05, max_wait_seconds=1.0)
+
+    async def run():
+        return await asyncio.gather(
+            coalescer.submit("+1555", "hello"),
+            coalescer.submit("+1666", "hours?"),
+        )
+
+    assert asyncio.run(run()) == ["hello", "hours?"]
+
+def test_max_wait_bounds_a_continuous_burst():
+    coalescer = MessageCoalescer(window_seconds=0.1, max_wait_seconds=0.15)
+
+    results = asyncio.run(send_burst(coalescer, "+1555", ["a", "b", "c", "d", "e", "f"], 0.05))
+
+    # The burst never goes quiet for the full window, so max_wait forces a flush part way through
+    merged = [r for r in results if r is not None]
+    assert len(merged) >= 2
+    assert "\n".join(merged) == "a\nb\nc\nd\ne\nf"
+
+def test_turn_deadline_is_clamped_to_fit_the_webhook_timeout():
+    assert clamp_turn_deadline(12, max_wait_seconds=3, webhook_timeout=15, margin=1) == 11
+    assert clamp_turn_deadline(8, max_wait_seconds=3, webhook_timeout=15, margin=1) == 8
+    assert clamp_turn_deadline(12, max_wait_seconds=20, webhook_timeout=15, margin=1) == 1.0
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.flight_recorder import FlightRecorder
+from app.utils.tools.agents import Agent
+
+ORDER_BOT = Agent(name="OrderBot", instructions="Take orders.", tools=[])
+
+def transfer_to_orders() -> Agent:
+    """Hand the customer over to the order agent."""
+    return ORDER_BOT
+
+def get_cake_inventory() -> list:
+    """Stub inventory."""
+    return [{"name": "Chocolate Therapy"}]
+
+class ScriptedBackend:
+    """Calls get_cake_inventory, then transfers to OrderBot, then replies."""
+
+    def __init__(self):
+        self.script = [("get_cake_inventory", "{}"), ("transfer_to_orders", "{}"), None]
+
+    async def create(self, model, messages, tools, timeout=None):
+        step = self.script.pop(0)
+        if step:
+            tool_call = SimpleNamespace(id=f"call_{len(self.script)}",
+                                        function=SimpleNamespace(name=step[0], arguments=step[1]))
+            message = SimpleNamespace(content=None, tool_calls=[tool_call])
+        else:
+            message = SimpleNamespace(content="Sure, which size?", tool_calls=None)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def run_turn(recorder, phone_number="+15550001"):
+    agent = Agent(name="BakeryBot", instructions="Help.", tools=[get_cake_inventory, transfer_to_orders])
+    service = ChatService(openai_client=None, initial_agent=agent, backend=ScriptedBackend(),
+                          flight_recorder=recorder)
+    return asyncio.run(service.process_message("I want a cake", Conversation(phone_number)))
+
+def test_turn_spans_are_recorded(tmp_path):
+    recorder = FlightRecorder(slow_turn_seconds=60, log_path=str(tmp_path / "slow.jsonl"))
+
+    assert run_turn(recorder) == "Sure, which size?"
+
+    turns = recorder.turns("+15550001")
+    assert turns["in_progress"] == []
+    turn = turns["recent"][0]
+    assert turn["outcome"] == "ok"
+    assert [span["kind"] for span in turn["spans"]] == [
+        "llm_call", "tool_call", "llm_call", "tool_call", "transfer", "llm_call"
+    ]
+    assert turn["spans"][0]["tool_calls"] == ["get_cake_inventory"]
+    assert turn["spans"][0]["prompt_tokens"] == 100
+    assert turn["spans"][1]["tool"] == "get_cake_inventory"
+    assert turn["spans"][4]["from_agent"] == "BakeryBot" and turn["spans"][4]["to_agent"] == "OrderBot"
+    assert turn["spans"][5]["agent"] == "OrderBot"
+    assert recorder.slow_turns("+15550001") == []
+    assert not (tmp_path / "slow.jsonl").exists()
+
+def test_slow_turns_are_dumped_and_found_by_phone_number(tmp_path):
+    log_path = tmp_path / "slow.jsonl"
+    recorder = FlightRecorder(slow_turn_seconds=0, log_path=str(log_path), max_log_bytes=1)
+
+    run_turn(recorder, "+15550001")
+    run_turn(recorder, "+15550002")
+    run_turn(recorder, "+15550001")
+
+    # Every write rotated the file (max_log_bytes=1): the oldest turn is gone, the rotated file is searched
+    assert json.loads(log_path.read_text())["phone_number"] == "+15550001"
+    assert len(recorder.slow_turns("+15550001")) == 1
+    assert recorder.slow_turns("+15550002")[0]["outcome"] == "ok"
+
+    recorder = FlightRecorder(slow_turn_seconds=0, log_path=str(tmp_path / "all.jsonl"))
+    run_turn(recorder, "+15550001")
+    run_turn(recorder, "+15550002")
+    run_turn(recorder, "+15550001")
+    slow = recorder.slow_turns("+15550001")
+    assert len(slow) == 2
+    assert slow[0]["turn_id"] > slow[1]["turn_id"]
+    assert recorder.slow_turns("+15550001", limit=1) == slow[:1]
+
+def test_ring_buffer_and_spans_are_bounded():
+    recorder = FlightRecorder(capacity=2, max_spans=3, log_path=None)
+
+    for _ in range(3):
+        run_turn(recorder)
+
+    recent = recorder.turns("+15550001")["recent"]
+    assert len(recent) == 2
+    assert len(recent[0]["spans"]) == 3
+    assert recent[0]["dropped_spans"] == 3
@@ -0,0 +1,200 @@
+import io
+from decimal import Decimal
+from unittest import mock
+import pytest
+from app.utils.tools import gdrive
+
+@pytest.fixture(autouse=True)
+def empty_sheet_cache():
+    gdrive.sheet_cache.clear()
+    yield
+    gdrive.sheet_cache.clear()
+
+class StreamedResponse:
+    def __init__(self, body: bytes, status_code: int = 200, etag: str = None):
+        self.raw = io.BytesIO(body)
+        self.status_code = status_code
+        self.headers = {"ETag": etag} if etag else {}
+        self.text = body.decode()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def read(body: bytes, status_code: int = 200):
+    response = StreamedResponse(body, status_code)
+    with mock.patch("requests.Session.get", return_value=response) as get:
+        rows = gdrive.read_public_sheet("sheet-id")
+    assert get.call_args.kwargs["stream"] is True
+    assert response.closed
+    return rows
+
+def test_quoted_fields_with_commas_quotes_and_line_breaks():
+    body = ('name,description,price,quantity\r\n'
+            'Chocolate Therapy,"Rich, dark ""Belgian"" chocolate\nwith ganache",45.00,3\r\n'
+            '\r\n'
+            '  Lemon Drizzle  ,Zesty,30,2\r\n').encode()
+
+    assert read(body) == [
+        ["name", "description", "price", "quantity"],
+        ["Chocolate Therapy", 'Rich, dark "Belgian" chocolate\nwith ganache', "45.00", "3"],
+        ["Lemon Drizzle", "Zesty", "30", "2"],
+    ]
+
+def test_utf8_is_decoded_without_a_charset():
+    assert read("name\nCrème brûlée\n".encode()) == [["name"], ["Crème brûlée"]]
+
+def test_http_errors_and_empty_sheets_return_none():
+    assert read(b"Not found", status_code=404) is None
+    assert read(b"\r\n,,\r\n") is None
+
+def test_rows_are_parsed_while_the_response_downloads():
+    body = b"name,price\n" + b"".join(b"Cake %d,%d\n" % (row, row) for row in range(50_000))
+    response = StreamedResponse(body)
+
+    with mock.patch("requests.Session.get", return_value=response):
+        rows = gdrive.open_public_sheet("sheet-id")
+        assert next(rows) == ["name", "price"]
+        assert response.raw.tell() < len(body) / 10
+        assert sum(1 for _ in rows) == 50_000
+    assert response.closed
+
+class StubSheetsAPI:
+    """In-memory stand-in for the Sheets API client returned by googleapiclient's build()."""
+
+    def __init__(self, rows, title="Inventory", row_count=None, column_count=26):
+        self.rows = rows
+        self.title = title
+        self.row_count = row_count or len(rows)
+        self.column_count = column_count
+        self.batch_calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, fields):
+        properties = {"title": self.title,
+                      "gridProperties": {"rowCount": self.row_count, "columnCount": self.column_count}}
+        return mock.Mock(execute=lambda: {"sheets": [{"properties": properties}]})
+
+    def batchGet(self, spreadsheetId, ranges):
+        self.batch_calls.append(ranges)
+        value_ranges = []
+        for range_name in ranges:
+            cells = range_name.rsplit("!", 1)[1]
+            first, last = (int(cell.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")) for cell in cells.split(":"))
+            values = self.rows[first - 1:last]
+            # Like the real API, trailing empty rows are left out
+            while values and not values[-1]:
+                values.pop()
+            value_ranges.append({"range": range_name, "values": values} if values else {"range": range_name})
+        return mock.Mock(execute=lambda: {"valueRanges": value_ranges})
+
+def inventory_rows(products):
+    return [["name", "description", "price", "quantity"]] + [
+        [f"Cake {number}", "Sponge", f"{number % 40 + 10}.00", str(number % 5)] for number in range(products)
+    ]
+
+def test_column_letter():
+    assert [gdrive.column_letter(column) for column in (1, 26, 27, 52, 703)] == ["A", "Z", "AA", "AZ", "AAA"]
+
+def test_sheet_is_read_in_batched_row_pages():
+    api = StubSheetsAPI(inventory_rows(2_499) + [[]] * 500, title="Bob's cakes", column_count=4)
+
+    rows = list(gdrive.iter_google_sheet_rows(api, "sheet-id", page_rows=1000, ranges_per_request=2))
+
+    assert len(rows) == 2_500
+    assert rows[-1][0] == "Cake 2498"
+    assert api.batch_calls == [
+        ["'Bob''s cakes'!A1:D1000", "'Bob''s cakes'!A1001:D2000"],
+        ["'Bob''s cakes'!A2001:D3000"],
+    ]
+
+def test_products_are_validated_as_pages_arrive():
+    api = StubSheetsAPI(inventory_rows(5_000))
+
+    products = gdrive.iter_products(gdrive.iter_google_sheet_rows(api, "sheet-id", page_rows=500,
+                                                                   ranges_per_request=1))
+
+    assert next(products)["name"] == "Cake 0"
+    assert len(api.batch_calls) == 1
+    assert sum(1 for _ in products) == 4_999
+    assert len(api.batch_calls) == 11
+
+def test_load_product_inventory_reads_past_the_first_thousand_rows(monkeypatch):
+    rows = inventory_rows(1_500)
+    rows[10][2] = "free"
+    rows[20] = ["", "No name", "10", "1"]
+    monkeypatch.setattr(gdrive, "build_sheets_service", lambda: StubSheetsAPI(rows))
+
+    products = gdrive.load_product_inventory("https://docs.google.com/spreadsheets/d/abc123/edit", require_auth=True)
+
+    assert len(products) == 1_498
+    assert products[-1] == {"name": "Cake 1499", "price": Decimal("29.00"), "description": "Sponge", "quantity": 4}
+
+def test_load_product_inventory_errors(monkeypatch):
+    monkeypatch.setattr(gdrive, "build_sheets_service", lambda: StubSheetsAPI([["name", "price"], ["Cake", "1"]]))
+    with pytest.raises(ValueError, match="required fields"):
+        gdrive.load_product_inventory("abc123", require_auth=True)
+
+    monkeypatch.setattr(gdrive, "build_sheets_service", lambda: StubSheetsAPI(inventory_rows(0)))
+    with pytest.raises(ValueError, match="at least one product"):
+        gdrive.load_product_inventory("abc123", require_auth=True)
+
+    gdrive.sheet_cache.clear()
+    failing = StubSheetsAPI(inventory_rows(10))
+    failing.batchGet = mock.Mock(side_effect=OSError("connection reset"))
+    monkeypatch.setattr(gdrive, "build_sheets_service", lambda: failing)
+    with pytest.raises(ValueError, match="Failed to read product inventory sheet"):
+        gdrive.load_product_inventory("abc123", require_auth=True)
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/abc123/edit"
+INVENTORY_CSV = b"name,description,price,quantity\nBrownie,Fudgy,3.50,12\n"
+
+def test_repeated_reads_are_served_from_the_cache():
+    with mock.patch("requests.Session.get", side_effect=lambda *a, **kw: StreamedResponse(INVENTORY_CSV)) as get:
+        first = gdrive.print_inventory(SHEET_URL)
+        assert gdrive.print_inventory(SHEET_URL) == first
+        assert gdrive.load_product_inventory(SHEET_URL)[0]["name"] == "Brownie"
+    assert get.call_count == 1
+    assert "Brownie" in first
+
+def test_stale_entries_are_revalidated_with_the_etag():
+    responses = [StreamedResponse(INVENTORY_CSV, etag='"v1"'), StreamedResponse(b"", status_code=304)]
+    with mock.patch("requests.Session.get", side_effect=responses) as get:
+        assert len(gdrive.read_google_sheet(SHEET_URL)) == 2
+        rows = gdrive.iter_sheet_rows(SHEET_URL, max_age=0)
+        assert list(rows) == [["name", "description", "price", "quantity"], ["Brownie", "Fudgy", "3.50", "12"]]
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert responses[1].closed
+
+def test_changed_sheets_replace_the_cached_copy():
+    changed = INVENTORY_CSV + b"Scone,Buttery,2.00,4\n"
+    responses = [StreamedResponse(INVENTORY_CSV), StreamedResponse(changed)]
+    with mock.patch("requests.Session.get", side_effect=responses):
+        assert len(gdrive.read_google_sheet(SHEET_URL)) == 2
+        assert len(list(gdrive.iter_sheet_rows(SHEET_URL, max_age=0))) == 3
+        assert len(gdrive.read_google_sheet(SHEET_URL)) == 3
+
+def test_partial_and_oversized_reads_are_not_cached(monkeypatch):
+    body = b"name,price\n" + b"".join(b"Cake %d,%d\n" % (row, row) for row in range(100))
+    with mock.patch("requests.Session.get", side_effect=lambda *a, **kw: StreamedResponse(body)) as get:
+        rows = gdrive.iter_sheet_rows(SHEET_URL)
+        next(rows)
+        rows.close()
+        monkeypatch.setattr(gdrive.sheet_cache, "max_rows", 50)
+        assert len(gdrive.read_google_sheet(SHEET_URL)) == 101
+        assert len(gdrive.read_google_sheet(SHEET_URL)) == 101
+    assert get.call_count == 3
+
+def test_sheets_api_client_and_credentials_are_reused(monkeypatch):
+    creds = mock.Mock(valid=True)
+    monkeypatch.setattr(gdrive, "_credentials", creds)
+    monkeypatch.setattr(gdrive, "_thread_local", gdrive.threading.local())
+    with mock.patch("googleapiclient.discovery.build", side_effect=lambda *a, **kw: object()) as build:
+        assert gdrive.build_sheets_service() is gdrive.build_sheets_service()
+    assert build.call_count == 1
+    assert gdrive.get_credentials() is creds
@@ -0,0 +1,139 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.hedging import Hedger, LatencyWindow
+from app.utils.tools.agents import Agent
+
+def warmed_hedger(**kwargs):
+    defaults = dict(percentile=0.95, min_delay=0.02, min_samples=5, max_rate=1.0, hedge_model=None, window=100)
+    defaults.update(kwargs)
+    hedger = Hedger(**defaults)
+    for _ in range(10):
+        hedger.observe("gpt-4o-mini", 0.01)
+    return hedger
+
+def test_latency_window_percentile():
+    window = LatencyWindow(100)
+    for value in range(1, 101):
+        window.add(value / 100)
+    assert window.percentile(0.95) == 0.95
+    assert window.percentile(0.5) == 0.5
+
+def test_no_hedge_until_enough_samples():
+    hedger = Hedger(min_samples=5, min_delay=0.01)
+    assert hedger.delay_for("gpt-4o-mini") is None
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedger = warmed_hedger()
+    primary_cancelled = asyncio.Event()
+
+    async def primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            primary_cancelled.set()
+            raise
+        return "primary"
+
+    async def hedge():
+        return "hedge"
+
+    async def run():
+        result = await hedger.run("gpt-4o-mini", primary, hedge)
+        return result, primary_cancelled.is_set()
+
+    assert asyncio.run(run()) == (("hedge", True), True)
+
+def test_fast_primary_is_not_hedged():
+    hedger = warmed_hedger()
+    hedges = 0
+
+    async def primary():
+        return "primary"
+
+    async def hedge():
+        nonlocal hedges
+        hedges += 1
+        return "hedge"
+
+    assert asyncio.run(hedger.run("gpt-4o-mini", primary, hedge)) == ("primary", False)
+    assert hedges == 0
+
+def test_hedge_rate_is_capped():
+    hedger = warmed_hedger(percentile=0.5, max_rate=0.25)
+    hedges = 0
+
+    async def fast():
+        return "primary"
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "primary"
+
+    async def hedge():
+        nonlocal hedges
+        hedges += 1
+        await asyncio.sleep(1)
+        return "hedge"
+
+    async def run():
+        for _ in range(6):
+            await hedger.run("gpt-4o-mini", fast, hedge)
+        for _ in range(8):
+            await hedger.run("gpt-4o-mini", slow, hedge)
+
+    asyncio.run(run())
+    assert 0 < hedges < 8
+    assert hedger.hedge_rate() <= 0.25
+
+def test_failed_hedge_waits_for_primary():
+    hedger = warmed_hedger()
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def hedge():
+        raise RuntimeError("hedge failed")
+
+    assert asyncio.run(hedger.run("gpt-4o-mini", primary, hedge)) == ("primary", False)
+
+def test_primary_error_is_raised_when_primary_and_hedge_fail():
+    hedger = warmed_hedger()
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("primary failed")
+
+    async def hedge():
+        raise RuntimeError("hedge failed")
+
+    with pytest.raises(RuntimeError, match="primary failed"):
+        asyncio.run(hedger.run("gpt-4o-mini", primary, hedge))
+
+class SlowModelCompletions:
+    """gpt-4o-mini hangs; the hedge model answers immediately."""
+
+    def __init__(self):
+        self.models = []
+
+    async def create(self, model, messages, tools, **kwargs):
+        self.models.append(model)
+        if model == "gpt-4o-mini":
+            await asyncio.sleep(5)
+        message = SimpleNamespace(content="Hedged hello!", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+def test_chat_service_uses_hedge_model_answer():
+    completions = SlowModelCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent = Agent(name="TestBot", instructions="Greet the customer.", tools=[])
+    service = ChatService(openai_client=client, initial_agent=agent, hedger=warmed_hedger(hedge_model="gpt-4o"))
+
+    reply = asyncio.run(service.process_message("hi", Conversation("+15550001")))
+
+    assert reply == "Hedged hello!"
+    assert completions.models == ["gpt-4o-mini", "gpt-4o"]
+    assert "default:gpt-4o" in service.usage_tracker.summary()["routes"]
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models.database import Base
+from app.services.idempotency_service import InMemoryIdempotencyStore, DatabaseIdempotencyStore
+
+def make_database_store():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return DatabaseIdempotencyStore(sessionmaker(bind=engine), poll_interval=0.01)
+
+@pytest.fixture(params=["memory", "database"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryIdempotencyStore(ttl_seconds=60, max_entries=100)
+    return make_database_store()
+
+def test_duplicate_waits_for_in_flight_result(store):
+    async def run():
+        assert await store.claim("SM1")
+        assert not await store.claim("SM1")
+
+        async def finish_first_delivery():
+            await asyncio.sleep(0.05)
+            await store.complete("SM1", "Your order is confirmed")
+
+        waiter = asyncio.create_task(store.wait("SM1", timeout=2))
+        await finish_first_delivery()
+        return await waiter
+
+    assert asyncio.run(run()) == (True, "Your order is confirmed")
+
+def test_released_claim_can_be_retried(store):
+    async def run():
+        assert await store.claim("SM2")
+        await store.release("SM2")
+        return await store.claim("SM2")
+
+    assert asyncio.run(run())
+
+def test_wait_times_out_while_still_processing(store):
+    async def run():
+        await store.claim("SM3")
+        return await store.wait("SM3", timeout=0.05)
+
+    assert asyncio.run(run()) == (False, None)
+
+def test_memory_store_is_bounded():
+    store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=2)
+
+    async def run():
+        for sid in ["SM1", "SM2", "SM3", "SM4"]:
+            await store.claim(sid)
+        # The oldest MessageSids were evicted and are treated as new again
+        return await store.claim("SM1")
+
+    assert asyncio.run(run())
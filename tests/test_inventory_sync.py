@@ -0,0 +1,135 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.models.database import Base, Product, StockReservation
+from app.services import reservation_service as reservations
+from app.services.inventory_sync import SyncPlan, apply_sync_plan, sync_products
+from app.utils.tools import admin
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+def product(name, price="10.00", description="Sponge", quantity=5, image=None):
+    item = {"name": name, "price": Decimal(price), "description": description, "quantity": quantity}
+    if image:
+        item["image"] = image
+    return item
+
+def catalog(db):
+    return {row.name: (row.price, row.description, row.quantity, row.image)
+            for row in db.execute(select(Product)).scalars()}
+
+def test_first_sync_inserts_and_second_sync_changes_nothing(db):
+    sheet = [product("Chocolate Therapy", "45.00"), product("Red Velvet Dream", "40", image="https://x/rv.jpg")]
+
+    report = sync_products(iter(sheet), db)
+
+    assert (report["inserted"], report["updated"], report["deleted"], report["unchanged"]) == (2, 0, 0, 0)
+    assert catalog(db)["Red Velvet Dream"] == (40.0, "Sponge", 5, "https://x/rv.jpg")
+
+    report = sync_products(iter(sheet), db)
+    assert (report["inserted"], report["updated"], report["deleted"], report["unchanged"]) == (0, 0, 0, 2)
+
+def test_only_changed_rows_are_written(db):
+    sync_products([product("Chocolate Therapy", "45.00"), product("Red Velvet Dream"), product("Lemon Drizzle")], db)
+    ids = {row.name: row.id for row in db.execute(select(Product)).scalars()}
+
+    report = sync_products([
+        product("chocolate  therapy", "45.00"),  # same key, new spelling: updated in place
+        product("Red Velvet Dream", "10.0"),  # same price written differently: unchanged
+        product("Vanilla Bean Bliss", "35.00"),
+    ], db)
+
+    assert (report["inserted"], report["updated"], report["deleted"], report["unchanged"]) == (1, 1, 1, 1)
+    assert report["updated_names"] == ["chocolate  therapy"]
+    assert report["deleted_names"] == ["Lemon Drizzle"]
+    rows = {row.name: row.id for row in db.execute(select(Product)).scalars()}
+    assert rows["chocolate  therapy"] == ids["Chocolate Therapy"]
+    assert set(rows) == {"chocolate  therapy", "Red Velvet Dream", "Vanilla Bean Bliss"}
+
+def test_keep_missing_and_dry_run(db):
+    sync_products([product("Chocolate Therapy"), product("Lemon Drizzle")], db)
+
+    report = sync_products([product("Chocolate Therapy", "50")], db, delete_missing=False)
+    assert (report["updated"], report["deleted"]) == (1, 0)
+    assert set(catalog(db)) == {"Chocolate Therapy", "Lemon Drizzle"}
+
+    report = sync_products([product("Brownie")], db, dry_run=True)
+    assert not report["applied"]
+    assert (report["inserted"], report["deleted"]) == (1, 2)
+    assert set(catalog(db)) == {"Chocolate Therapy", "Lemon Drizzle"}
+
+def test_duplicate_names(db):
+    db.add_all([Product(name="Brownie", price=3, quantity=1), Product(name="brownie", price=4, quantity=1)])
+    db.commit()
+
+    report = sync_products([product("Brownie", "5"), product("BROWNIE", "6")], db)
+
+    assert report["duplicate_names"] == ["BROWNIE"]
+    assert (report["updated"], report["deleted"]) == (1, 1)
+    assert catalog(db) == {"Brownie": (5.0, "Sponge", 5, None)}
+
+def test_manual_edits_are_overwritten_by_the_next_sync(db):
+    sync_products([product("Brownie", "5")], db)
+    product_id = db.execute(select(Product.id)).scalar_one()
+
+    assert admin.update_product_price(product_id, 7.5, db=db)
+    report = sync_products([product("Brownie", "5")], db)
+
+    assert report["updated"] == 1
+    assert catalog(db)["Brownie"][0] == 5.0
+
+def test_sync_keeps_stock_held_by_open_reservations(db):
+    sync_products([product("Chocolate Therapy", quantity=10)], db)
+    product_id = db.execute(select(Product.id)).scalar_one()
+    hold = reservations.reserve_stock(db, product_id, 2, hold_seconds=-1)
+    assert catalog(db)["Chocolate Therapy"][2] == 8
+
+    # A price change does not hand the held stock back...
+    assert sync_products([product("Chocolate Therapy", "12.00", quantity=10)], db)["updated"] == 1
+    db.expire_all()
+    assert catalog(db)["Chocolate Therapy"][2] == 8
+
+    # ...the hold expiring does, once
+    assert reservations.release_expired_reservations(db) == 1
+    db.expire_all()
+    assert catalog(db)["Chocolate Therapy"][2] == 10
+    assert db.get(StockReservation, hold.id).status == "expired"
+
+def test_failed_sync_changes_nothing(db):
+    sync_products([product("Brownie")], db)
+    product_id = db.execute(select(Product.id)).scalar_one()
+    broken = SyncPlan(inserts=[{"name": "Scone", "price": 2.0, "quantity": 1}, {"name": None, "price": 1.0}],
+                      updates=[], deletes=[(product_id, "Brownie")], unchanged=0, duplicates=[])
+
+    with pytest.raises(Exception):
+        apply_sync_plan(db, broken)
+
+    assert set(catalog(db)) == {"Brownie"}
+
+def test_sheet_without_valid_products_does_not_empty_the_catalog(db):
+    sync_products([product("Brownie")], db)
+
+    with pytest.raises(ValueError, match="No valid products"):
+        sync_products(iter([]), db)
+
+    assert set(catalog(db)) == {"Brownie"}
+
+def test_admin_tool_streams_sheet_rows_into_the_sync(db, monkeypatch):
+    rows = [["name", "description", "price", "quantity"], ["Brownie", "Fudgy", "3.50", "12"],
+            ["Scone", "Buttery", "not a price", "4"]]
+    monkeypatch.setattr(admin, "iter_sheet_rows", lambda url, require_auth=False, max_age=None: (row for row in rows))
+
+    report = admin.sync_inventory_from_sheet("https://docs.google.com/spreadsheets/d/abc/edit", db=db)
+
+    assert report["success"] and report["inserted"] == 1
+    assert catalog(db) == {"Brownie": (3.5, "Fudgy", 12, None)}
+
+    monkeypatch.setattr(admin, "iter_sheet_rows", lambda url, require_auth=False, max_age=None: (row for row in [["name", "price"]]))
+    report = admin.sync_inventory_from_sheet("abc", db=db)
+    assert not report["success"] and "required fields" in report["message"]
@@ -0,0 +1,89 @@
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import httpx
+from fastapi import FastAPI, Form
+from fastapi.responses import Response
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.llm_backend import LatencyDistribution, MockLLMBackend
+from app.utils.tools.agents import Agent
+
+def get_customer_by_phone(phone_number: str) -> dict:
+    """Stub lookup."""
+    return {"id": 7, "name": "Sam", "phone_number": phone_number}
+
+def get_cake_inventory() -> list:
+    """Stub inventory."""
+    return [{"name": "Chocolate Therapy", "price": 45.0}]
+
+def fast_backend(seed=0):
+    return MockLLMBackend(seed=seed, latency=LatencyDistribution(median=0.001, sigma=0.1, tail_probability=0))
+
+def test_mock_backend_scripts_tool_calls_then_replies():
+    backend = fast_backend()
+    agent = Agent(name="TestBot", instructions="Help.", tools=[get_customer_by_phone, get_cake_inventory])
+    service = ChatService(openai_client=None, initial_agent=agent, backend=backend)
+    conversation = Conversation("+15550001")
+
+    reply = asyncio.run(service.process_message("which cakes are available?", conversation))
+
+    assert reply == "Thanks for your message! (mock reply)"
+    assert backend.calls == 3
+    usage = service.usage_tracker.get_conversation_usage("+15550001")
+    assert usage["tool_calls"] == 2
+    assert usage["prompt_tokens"] > 0
+
+def test_mock_backend_is_deterministic_per_seed():
+    messages = [{"role": "system", "content": "Customer phone number: +15550001"},
+                {"role": "user", "content": "hi"}]
+    tools = [{"type": "function", "function": {"name": "get_customer_by_phone"}}]
+
+    def tool_call_id(seed):
+        response = asyncio.run(fast_backend(seed).create("gpt-4o-mini", messages, tools))
+        return response.choices[0].message.tool_calls[0].id
+
+    assert tool_call_id(1) == tool_call_id(1)
+    assert tool_call_id(1) != tool_call_id(2)
+    assert json.loads(asyncio.run(fast_backend().create("gpt-4o-mini", messages, tools))
+                      .choices[0].message.tool_calls[0].function.arguments) == {"phone_number": "+15550001"}
+
+def test_latency_distribution_tail():
+    rng = random.Random(0)
+    distribution = LatencyDistribution(median=0.1, sigma=0.0, tail_probability=0.5, tail_seconds=5)
+    samples = [distribution.sample(rng) for _ in range(200)]
+    assert min(samples) == 0.1
+    assert all(sample == 0.1 or 5 <= sample <= 10 for sample in samples)
+
+def load_script():
+    path = os.path.join(os.path.dirname(__file__), "..", "scripts", "load_test.py")
+    spec = importlib.util.spec_from_file_location("load_test", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_load_harness_reports_throughput_and_percentiles():
+    load_test = load_script()
+    app = FastAPI()
+    senders = set()
+
+    @app.post("/chat")
+    async def chat(From: str = Form(...), Body: str = Form(...), MessageSid: str = Form(...)):
+        senders.add(From)
+        return Response(content="<Response><Message>ok</Message></Response>", media_type="text/xml")
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await load_test.run_load(client, users=20, messages=3, concurrency=5)
+
+    report = asyncio.run(run())
+
+    assert report["requests"] == 60
+    assert report["ok"] == 60
+    assert len(senders) == 20
+    assert report["throughput_rps"] > 0
+    assert 0 < report["latency_seconds"]["p50"] <= report["latency_seconds"]["p99"]
+    assert load_test.percentile([1, 2, 3, 4], 0.5) == 2
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import logging
+import queue
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.llm_backend import LatencyDistribution, MockLLMBackend
+from app.utils.logging_config import DroppingQueueHandler, JsonFormatter, LazyJson
+from app.utils.metrics import REGISTRY
+from app.utils.tools.agents import Agent
+
+def test_queue_handler_drops_instead_of_blocking_when_full():
+    log_queue = queue.Queue(1)
+    logger = logging.getLogger("tests.logging.queue")
+    logger.handlers = [DroppingQueueHandler(log_queue)]
+    logger.propagate = False
+    dropped = REGISTRY.counter("log_records_dropped_total", "").value()
+
+    logger.warning("first %s", "record")
+    logger.warning("second")
+
+    assert log_queue.get_nowait().getMessage() == "first record"
+    assert REGISTRY.counter("log_records_dropped_total", "").value() == dropped + 1
+
+def test_records_are_queued_unformatted():
+    log_queue = queue.Queue()
+    logger = logging.getLogger("tests.logging.lazy")
+    logger.handlers = [DroppingQueueHandler(log_queue)]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    serialized = []
+
+    class Content:
+        def __str__(self):
+            serialized.append(1)
+            return "hi"
+
+    logger.info("Transcript: %s", LazyJson([{"role": "user", "content": Content()}]))
+    record = log_queue.get_nowait()
+
+    assert not serialized and record.msg == "Transcript: %s" and record.args
+    # Formatted by the listener's handler
+    assert json.loads(JsonFormatter().format(record))["message"] == 'Transcript: [{"role": "user", "content": "hi"}]'
+    assert serialized
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "Turn took %.1fs", (1.25,), None)
+    record.phone_number = "+15550001"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Turn took 1.2s"
+    assert entry["level"] == "INFO"
+    assert entry["phone_number"] == "+15550001"
+
+def run_turn(sample_rate):
+    backend = MockLLMBackend(latency=LatencyDistribution(median=0.001, sigma=0.1, tail_probability=0))
+    agent = Agent(name="TestBot", instructions="Help.", tools=[])
+    service = ChatService(openai_client=None, initial_agent=agent, backend=backend,
+                          transcript_sample_rate=sample_rate)
+    asyncio.run(service.process_message("hello", Conversation("+15550001")))
+
+def test_transcripts_are_sampled(caplog):
+    caplog.set_level(logging.INFO, logger="app.services.chat_service")
+
+    run_turn(0.0)
+    assert not [r for r in caplog.records if r.getMessage().startswith("Transcript for")]
+
+    run_turn(1.0)
+    transcripts = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Transcript for")]
+    assert transcripts and '"content": "hello"' in transcripts[0]
@@ -0,0 +1,50 @@
+import os
+from app.utils.metrics import MetricsRegistry, MultiProcessStore, render_prometheus
+
+def test_prometheus_exposition_with_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, stage="llm_call")
+    registry.counter("tool_calls_total", "Tool calls", ("tool",)).inc(tool='say "hi"')
+    registry.add_collector(lambda: registry.gauge("active_conversations", "Live conversations").set(4))
+
+    text = render_prometheus(registry.snapshot())
+
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="llm_call",le="0.1"} 2.0' in text
+    assert 'stage_seconds_bucket{stage="llm_call",le="1.0"} 3.0' in text
+    assert 'stage_seconds_bucket{stage="llm_call",le="+Inf"} 4.0' in text
+    assert 'stage_seconds_count{stage="llm_call"} 4.0' in text
+    assert 'tool_calls_total{tool="say \\"hi\\""} 1.0' in text
+    assert "active_conversations 4.0" in text
+
+def worker(directory, pid, calls, in_flight, breaker_state):
+    registry = MetricsRegistry()
+    registry.counter("llm_calls_total", "Calls").inc(calls)
+    registry.histogram("latency_seconds", "Latency", buckets=(1.0,)).observe(0.5)
+    registry.gauge("llm_in_flight", "In flight").set(in_flight)
+    registry.gauge("breaker_state", "Breaker", multiprocess_mode="max").set(breaker_state)
+    registry.gauge("hit_ratio", "Ratio", multiprocess_mode="all").set(0.5)
+    store = MultiProcessStore(str(directory), registry, pid=pid)
+    store.write()
+    return store
+
+def value(snapshot, name, **labels):
+    return [sample for sample in snapshot[name]["samples"] if sample["labels"] == labels][0]
+
+def test_multiprocess_store_merges_worker_files(tmp_path):
+    exited_pid = 999999999  # no such process
+    worker(tmp_path, exited_pid, calls=5, in_flight=7, breaker_state=2)
+    worker(tmp_path, os.getppid(), calls=2, in_flight=1, breaker_state=0)
+    store = worker(tmp_path, os.getpid(), calls=3, in_flight=2, breaker_state=1)
+
+    merged = store.collect()
+
+    # Counters and histograms of exited workers still count; their gauges are dropped
+    assert value(merged, "llm_calls_total")["value"] == 10
+    assert value(merged, "latency_seconds")["count"] == 3
+    assert value(merged, "latency_seconds")["buckets"] == {"1.0": 3}
+    assert value(merged, "llm_in_flight")["value"] == 3
+    assert value(merged, "breaker_state")["value"] == 1
+    assert {sample["labels"]["pid"] for sample in merged["hit_ratio"]["samples"]} == {str(os.getpid()), str(os.getppid())}
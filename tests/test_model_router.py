@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.model_router import ModelRouter, call_cost
+from app.services.resilience import CircuitBreaker, ResilientLLMClient
+from app.utils.tools.agents import Agent
+
+def calculate_custom_cake_price(servings: int) -> float:
+    """Stub pricing tool."""
+    return 30.0 + servings
+
+ORDER_AGENT = Agent(name="Order Agent", model="gpt-4o-mini", fast_model="gpt-4o-mini", strong_model="gpt-4o",
+                    strong_after_tools=["calculate_custom_cake_price"], strong_min_user_chars=50,
+                    tools=[calculate_custom_cake_price])
+
+def tool_round(tool_name):
+    return [
+        {"role": "user", "content": "12 people please"},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": tool_name, "arguments": "{}"}}
+        ]},
+        {"role": "tool", "tool_call_id": "call_1", "content": "42.0"},
+    ]
+
+def test_routes_follow_agent_policy():
+    router = ModelRouter(enabled=True)
+
+    assert router.select(ORDER_AGENT, [{"role": "user", "content": "hi"}]) == ("fast", "gpt-4o-mini", "gpt-4o")
+    assert router.select(ORDER_AGENT, [{"role": "user", "content": "x" * 60}]).name == "strong"
+    assert router.select(ORDER_AGENT, tool_round("calculate_custom_cake_price")).model == "gpt-4o"
+    assert router.select(ORDER_AGENT, tool_round("get_faq")).model == "gpt-4o-mini"
+
+def test_agents_without_strong_model_and_disabled_router_use_fixed_model():
+    plain = Agent(name="Plain", model="gpt-4o-mini")
+    messages = [{"role": "user", "content": "x" * 60}]
+
+    assert ModelRouter(enabled=True).select(plain, messages) == ("default", "gpt-4o-mini", None)
+    assert ModelRouter(enabled=False).select(ORDER_AGENT, messages).model == "gpt-4o-mini"
+
+def test_call_cost_uses_price_table():
+    usage = SimpleNamespace(prompt_tokens=1_000_000, completion_tokens=1_000_000,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=0))
+    assert call_cost("gpt-4o-mini", usage) == pytest.approx(0.75)
+    assert call_cost("gpt-4o-2024-08-06", usage) == pytest.approx(12.50)
+    assert call_cost("unknown-model", usage) == 0.0
+
+class StrongOutageCompletions:
+    """The strong model is down; the fast model answers."""
+
+    def __init__(self):
+        self.models = []
+
+    async def create(self, model, messages, tools, **kwargs):
+        self.models.append(model)
+        if model == "gpt-4o":
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            raise openai.InternalServerError("down", response=httpx.Response(503, request=request), body=None)
+        message = SimpleNamespace(content="Your cake will be $42.", tool_calls=None)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def test_failed_strong_call_falls_back_to_fast_tier():
+    completions = StrongOutageCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    service = ChatService(openai_client=client, initial_agent=ORDER_AGENT, model_router=ModelRouter(enabled=True))
+
+    reply = asyncio.run(service.process_message("x" * 60, Conversation("+15550001")))
+
+    assert reply == "Your cake will be $42."
+    assert completions.models == ["gpt-4o", "gpt-4o-mini"]
+    routes = service.usage_tracker.summary()["routes"]
+    assert routes["strong:gpt-4o-mini"]["calls"] == 1
+    assert routes["strong:gpt-4o-mini"]["cost_usd"] == pytest.approx(call_cost("gpt-4o-mini", SimpleNamespace(
+        prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)))
+
+class FlakyFastCompletions(StrongOutageCompletions):
+    """The fast model is rate limited once, then answers."""
+
+    async def create(self, model, messages, tools, **kwargs):
+        if not self.models:
+            self.models.append(model)
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            raise openai.RateLimitError("slow down", response=httpx.Response(429, request=request), body=None)
+        return await super().create(model, messages, tools, **kwargs)
+
+def test_transient_fast_call_error_is_retried_before_falling_back():
+    completions = FlakyFastCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    breaker = CircuitBreaker("test", failure_threshold=5, recovery_seconds=30)
+    service = ChatService(openai_client=client, initial_agent=ORDER_AGENT, model_router=ModelRouter(enabled=True),
+                          resilience=ResilientLLMClient(breaker=breaker, base_delay=0.001, max_delay=0.01))
+
+    reply = asyncio.run(service.process_message("hi", Conversation("+15550001")))
+
+    assert reply == "Your cake will be $42."
+    assert completions.models == ["gpt-4o-mini", "gpt-4o-mini"]
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import pstats
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.llm_backend import LatencyDistribution, MockLLMBackend
+from app.services.profiling import Profiler
+from app.utils.tools.agents import Agent
+
+def make_service(profiler, latency=0.001):
+    backend = MockLLMBackend(latency=LatencyDistribution(median=latency, sigma=0.0, tail_probability=0))
+    agent = Agent(name="TestBot", instructions="Help.", tools=[])
+    return ChatService(openai_client=None, initial_agent=agent, backend=backend, profiler=profiler)
+
+def test_decide_honours_request_admin_arming_and_busy():
+    profiler = Profiler(sample_rate=0.0)
+    assert profiler.decide() is None
+
+    assert profiler.decide("sampling") == ("sampling", "request")
+    # Only one turn is profiled at a time
+    profiler.arm(2, "cprofile")
+    assert profiler.decide() is None
+    profiler._release()
+
+    assert profiler.decide() == ("cprofile", "admin")
+    profiler._release()
+    assert profiler.decide() == ("cprofile", "admin")
+    profiler._release()
+    assert profiler.decide() is None
+    assert Profiler(sample_rate=1.0).decide() == ("cprofile", "sample")
+
+def test_cprofile_turn_is_stored_with_metadata(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), sample_rate=0.0)
+    service = make_service(profiler)
+
+    reply = asyncio.run(service.process_message("hello", Conversation("+15550001"), profile_mode="cprofile"))
+
+    assert reply == "Thanks for your message! (mock reply)"
+    [profile] = profiler.list_profiles()
+    assert profile["phone_number"] == "+15550001"
+    assert profile["trigger"] == "request" and profile["error"] is None
+    assert "process_message" in profile["top_functions"]
+    assert isinstance(profile["top_allocations"], list)
+    stats = pstats.Stats(profiler.profile_path(profile["file"]))
+    assert stats.total_calls > 0
+    assert profiler.state()["busy"] is False
+
+def test_sampling_turn_writes_folded_stacks(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), sample_rate=0.0, sample_interval_ms=1, tracemalloc_frames=0)
+    service = make_service(profiler, latency=0.05)
+
+    asyncio.run(service.process_message("hello", Conversation("+15550001"), profile_mode="sampling"))
+
+    [profile] = profiler.list_profiles()
+    assert profile["samples"] > 0
+    assert "top_allocations" not in profile
+    with open(profiler.profile_path(profile["file"])) as file:
+        stack, count = file.readline().rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+def test_only_the_newest_profiles_are_kept(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), sample_rate=0.0, max_profiles=2, tracemalloc_frames=0)
+    service = make_service(profiler)
+
+    for _ in range(3):
+        asyncio.run(service.process_message("hello", Conversation("+15550001"), profile_mode="cprofile"))
+
+    assert len(profiler.list_profiles()) == 2
+    assert len(os.listdir(tmp_path)) == 4
+    assert profiler.profile_path("../secrets.json") is None
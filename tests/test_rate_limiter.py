@@ -0,0 +1,109 @@
+import asyncio
+import time
+import pytest
+from app.services.rate_limiter import LLMAdmissionController, AdmissionRejected, TokenBucket, estimate_tokens
+
+def make_controller(**kwargs):
+    defaults = dict(max_concurrency=2, requests_per_minute=6000, tokens_per_minute=10_000_000,
+                    max_queue=10, workers=1)
+    defaults.update(kwargs)
+    return LLMAdmissionController(**defaults)
+
+def test_concurrency_is_capped():
+    controller = make_controller(max_concurrency=2)
+    active = 0
+    peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with controller.slot(100):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(8)])
+
+    asyncio.run(run())
+    assert peak == 2
+
+def test_full_queue_sheds_calls():
+    controller = make_controller(max_concurrency=1, max_queue=2)
+
+    async def wait_for_slot():
+        async with controller.slot(100):
+            pass
+
+    async def run():
+        async with controller.slot(100):
+            waiters = [asyncio.create_task(wait_for_slot()) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            with pytest.raises(AdmissionRejected) as error:
+                async with controller.slot(100):
+                    pass
+        await asyncio.gather(*waiters)
+        return error.value.reason
+
+    assert asyncio.run(run()) == "queue_full"
+
+def test_queue_timeout_sheds_call():
+    controller = make_controller(max_concurrency=1)
+
+    async def run():
+        async with controller.slot(100):
+            with pytest.raises(AdmissionRejected) as error:
+                async with controller.slot(100, timeout=0.02):
+                    pass
+            return error.value.reason
+
+    assert asyncio.run(run()) == "queue_timeout"
+
+def test_requests_per_minute_bucket_paces_calls():
+    # 600 RPM = 10 requests per second with a burst of 600; drain the burst first
+    bucket = TokenBucket(600)
+    bucket.consume(600)
+    assert bucket.time_until(1) == pytest.approx(0.1, abs=0.01)
+
+    controller = make_controller(requests_per_minute=600)
+    controller.requests.consume(600)
+
+    async def run():
+        started = time.monotonic()
+        for _ in range(3):
+            async with controller.slot(10):
+                pass
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.25
+
+def test_calls_waiting_for_budget_do_not_hold_a_slot():
+    controller = make_controller(max_concurrency=1, tokens_per_minute=6000)
+    controller.tokens.consume(6000)
+
+    async def run():
+        waiter = asyncio.create_task(controller.slot(50).__aenter__())
+        await asyncio.sleep(0.05)
+        slot_free = not controller._semaphore.locked()
+        waiter.cancel()
+        return slot_free
+
+    assert asyncio.run(run())
+
+def test_budget_of_shed_calls_is_given_back():
+    controller = make_controller(max_concurrency=1, requests_per_minute=600)
+
+    async def run():
+        async with controller.slot(100):
+            before = controller.requests.time_until(600)
+            with pytest.raises(AdmissionRejected):
+                async with controller.slot(100, timeout=0.02):
+                    pass
+            return before, controller.requests.time_until(600)
+
+    before, after = asyncio.run(run())
+    assert after <= before
+
+def test_estimate_tokens_counts_messages_and_tools():
+    messages = [{"role": "system", "content": "x" * 400}, {"role": "user", "content": "y" * 400}]
+    assert estimate_tokens(messages, [], completion_tokens=50) == 250
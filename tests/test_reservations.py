@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.models.database import Base, Order, Product, StockReservation
+from app.services import reservation_service as reservations
+from app.utils.tools import payment
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reservations.db'}", connect_args={"check_same_thread": False},
+                           pool_size=20)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+def add_product(factory, quantity, name="Brownie"):
+    with factory() as db:
+        product = Product(name=name, price=3.5, quantity=quantity)
+        db.add(product)
+        db.commit()
+        return product.id
+
+def stock(factory, product_id):
+    with factory() as db:
+        return db.get(Product, product_id).quantity
+
+def statuses(factory):
+    with factory() as db:
+        return db.execute(select(StockReservation.status).order_by(StockReservation.id)).scalars().all()
+
+def test_reservations_never_take_more_than_is_left(factory):
+    product_id = add_product(factory, 3)
+    with factory() as db:
+        assert reservations.reserve_stock(db, product_id, 2) is not None
+        assert reservations.reserve_stock(db, product_id, 2) is None
+        assert reservations.reserve_stock(db, product_id, 1) is not None
+        with pytest.raises(ValueError):
+            reservations.reserve_stock(db, product_id, 0)
+    assert stock(factory, product_id) == 0
+    assert statuses(factory) == ["held", "held"]
+
+def test_concurrent_checkouts_sell_each_item_once(factory):
+    product_id = add_product(factory, 15)
+
+    def checkout(_):
+        with factory() as db:
+            return reservations.reserve_stock(db, product_id) is not None
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(checkout, range(60)))
+
+    assert results.count(True) == 15
+    assert stock(factory, product_id) == 0
+    assert statuses(factory) == ["held"] * 15
+
+def test_commit_and_release_are_exclusive(factory):
+    product_id = add_product(factory, 5)
+    with factory() as db:
+        paid = reservations.reserve_stock(db, product_id, 2).id
+        dropped = reservations.reserve_stock(db, product_id, 1).id
+
+        assert reservations.commit_reservation(db, paid)
+        assert not reservations.release_reservation(db, paid)
+        assert reservations.release_reservation(db, dropped)
+        assert not reservations.commit_reservation(db, dropped)
+
+    assert stock(factory, product_id) == 3
+    assert statuses(factory) == ["committed", "released"]
+
+def test_expired_holds_are_released_once_and_renewed_if_stock_allows(factory):
+    product_id = add_product(factory, 2)
+    with factory() as db:
+        expired = reservations.reserve_stock(db, product_id, 2, order_id=7, hold_seconds=-1)
+        assert reservations.reserve_stock(db, product_id) is None
+
+        assert reservations.release_expired_reservations(db) == 1
+        assert reservations.release_expired_reservations(db) == 0
+        assert stock(factory, product_id) == 2
+
+        # Paying for the order takes the stock again
+        assert reservations.renew_order_reservations(db, 7)
+        assert stock(factory, product_id) == 0
+        assert db.get(StockReservation, expired.id).expires_at > datetime.utcnow() + timedelta(minutes=1)
+        assert reservations.renew_order_reservations(db, 7)  # still held: only extended
+        assert stock(factory, product_id) == 0
+
+        assert reservations.release_order_reservations(db, 7) == 1
+        reservations.reserve_stock(db, product_id, 1)
+        assert not reservations.renew_order_reservations(db, 7)
+        assert reservations.renew_order_reservations(db, 8)  # no reservations
+
+def test_order_tools_hold_and_commit_stock(factory, monkeypatch):
+    product_id = add_product(factory, 1, name="Red Velvet Dream")
+    monkeypatch.setattr(payment, "get_db", lambda: iter([factory()]))
+
+    order = payment.create_order(1, "immediate", 40.0, cake_name="red velvet dream")
+    assert order["status"] == "pending" and order["reserved_until"]
+    sold_out = payment.create_order(2, "immediate", 40.0, cake_name="Red Velvet Dream")
+    assert sold_out["order_id"] is None and "sold out" in sold_out["message"]
+    assert payment.create_order(2, "immediate", 40.0, cake_name="Unicorn Cake")["order_id"] is None
+    with factory() as db:
+        assert db.execute(select(Order.customer_id)).scalars().all() == [1]
+
+        monkeypatch.setattr(payment.random, "random", lambda: 0.99)
+        assert not payment._execute_payment(order["order_id"], 40.0, db)["success"]
+        assert statuses(factory) == ["held"]
+        payment.update_payment_status(order["order_id"], "failed", db=db)
+        assert statuses(factory) == ["released"] and stock(factory, product_id) == 1
+
+        monkeypatch.setattr(payment.random, "random", lambda: 0.0)
+        assert payment._execute_payment(order["order_id"], 40.0, db)["success"]
+    assert statuses(factory) == ["committed"]
+    assert stock(factory, product_id) == 0
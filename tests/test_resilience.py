@@ -0,0 +1,121 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from app.models import Conversation
+from app.services.chat_service import ChatService
+from app.services.resilience import CircuitBreaker, CircuitOpenError, ResilientLLMClient, retry_after_seconds
+from app.utils.tools.agents import Agent
+
+def api_error(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    error_class = openai.RateLimitError if status_code == 429 else openai.APIStatusError
+    return error_class("error", response=response, body=None)
+
+class FlakySend:
+    """Fails with the given errors, then succeeds."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.attempts = 0
+
+    async def __call__(self):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+def make_client(**kwargs):
+    breaker = CircuitBreaker("test", failure_threshold=kwargs.pop("failure_threshold", 5),
+                             recovery_seconds=kwargs.pop("recovery_seconds", 30))
+    return ResilientLLMClient(breaker=breaker, base_delay=0.001, max_delay=0.1, **kwargs)
+
+def test_transient_errors_are_retried_honouring_retry_after():
+    client = make_client(max_attempts=3)
+    send = FlakySend(api_error(429, {"retry-after-ms": "50"}), api_error(503))
+
+    started = time.monotonic()
+    assert asyncio.run(client.call(send)) == "ok"
+
+    assert send.attempts == 3
+    assert time.monotonic() - started >= 0.05
+    assert client.breaker.state == "closed"
+
+def test_client_errors_are_not_retried():
+    client = make_client()
+    send = FlakySend(api_error(400))
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(client.call(send))
+    assert send.attempts == 1
+
+def test_no_retry_is_scheduled_past_the_deadline():
+    client = make_client(max_attempts=5)
+    send = FlakySend(api_error(429, {"retry-after": "5"}))
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(client.call(send, deadline=time.monotonic() + 1))
+    assert send.attempts == 1
+
+def test_breaker_opens_fails_fast_and_recovers():
+    client = make_client(max_attempts=1, failure_threshold=2, recovery_seconds=0.05)
+    transitions = []
+    client.breaker.add_listener(lambda name, old, new: transitions.append((old, new)))
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(openai.APIStatusError):
+                await client.call(FlakySend(api_error(500)))
+        with pytest.raises(CircuitOpenError):
+            await client.call(FlakySend())
+        await asyncio.sleep(0.06)
+        return await client.call(FlakySend())
+
+    assert asyncio.run(run()) == "ok"
+    assert transitions == [("closed", "open"), ("open", "half_open"), ("half_open", "closed")]
+
+def test_retry_after_http_date_is_parsed():
+    error = api_error(429, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert retry_after_seconds(error) == 0.0
+
+class SlowOnceCompletions:
+    """First call hangs past the attempt timeout, the retry answers immediately."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, model, messages, tools, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(10)
+        message = SimpleNamespace(content="Fresh out of the oven!", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+def make_service(resilience):
+    completions = SlowOnceCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    agent = Agent(name="TestBot", instructions="Greet the customer.", tools=[])
+    service = ChatService(openai_client=client, initial_agent=agent, resilience=resilience,
+                          attempt_timeout_seconds=0.05, turn_deadline_seconds=2)
+    return service, completions
+
+def test_chat_service_retries_attempt_timeout():
+    service, completions = make_service(make_client())
+
+    reply = asyncio.run(service.process_message("hi", Conversation("+15550001")))
+
+    assert reply == "Fresh out of the oven!"
+    assert completions.calls == 2
+
+def test_chat_service_fails_fast_while_circuit_is_open():
+    resilience = make_client(failure_threshold=1)
+    service, completions = make_service(resilience)
+    resilience.breaker_for(service.initial_agent.model).record_failure()
+
+    reply = asyncio.run(service.process_message("hi", Conversation("+15550001")))
+
+    assert reply == service.unavailable_message
+    assert completions.calls == 0
@@ -0,0 +1,103 @@
+import asyncio
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import pytest
+import requests
+from app.services.twilio_service import TwilioMessageSender
+from app.services.reply_worker import ReplyWorkerPool
+
+class TwilioStandIn(BaseHTTPRequestHandler):
+    """Minimal local stand-in for the Twilio Messages API."""
+    fail_first = 0
+    fail_status = 503
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        TwilioStandIn.requests.append({
+            "path": self.path,
+            "auth": self.headers.get("Authorization"),
+            "connection": self.headers.get("Connection"),
+            "form": {k: v[0] for k, v in parse_qs(body).items()},
+        })
+        if TwilioStandIn.fail_first > 0:
+            TwilioStandIn.fail_first -= 1
+            self.send_response(TwilioStandIn.fail_status)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.dumps({"sid": f"SM{len(TwilioStandIn.requests)}", "status": "queued"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def twilio_server():
+    TwilioStandIn.requests = []
+    TwilioStandIn.fail_first = 0
+    TwilioStandIn.fail_status = 503
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TwilioStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def make_sender(base_url):
+    return TwilioMessageSender(account_sid="AC123", auth_token="secret", base_url=base_url, backoff_factor=0)
+
+def test_send_message_posts_form_with_basic_auth(twilio_server):
+    sender = make_sender(twilio_server)
+
+    message = sender.send_message("whatsapp:+15550001", "whatsapp:+15559999", "Your cake is ready")
+
+    assert message["sid"] == "SM1"
+    request = TwilioStandIn.requests[0]
+    assert request["path"] == "/2010-04-01/Accounts/AC123/Messages.json"
+    assert request["auth"] == "Basic " + base64.b64encode(b"AC123:secret").decode()
+    assert request["form"] == {"To": "whatsapp:+15550001", "From": "whatsapp:+15559999", "Body": "Your cake is ready"}
+
+def test_send_message_retries_unavailable_responses(twilio_server):
+    TwilioStandIn.fail_first = 2
+    sender = make_sender(twilio_server)
+
+    message = sender.send_message("whatsapp:+15550001", "whatsapp:+15559999", "Hello")
+
+    assert message["sid"] == "SM3"
+    assert len(TwilioStandIn.requests) == 3
+
+def test_send_message_does_not_retry_errors_after_twilio_may_have_accepted_it(twilio_server):
+    TwilioStandIn.fail_first = 1
+    TwilioStandIn.fail_status = 500
+    sender = make_sender(twilio_server)
+
+    with pytest.raises(requests.HTTPError):
+        sender.send_message("whatsapp:+15550001", "whatsapp:+15559999", "Hello")
+
+    assert len(TwilioStandIn.requests) == 1
+
+def test_worker_pool_sends_replies_in_background(twilio_server):
+    sender = make_sender(twilio_server)
+
+    async def handler(job):
+        await asyncio.to_thread(sender.send_message, job["reply_to"], job["reply_from"], job["message"].upper())
+
+    async def run():
+        pool = ReplyWorkerPool(handler, workers=2, queue_size=10)
+        await pool.start()
+        for i in range(5):
+            assert pool.submit({"reply_to": f"whatsapp:+1555000{i}", "reply_from": "whatsapp:+15559999",
+                                "message": f"hi {i}"})
+        await pool.stop()
+
+    asyncio.run(run())
+
+    assert sorted(r["form"]["Body"] for r in TwilioStandIn.requests) == [f"HI {i}" for i in range(5)]
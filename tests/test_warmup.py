@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, text
+from app import database
+from app.services import warmup as warmup_module
+from app.services.warmup import WarmUp
+from app.utils.function_schemas import get_tool_schemas
+from app.utils.tools.agents import Agent
+
+def get_cake_inventory() -> list:
+    """Stub inventory."""
+    return []
+
+AGENT = Agent(name="BakeryBot", instructions="Help.", tools=[get_cake_inventory])
+
+class StubBackend:
+    def __init__(self, error=None):
+        self.error = error
+        self.warm_ups = 0
+
+    async def warm_up(self, timeout=None):
+        self.warm_ups += 1
+        if self.error:
+            raise self.error
+
+def sqlite_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'warmup.db'}")
+
+def test_ready_after_warm_up(tmp_path):
+    backend = StubBackend()
+    warmup = WarmUp(sqlite_engine(tmp_path), backend, [AGENT], db_connections=3)
+    assert not warmup.ready
+    assert warmup.status()["status"] == "warming_up"
+
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    status = warmup.status()
+    assert status["status"] == "ready"
+    assert status["steps"]["db_pool"]["status"] == "ok"
+    assert status["steps"]["db_pool"]["detail"] == 3
+    assert status["steps"]["tool_schemas"]["detail"] == 1
+    assert status["steps"]["llm_client"]["status"] == "ok"
+    assert backend.warm_ups == 1
+
+def test_llm_failure_does_not_block_readiness(tmp_path):
+    warmup = WarmUp(sqlite_engine(tmp_path), StubBackend(ConnectionError("unreachable")), [AGENT])
+
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert warmup.status()["steps"]["llm_client"]["status"] == "failed"
+    assert warmup.status()["steps"]["llm_client"]["error"] == "unreachable"
+
+def test_database_step_is_retried_until_it_succeeds(tmp_path, monkeypatch):
+    attempts = []
+
+    def flaky_open(engine, connections):
+        attempts.append(connections)
+        if len(attempts) < 3:
+            raise ConnectionError("database is starting")
+        return connections
+
+    monkeypatch.setattr(warmup_module, "open_pool_connections", flaky_open)
+    warmup = WarmUp(sqlite_engine(tmp_path), None, [AGENT], db_connections=2, retry_seconds=0)
+
+    asyncio.run(warmup.run())
+
+    assert len(attempts) == 3
+    assert warmup.ready
+    assert warmup.status()["steps"]["db_pool"]["status"] == "ok"
+
+def test_disabled_warm_up_is_ready_immediately(tmp_path):
+    backend = StubBackend()
+    warmup = WarmUp(sqlite_engine(tmp_path), backend, [AGENT], enabled=False)
+
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert warmup.status()["steps"] == {}
+    assert backend.warm_ups == 0
+
+def test_stop_reports_not_ready(tmp_path):
+    warmup = WarmUp(sqlite_engine(tmp_path), None, [AGENT], enabled=False)
+    asyncio.run(warmup.run())
+
+    warmup.stop()
+
+    assert not warmup.ready
+    assert warmup.status()["status"] == "stopping"
+
+def test_tool_schemas_are_built_once():
+    first = get_tool_schemas(AGENT.tools)
+
+    assert get_tool_schemas(list(AGENT.tools)) is first
+    assert first[0]["function"]["name"] == "get_cake_inventory"
+
+def test_verify_requires_latest_migration(tmp_path, monkeypatch):
+    engine = sqlite_engine(tmp_path)
+    monkeypatch.setattr(database, "engine", engine)
+    _, head = database.migration_revisions()
+
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        database.prepare_schema("verify")
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        connection.execute(text("INSERT INTO alembic_version VALUES (:head)"), {"head": head})
+    database.prepare_schema("verify")